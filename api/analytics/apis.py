@@ -8,6 +8,7 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from api.permissions import IsStaffOrAdmin
+from api.common.encoders import serialize_list
 from api.common.exceptions import BusinessLogicError
 from api.analytics.selectors import (
     analytics_get_most_profitable_categories,
@@ -69,11 +70,10 @@ class MostProfitableCategoriesApi(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        serializer = CategoryProfitOutputSerializer(results, many=True)
         return Response(
             {
                 'count': len(results),
-                'results': serializer.data
+                'results': serialize_list(CategoryProfitOutputSerializer, results)
             },
             status=status.HTTP_200_OK
         )
@@ -146,11 +146,10 @@ class MostProfitableFilmsApi(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        serializer = FilmProfitOutputSerializer(results, many=True)
         return Response(
             {
                 'count': len(results),
-                'results': serializer.data
+                'results': serialize_list(FilmProfitOutputSerializer, results)
             },
             status=status.HTTP_200_OK
         )
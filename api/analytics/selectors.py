@@ -4,8 +4,10 @@ Analytics domain selectors using stored procedures.
 from typing import List, Dict, Optional
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import BusinessLogicError
+from api.common.tracing import traced
 
 
+@traced
 def analytics_get_most_profitable_categories(*, year: Optional[int] = None) -> List[Dict]:
     """
     Get most profitable categories by year using stored procedure.
@@ -41,6 +43,7 @@ def analytics_get_most_profitable_categories(*, year: Optional[int] = None) -> L
         raise BusinessLogicError(f"Failed to retrieve category profitability data: {str(e)}")
 
 
+@traced
 def analytics_get_most_profitable_films(
     *, 
     year: Optional[int] = None,
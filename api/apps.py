@@ -5,3 +5,9 @@ class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
 
+    def ready(self):
+        from api.common import slow_queries, tracing
+
+        slow_queries.install()
+        tracing.install()
+
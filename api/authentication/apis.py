@@ -1,19 +1,23 @@
 """
 Auth domain APIs.
 """
+import io
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser
 from rest_framework_simplejwt.views import TokenRefreshView
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
 from api.authentication.services import (
     user_register, user_activate, user_login, 
-    password_reset_request, password_reset_confirm
+    password_reset_request, password_reset_confirm,
+    user_bulk_provision, users_bulk_activate
 )
-from api.authentication.selectors import user_get_login_data
+from api.authentication.selectors import user_get_by_id, user_get_login_data
 from api.authentication.serializers import (
     UserRegistrationInputSerializer,
     UserActivationInputSerializer,
@@ -24,8 +28,14 @@ from api.authentication.serializers import (
     LoginOutputSerializer,
     ActivationOutputSerializer,
     PasswordResetOutputSerializer,
-    RegistrationOutputSerializer
+    RegistrationOutputSerializer,
+    UserBulkProvisionInputSerializer,
+    UserBulkProvisionOutputSerializer,
+    UsersBulkActivateInputSerializer,
+    UsersBulkActivateOutputSerializer
 )
+from api.common.throttling import AccountThrottle, ClientIPThrottle
+from api.permissions import IsAdmin
 
 
 class UserRegistrationApi(APIView):
@@ -35,6 +45,10 @@ class UserRegistrationApi(APIView):
     Creates a new inactive user account and sends activation email.
     """
     permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = [ClientIPThrottle, AccountThrottle]
+    throttle_scope = 'register'
+    throttle_account_field = 'email'
     
     @extend_schema(
         operation_id='auth_register',
@@ -43,7 +57,8 @@ class UserRegistrationApi(APIView):
         request=UserRegistrationInputSerializer,
         responses={
             201: RegistrationOutputSerializer,
-            400: {'description': 'Validation error'}
+            400: {'description': 'Validation error'},
+            429: {'description': 'Too many requests; see Retry-After'}
         },
         tags=['Authentication']
     )
@@ -111,6 +126,10 @@ class UserLoginApi(APIView):
     Authenticates user and returns JWT tokens.
     """
     permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = [ClientIPThrottle, AccountThrottle]
+    throttle_scope = 'login'
+    throttle_account_field = 'username'
     
     @extend_schema(
         operation_id='auth_login',
@@ -119,7 +138,8 @@ class UserLoginApi(APIView):
         request=UserLoginInputSerializer,
         responses={
             200: LoginOutputSerializer,
-            400: {'description': 'Invalid credentials or account not activated'}
+            400: {'description': 'Invalid credentials or account not activated'},
+            429: {'description': 'Too many requests; see Retry-After'}
         },
         tags=['Authentication']
     )
@@ -155,7 +175,9 @@ class UserMeApi(APIView):
         tags=['Authentication']
     )
     def get(self, request):
-        user_data = user_get_login_data(user=request.user)
+        # request.user is a TokenPrincipal; the profile needs the full row
+        user = user_get_by_id(user_id=request.user.id)
+        user_data = user_get_login_data(user=user)
         return Response(user_data)
 
 
@@ -166,6 +188,10 @@ class PasswordResetRequestApi(APIView):
     Sends password reset email to user.
     """
     permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = [ClientIPThrottle, AccountThrottle]
+    throttle_scope = 'password_reset'
+    throttle_account_field = 'email'
     
     @extend_schema(
         operation_id='auth_password_reset_request',
@@ -173,7 +199,8 @@ class PasswordResetRequestApi(APIView):
         description='Sends password reset email to user.',
         request=PasswordResetRequestInputSerializer,
         responses={
-            200: PasswordResetOutputSerializer
+            200: PasswordResetOutputSerializer,
+            429: {'description': 'Too many requests; see Retry-After'}
         },
         tags=['Authentication']
     )
@@ -249,3 +276,63 @@ class CustomTokenRefreshView(TokenRefreshView):
     )
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
+
+
+class UserBulkProvisionApi(APIView):
+    """Create many accounts from an uploaded CSV"""
+    permission_classes = [IsAdmin]
+    parser_classes = [MultiPartParser]
+    
+    @extend_schema(
+        operation_id='auth_users_bulk_provision',
+        summary='Bulk provision user accounts',
+        description='Create accounts from a CSV file (username, email, password, optional first_name, last_name, role). Invalid or duplicate rows are returned as rejects; the rest are created in one batch and sent activation emails unless activate is set. Admin only.',
+        request=UserBulkProvisionInputSerializer,
+        responses={
+            200: UserBulkProvisionOutputSerializer,
+            400: {'description': 'Validation error'}
+        },
+        tags=['Authentication']
+    )
+    def post(self, request):
+        serializer = UserBulkProvisionInputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = user_bulk_provision(
+            source=io.TextIOWrapper(serializer.validated_data['file'], encoding='utf-8-sig', newline=''),
+            default_role=serializer.validated_data['default_role'],
+            activate=serializer.validated_data['activate'],
+            dry_run=serializer.validated_data['dry_run']
+        )
+        
+        return Response(
+            UserBulkProvisionOutputSerializer(result).data,
+            status=status.HTTP_200_OK
+        )
+
+
+class UsersBulkActivateApi(APIView):
+    """Activate many accounts at once"""
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(
+        operation_id='auth_users_bulk_activate',
+        summary='Bulk activate user accounts',
+        description='Activate the accounts with the given usernames in a single update. Admin only.',
+        request=UsersBulkActivateInputSerializer,
+        responses={
+            200: UsersBulkActivateOutputSerializer,
+            400: {'description': 'Validation error'}
+        },
+        tags=['Authentication']
+    )
+    def post(self, request):
+        serializer = UsersBulkActivateInputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = users_bulk_activate(usernames=serializer.validated_data['usernames'])
+        
+        return Response(
+            UsersBulkActivateOutputSerializer(result).data,
+            status=status.HTTP_200_OK
+        )
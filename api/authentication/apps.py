@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class AuthenticationConfig(AppConfig):
+    name = 'api.authentication'
+    label = 'authentication'
+    
+    def ready(self):
+        from django.contrib.auth.password_validation import get_default_password_validators
+        from api.authentication.validators import common_passwords_load
+        
+        # Pay for reading the password lists at startup, not on the first signup
+        common_passwords_load()
+        get_default_password_validators()
@@ -0,0 +1,159 @@
+"""
+Stateless JWT authentication.
+
+Access tokens issued by ``UserRefreshToken`` carry the user's role, active
+flag and token version, so requests are authenticated without loading the
+user row. Revocation works by bumping ``CustomUser.token_version``: tokens
+with an older version are refused. The current version of each user is kept
+in a per-process TTL cache, so a revocation made in another worker process
+takes effect within TOKEN_STATE_CACHE_TTL seconds.
+
+``CachedJWTAuthentication`` additionally remembers verified tokens, so a
+client reusing one access token skips signature verification and decoding.
+"""
+import hashlib
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from api.authentication.selectors import user_get_token_state
+from api.common.cache import TTLCache
+
+_MISSING = object()
+
+_token_state_cache = TTLCache(
+    maxsize=getattr(settings, 'TOKEN_STATE_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_STATE_CACHE_TTL', 30),
+    name='token_state',
+)
+
+# sha256(raw token) -> validated AccessToken, expiring at the token's exp
+_verified_token_cache = TTLCache(
+    maxsize=getattr(settings, 'VERIFIED_TOKEN_CACHE_SIZE', 10000),
+    ttl=api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(),
+    name='verified_token',
+)
+
+
+def token_state_get(*, user_id: int) -> Optional[Tuple[int, bool]]:
+    """
+    Get a user's current (token_version, is_active), cached per process.
+    
+    Args:
+        user_id: User ID
+        
+    Returns:
+        Tuple of (token_version, is_active), or None if the user does not exist
+    """
+    state = _token_state_cache.get(user_id, _MISSING)
+    if state is _MISSING:
+        state = user_get_token_state(user_id=user_id)
+        _token_state_cache.set(user_id, state)
+    return state
+
+
+def token_state_forget(*, user_id: int) -> None:
+    """Drop a user's cached token state and verified tokens so the next request reads the database."""
+    _token_state_cache.pop(user_id)
+    _verified_token_cache.evict(lambda token: token.get(api_settings.USER_ID_CLAIM) == user_id)
+
+
+class TokenPrincipal:
+    """
+    Authenticated user as described by access-token claims.
+    
+    Provides what permission classes need (id, role) without a database
+    row; load the CustomUser explicitly where profile fields are required.
+    """
+    __slots__ = ('id', 'role', 'is_active', 'token_version')
+    
+    is_authenticated = True
+    is_anonymous = False
+    
+    def __init__(self, *, id: int, role: str, is_active: bool, token_version: int):
+        self.id = id
+        self.role = role
+        self.is_active = is_active
+        self.token_version = token_version
+    
+    @property
+    def pk(self) -> int:
+        return self.id
+    
+    def __str__(self):
+        return f"TokenPrincipal {self.id} ({self.role})"
+    
+    def __eq__(self, other):
+        return isinstance(other, TokenPrincipal) and self.id == other.id
+    
+    def __hash__(self):
+        return hash(self.id)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds a TokenPrincipal from the token claims.
+    
+    Tokens issued before the role/version claims existed fall back to the
+    default database lookup.
+    """
+    
+    def get_user(self, validated_token):
+        if 'ver' not in validated_token or 'role' not in validated_token:
+            return super().get_user(validated_token)
+        
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        
+        state = token_state_get(user_id=user_id)
+        if state is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        
+        token_version, is_active = state
+        if not is_active or not validated_token.get('is_active', False):
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if validated_token['ver'] != token_version:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        
+        return TokenPrincipal(
+            id=user_id,
+            role=validated_token['role'],
+            is_active=True,
+            token_version=token_version,
+        )
+
+
+class CachedJWTAuthentication(StatelessJWTAuthentication):
+    """
+    StatelessJWTAuthentication with an LRU of already verified tokens.
+    
+    Only signature verification and decoding are cached; the token version
+    and active checks in get_user still run on every request.
+    """
+    
+    def get_validated_token(self, raw_token):
+        digest = hashlib.sha256(raw_token).digest()
+        validated_token = _verified_token_cache.get(digest)
+        if validated_token is not None:
+            return validated_token
+        
+        validated_token = super().get_validated_token(raw_token)
+        _verified_token_cache.set(digest, validated_token, ttl=validated_token['exp'] - time.time())
+        return validated_token
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """OpenAPI security scheme for StatelessJWTAuthentication"""
+    target_class = 'api.authentication.authentication.StatelessJWTAuthentication'
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """OpenAPI security scheme for CachedJWTAuthentication"""
+    target_class = 'api.authentication.authentication.CachedJWTAuthentication'
@@ -0,0 +1,28 @@
+"""
+Authentication backends.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from api.authentication.hashing import password_make, password_verify
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend that verifies passwords on the hashing pool."""
+    
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway to keep timing close to an existing user's (Django #20760)
+            password_make(password)
+            return None
+        if password_verify(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
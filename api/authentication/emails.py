@@ -1,9 +1,20 @@
 """
 Email sending functions for auth operations (plain text only).
+
+Messages are not sent during the request: they are written to the
+EmailOutbox table inside the caller's transaction (so a rolled-back
+registration sends nothing) and delivered by ``manage.py deliver_outbox``.
 """
-from django.core.mail import send_mail
+import random
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.core.mail import EmailMessage
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
+from api.authentication.models import EmailOutbox
 from api.common.exceptions import EmailSendingError
 
 
@@ -11,10 +22,19 @@ def _get_site_name() -> str:
     return getattr(settings, 'SITE_NAME', 'DVD Rental')
 
 
-def send_activation_email(user, activation_url):
-    """
-    Send account activation email (plain text) containing the activation link.
-    """
+def _queue_email(*, to_email: str, subject: str, body: str) -> EmailOutbox:
+    try:
+        return EmailOutbox.objects.create(
+            to_email=to_email,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            subject=subject,
+            body=body,
+        )
+    except Exception as e:
+        raise EmailSendingError(f"Failed to queue email: {str(e)}")
+
+
+def _activation_message(user, activation_url) -> Tuple[str, str]:
     subject = f"Activate your {_get_site_name()} account"
     message = (
         f"Hello {user.first_name or user.username},\n\n"
@@ -22,22 +42,45 @@ def send_activation_email(user, activation_url):
         f"Please activate your account by opening this link:\n{activation_url}\n\n"
         f"If you did not request this, you can ignore this email."
     )
+    return subject, message
 
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
+
+def send_activation_email(user, activation_url):
+    """
+    Queue account activation email (plain text) containing the activation link.
+    """
+    subject, message = _activation_message(user, activation_url)
+
+    return _queue_email(to_email=user.email, subject=subject, body=message)
+
+
+def send_activation_emails(recipients: Iterable[Tuple[object, str]], *, batch_size: int = 500) -> List[EmailOutbox]:
+    """
+    Queue activation emails for many users with batched inserts.
+    
+    Args:
+        recipients: (user, activation_url) pairs
+        batch_size: Rows per INSERT
+    """
+    messages = []
+    for user, activation_url in recipients:
+        subject, message = _activation_message(user, activation_url)
+        messages.append(EmailOutbox(
+            to_email=user.email,
             from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
+            subject=subject,
+            body=message,
+        ))
+
+    try:
+        return EmailOutbox.objects.bulk_create(messages, batch_size=batch_size)
     except Exception as e:
-        raise EmailSendingError(f"Failed to send activation email: {str(e)}")
+        raise EmailSendingError(f"Failed to queue emails: {str(e)}")
 
 
 def send_password_reset_email(user, reset_url):
     """
-    Send password reset email (plain text) containing the reset link.
+    Queue password reset email (plain text) containing the reset link.
     """
     subject = f"Reset your {_get_site_name()} password"
     message = (
@@ -47,13 +90,85 @@ def send_password_reset_email(user, reset_url):
         f"If you did not request a password reset, you can ignore this email."
     )
 
+    return _queue_email(to_email=user.email, subject=subject, body=message)
+
+
+def outbox_retry_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff with jitter for the given number of failed attempts.
+    """
+    base = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+    cap = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_MAX_SECONDS', 3600)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def _open_connection(connection) -> None:
+    # Failures surface per message on send; they must not abort the batch
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
+        connection.open()
+    except Exception:
+        pass
+
+
+def outbox_deliver_batch(*, connection, batch_size: int = 50) -> Dict[str, int]:
+    """
+    Deliver one batch of due outbox messages over an open mail connection.
+    
+    Rows are locked with SKIP LOCKED, so several workers can drain the
+    outbox concurrently without sending a message twice.
+    
+    Args:
+        connection: Mail backend connection (from django.core.mail.get_connection), reused across batches
+        batch_size: Maximum number of messages to send
+        
+    Returns:
+        Dictionary with sent, retried and failed counts
+    """
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+    counts = {'sent': 0, 'retried': 0, 'failed': 0}
+    
+    with transaction.atomic():
+        messages = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size]
         )
-    except Exception as e:
-        raise EmailSendingError(f"Failed to send password reset email: {str(e)}")
+        
+        if messages:
+            _open_connection(connection)
+        
+        for message in messages:
+            email = EmailMessage(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email,
+                to=[message.to_email],
+                connection=connection,
+            )
+            message.attempts += 1
+            try:
+                email.send(fail_silently=False)
+            except Exception as e:
+                # The session may be broken; start a fresh one for the next message
+                connection.close()
+                _open_connection(connection)
+                message.last_error = str(e)[:2000]
+                if message.attempts >= max_attempts:
+                    message.status = EmailOutbox.STATUS_FAILED
+                    counts['failed'] += 1
+                else:
+                    message.next_attempt_at = timezone.now() + outbox_retry_delay(message.attempts)
+                    counts['retried'] += 1
+            else:
+                message.status = EmailOutbox.STATUS_SENT
+                message.sent_at = timezone.now()
+                message.last_error = ''
+                counts['sent'] += 1
+        
+        EmailOutbox.objects.bulk_update(
+            messages, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    
+    return counts
@@ -0,0 +1,219 @@
+"""
+Password hashing on a bounded worker pool.
+
+PBKDF2 takes ~100 ms of CPU per call. Running it on request threads lets a
+login burst occupy every thread of a worker process. Hashing is instead
+submitted to a small per-process thread pool (hashlib's PBKDF2 releases the
+GIL, so pool threads run in parallel with request threads), and requests are
+turned away with 503 + Retry-After once more than HASHING_POOL_MAX_PENDING
+jobs are waiting, instead of queueing without bound.
+
+Offline batches (bulk provisioning) bypass the pool and hash across worker
+processes with passwords_make_many().
+"""
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from api.common.exceptions import ServiceBusyError
+from api.common.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class HashingPool:
+    """
+    Thread pool with admission control and queue-depth accounting.
+    
+    Args:
+        workers: Number of hashing threads
+        max_pending: Jobs allowed to wait for a free thread before rejecting
+        timeout: Seconds a caller waits for its result
+    """
+    
+    def __init__(self, *, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._completed = 0
+        self._max_queue_depth = 0
+        # Exponential moving average of job duration, used for Retry-After
+        self._avg_seconds = 0.1
+    
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted but not yet picked up by a worker thread."""
+        return max(0, self._in_flight - self.workers)
+    
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_depth / self.workers * self._avg_seconds))
+    
+    def run(self, fn: Callable[..., T], *args) -> T:
+        """
+        Run fn(*args) on the pool and wait for its result.
+        
+        Raises:
+            ServiceBusyError: If the queue is full or the result is not ready within the timeout
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_pending:
+                self._rejected += 1
+                raise ServiceBusyError(wait=self._retry_after())
+            self._in_flight += 1
+            self._max_queue_depth = max(self._max_queue_depth, self.queue_depth)
+        
+        future = self._executor.submit(self._timed, fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                # Never started, so _timed will not release its slot
+                with self._lock:
+                    self._in_flight -= 1
+            logger.warning("Password hashing timed out after %.1fs (queue depth %d)", self.timeout, self.queue_depth)
+            raise ServiceBusyError(wait=self._retry_after())
+    
+    def _timed(self, fn: Callable[..., T], *args) -> T:
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * elapsed
+    
+    def stats(self) -> Dict[str, float]:
+        """Current pool counters."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'in_flight': self._in_flight,
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self._max_queue_depth,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'avg_seconds': round(self._avg_seconds, 4),
+            }
+
+
+_pool: Optional[HashingPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool() -> HashingPool:
+    """Return the process-wide hashing pool, creating it on first use (i.e. after fork)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    workers=getattr(settings, 'HASHING_POOL_WORKERS', 2),
+                    max_pending=getattr(settings, 'HASHING_POOL_MAX_PENDING', 16),
+                    timeout=getattr(settings, 'HASHING_POOL_TIMEOUT', 10),
+                )
+    return _pool
+
+
+def password_make(raw_password: str) -> str:
+    """
+    Hash a password with the default hasher on the pool.
+    
+    Args:
+        raw_password: Plain-text password
+        
+    Returns:
+        Encoded password for CustomUser.password
+    """
+    return get_hashing_pool().run(make_password, raw_password)
+
+
+def _setup_hashing_process() -> None:
+    import django
+    django.setup()
+
+
+def passwords_make_many(raw_passwords: Sequence[str], *, processes: Optional[int] = None) -> List[str]:
+    """
+    Hash many passwords in parallel worker processes.
+    
+    Workers are spawned rather than forked, since the caller may be a
+    multi-threaded server process, and set Django up themselves.
+    
+    Args:
+        raw_passwords: Plain-text passwords
+        processes: Number of worker processes; BULK_HASHING_PROCESSES or the CPU count by default
+        
+    Returns:
+        Encoded passwords, in input order
+    """
+    if processes is None:
+        processes = getattr(settings, 'BULK_HASHING_PROCESSES', None) or os.cpu_count() or 1
+    processes = min(processes, len(raw_passwords))
+    if processes <= 1:
+        return [make_password(raw_password) for raw_password in raw_passwords]
+    
+    chunksize = max(1, len(raw_passwords) // (processes * 4))
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_setup_hashing_process,
+    ) as executor:
+        return list(executor.map(make_password, raw_passwords, chunksize=chunksize))
+
+
+def _check(raw_password: str, encoded: str) -> Tuple[bool, bool]:
+    must_update = []
+    is_correct = check_password(raw_password, encoded, setter=must_update.append)
+    return is_correct, bool(must_update)
+
+
+def password_verify(user, raw_password: str) -> bool:
+    """
+    Check a user's password on the pool.
+    
+    Like AbstractBaseUser.check_password, re-hashes and saves the password
+    when the hasher or its work factor changed.
+    
+    Args:
+        user: User instance
+        raw_password: Plain-text password
+        
+    Returns:
+        True if the password matches
+    """
+    is_correct, must_update = get_hashing_pool().run(_check, raw_password, user.password)
+    if is_correct and must_update:
+        user.password = password_make(raw_password)
+        user.save(update_fields=['password'])
+    return is_correct
+
+
+def hashing_stats() -> Dict[str, float]:
+    """Counters of this process's hashing pool (queue depth, rejections, ...)."""
+    return get_hashing_pool().stats()
+
+
+def _hashing_samples():
+    if _pool is None:
+        return
+    for statistic, value in _pool.stats().items():
+        yield 'api_hashing_pool', (('stat', statistic),), value
+
+
+register_collector(_hashing_samples)
@@ -0,0 +1,47 @@
+"""
+Deliver queued emails from the outbox.
+"""
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from api.authentication.emails import outbox_deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Send pending outbox emails in batches over a single mail connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages per batch.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the outbox is drained.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+
+        try:
+            while True:
+                counts = outbox_deliver_batch(connection=connection, batch_size=options['batch_size'])
+                for key, value in counts.items():
+                    totals[key] += value
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"Sent {counts['sent']}, retrying {counts['retried']}, failed {counts['failed']}."
+                    )
+
+                if sum(counts.values()) < options['batch_size']:
+                    if not options['loop']:
+                        break
+                    # Do not hold an idle SMTP session open between polls
+                    connection.close()
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: sent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}."
+        ))
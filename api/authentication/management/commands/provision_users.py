@@ -0,0 +1,55 @@
+"""
+Create many user accounts from a CSV file.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.authentication.models import CustomUser
+from api.authentication.services import user_bulk_provision, user_provision_write_rejects
+from api.common.exceptions import BusinessLogicError
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create accounts from a CSV (username, email, password, optional first_name, last_name, role).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument(
+            '--role',
+            choices=[choice for choice, _ in CustomUser.ROLE_CHOICES],
+            default='staff',
+            help='Role for rows without one (default: staff)'
+        )
+        parser.add_argument('--activate', action='store_true', help='Create active accounts, send no activation emails')
+        parser.add_argument('--processes', type=int, help='Password hashing processes (default: CPU count)')
+        parser.add_argument('--errors', help='Write rejected rows to this CSV file')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, do not create accounts')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as source:
+                result = user_bulk_provision(
+                    source=source,
+                    default_role=options['role'],
+                    activate=options['activate'],
+                    dry_run=options['dry_run'],
+                    processes=options['processes'],
+                )
+        except (OSError, BusinessLogicError) as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        if options['errors'] and result['rejects']:
+            with open(options['errors'], 'w', encoding='utf-8', newline='') as destination:
+                user_provision_write_rejects(rejects=result['rejects'], destination=destination)
+            self.stdout.write(f"Rejected rows written to {options['errors']}")
+
+        if options['dry_run']:
+            verb, count = 'Validated', result['total'] - result['rejected']
+        else:
+            verb, count = 'Created', result['created']
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} of {result['total']} accounts ({result['rejected']} rejected) in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,14 @@
+"""
+Delete expired refresh-token revocations.
+"""
+from django.core.management.base import BaseCommand
+
+from api.authentication.revocation import revoked_refresh_tokens_prune
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked refresh tokens whose expiry has passed.'
+
+    def handle(self, *args, **options):
+        deleted = revoked_refresh_tokens_prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired token revocations."))
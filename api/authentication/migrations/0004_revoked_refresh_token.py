@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedRefreshToken',
+            fields=[
+                ('jti', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'api_revoked_refresh_token',
+            },
+        ),
+    ]
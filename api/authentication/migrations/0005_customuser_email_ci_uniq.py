@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:11
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_revoked_refresh_token'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('email'), condition=models.Q(('email', ''), _negated=True), name='api_customuser_email_ci_uniq'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 import re
 
@@ -12,9 +14,20 @@ class CustomUser(AbstractUser):
         ('customer', 'Customer'),
     ]
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='customer')
+    # Embedded in issued JWTs; incrementing it revokes all outstanding tokens
+    token_version = models.PositiveIntegerField(default=0)
     
     class Meta:
         db_table = 'api_customuser'
+        constraints = [
+            # Emails are unique regardless of case; accounts created without one are exempt.
+            # UPPER matches what iexact lookups compile to on PostgreSQL.
+            models.UniqueConstraint(
+                Upper('email'),
+                name='api_customuser_email_ci_uniq',
+                condition=~models.Q(email=''),
+            ),
+        ]
     
     def clean(self):
         """Validate user data according to business rules"""
@@ -40,3 +53,52 @@ class CustomUser(AbstractUser):
     
     def __str__(self):
         return f"{self.username} ({self.role})"
+
+
+class EmailOutbox(models.Model):
+    """Outgoing email queued in the sender's transaction and delivered by deliver_outbox"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'api_email_outbox'
+        indexes = [
+            # Delivery scans pending rows that are due
+            models.Index(
+                fields=['next_attempt_at'],
+                name='email_outbox_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class RevokedRefreshToken(models.Model):
+    """JTI of a rotated-out refresh token; kept until the token would have expired anyway"""
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'api_revoked_refresh_token'
+    
+    def __str__(self):
+        return self.jti
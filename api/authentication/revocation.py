@@ -0,0 +1,110 @@
+"""
+Revocation list for rotated refresh tokens.
+
+Each refresh revokes the presented token by inserting its JTI into
+``api_revoked_refresh_token`` with ``ON CONFLICT DO NOTHING``; a conflict
+means the token was already used, so the insert is both the write and the
+authoritative reuse check. Rows are only kept until the token's own expiry
+and are pruned opportunistically.
+
+A per-process Bloom filter of revoked JTIs answers "certainly not revoked"
+without a query. It is loaded from the table on first use and rebuilt
+periodically, so JTIs revoked by other processes since the last rebuild are
+not in it; those are still caught by the insert conflict.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from api.authentication.models import RevokedRefreshToken
+from api.common.bloom import BloomFilter
+
+_bloom = None
+_bloom_built_at = 0.0
+_bloom_lock = threading.Lock()
+
+
+def _get_bloom() -> BloomFilter:
+    """Return this process's filter, (re)building it from the table when stale or saturated."""
+    global _bloom, _bloom_built_at
+    max_age = getattr(settings, 'REVOKED_TOKEN_BLOOM_REBUILD_SECONDS', 600)
+    
+    if _bloom is not None and not _bloom.is_saturated and time.monotonic() - _bloom_built_at < max_age:
+        return _bloom
+    
+    with _bloom_lock:
+        if _bloom is None or _bloom.is_saturated or time.monotonic() - _bloom_built_at >= max_age:
+            live = RevokedRefreshToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True)
+            bloom = BloomFilter(capacity=getattr(settings, 'REVOKED_TOKEN_BLOOM_CAPACITY', 100000))
+            bloom.update(live.iterator(chunk_size=5000))
+            if bloom.is_saturated:
+                # More live revocations than planned for: size for twice as many
+                bloom = BloomFilter(capacity=bloom.count * 2)
+                bloom.update(live.iterator(chunk_size=5000))
+            _bloom, _bloom_built_at = bloom, time.monotonic()
+    return _bloom
+
+
+def refresh_token_is_revoked(*, jti: str) -> bool:
+    """
+    Check whether a refresh token has been revoked.
+    
+    Args:
+        jti: Token's jti claim
+        
+    Returns:
+        True if revoked; a Bloom filter miss answers False without a query
+    """
+    if jti not in _get_bloom():
+        return False
+    return RevokedRefreshToken.objects.filter(jti=jti).exists()
+
+
+def refresh_token_revoke(*, jti: str, exp: int) -> bool:
+    """
+    Revoke a refresh token.
+    
+    Args:
+        jti: Token's jti claim
+        exp: Token's exp claim (unix time); the row is pruned after it
+        
+    Returns:
+        True if this call revoked the token, False if it was already revoked
+    """
+    expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {RevokedRefreshToken._meta.db_table} (jti, expires_at) VALUES (%s, %s) "
+            "ON CONFLICT (jti) DO NOTHING",
+            [jti, expires_at]
+        )
+        revoked = cursor.rowcount == 1
+    
+    _get_bloom().add(jti)
+    
+    if random.random() < getattr(settings, 'REVOKED_TOKEN_PRUNE_PROBABILITY', 0.01):
+        revoked_refresh_tokens_prune(limit=1000)
+    
+    return revoked
+
+
+def revoked_refresh_tokens_prune(*, limit: int = None) -> int:
+    """
+    Delete revocations of tokens that have expired on their own.
+    
+    Args:
+        limit: Maximum rows to delete (keeps opportunistic pruning cheap); None for all
+        
+    Returns:
+        Number of deleted rows
+    """
+    expired = RevokedRefreshToken.objects.filter(expires_at__lte=timezone.now())
+    if limit is not None:
+        expired = RevokedRefreshToken.objects.filter(pk__in=list(expired.values_list('pk', flat=True)[:limit]))
+    deleted, _ = expired.delete()
+    return deleted
@@ -1,15 +1,17 @@
 """
 Auth domain selectors.
 """
-from typing import Optional
+from typing import Optional, Tuple
 from django.contrib.auth import get_user_model
-from django.db.models import QuerySet
+from django.db.models import Q, QuerySet
 
 from api.authentication.models import CustomUser
+from api.common.tracing import traced
 
 User = get_user_model()
 
 
+@traced
 def user_get_by_username(*, username: str) -> CustomUser:
     """
     Get user by username.
@@ -26,6 +28,7 @@ def user_get_by_username(*, username: str) -> CustomUser:
     return CustomUser.objects.get(username=username)
 
 
+@traced
 def user_get_by_email(*, email: str) -> CustomUser:
     """
     Get user by email.
@@ -42,6 +45,7 @@ def user_get_by_email(*, email: str) -> CustomUser:
     return CustomUser.objects.get(email=email)
 
 
+@traced
 def user_get_by_id(*, user_id: int) -> CustomUser:
     """
     Get user by ID.
@@ -58,6 +62,44 @@ def user_get_by_id(*, user_id: int) -> CustomUser:
     return CustomUser.objects.get(id=user_id)
 
 
+@traced
+def user_get_by_login(*, login: str) -> Optional[CustomUser]:
+    """
+    Get user by username or email in a single query.
+    
+    Emails match case-insensitively (through the UPPER(email) unique index);
+    a username match wins over an email match.
+    
+    Args:
+        login: Username or email address
+        
+    Returns:
+        User instance, or None if no user matches
+    """
+    # The email index is partial (email <> ''), so the predicate repeats its condition
+    email_match = Q(email__iexact=login) & ~Q(email='')
+    candidates = list(CustomUser.objects.filter(Q(username=login) | email_match).order_by('id')[:2])
+    for user in candidates:
+        if user.username == login:
+            return user
+    return candidates[0] if candidates else None
+
+
+@traced
+def user_get_token_state(*, user_id: int) -> Optional[Tuple[int, bool]]:
+    """
+    Get the fields needed to validate a user's access token.
+    
+    Args:
+        user_id: User ID
+        
+    Returns:
+        Tuple of (token_version, is_active), or None if user not found
+    """
+    return CustomUser.objects.filter(id=user_id).values_list('token_version', 'is_active').first()
+
+
+@traced
 def user_exists_by_username(*, username: str) -> bool:
     """
     Check if user exists by username.
@@ -71,6 +113,7 @@ def user_exists_by_username(*, username: str) -> bool:
     return CustomUser.objects.filter(username=username).exists()
 
 
+@traced
 def user_exists_by_email(*, email: str) -> bool:
     """
     Check if user exists by email.
@@ -84,6 +127,7 @@ def user_exists_by_email(*, email: str) -> bool:
     return CustomUser.objects.filter(email=email).exists()
 
 
+@traced
 def user_get_login_data(*, user: CustomUser) -> dict:
     """
     Get user data for login response.
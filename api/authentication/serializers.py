@@ -3,10 +3,14 @@ Auth domain serializers.
 """
 import re
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
 from api.authentication.models import CustomUser
 from api.authentication.selectors import user_exists_by_username, user_exists_by_email
+from api.authentication.revocation import refresh_token_is_revoked, refresh_token_revoke
+from api.authentication.tokens import UserRefreshToken
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -22,6 +26,49 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
 
 
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that re-checks the user against the database.
+    
+    Refuses refresh tokens of inactive users, with a revoked token version
+    or already rotated out, and re-issues the role/is_active/ver claims from
+    the current user row so role changes reach new access tokens.
+    """
+    token_class = UserRefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[api_settings.JTI_CLAIM]
+        
+        if refresh_token_is_revoked(jti=jti):
+            raise AuthenticationFailed("Token is blacklisted", code="token_not_valid")
+        
+        user = CustomUser.objects.filter(id=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User is inactive or does not exist", code="user_inactive")
+        if refresh.get('ver', user.token_version) != user.token_version:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        
+        refresh['role'] = user.role
+        refresh['is_active'] = user.is_active
+        refresh['ver'] = user.token_version
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # The insert also catches a concurrent refresh with the same token
+            if api_settings.BLACKLIST_AFTER_ROTATION and not refresh_token_revoke(jti=jti, exp=refresh['exp']):
+                raise AuthenticationFailed("Token is blacklisted", code="token_not_valid")
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            
+            data['refresh'] = str(refresh)
+        
+        return data
+
+
 class UserRegistrationInputSerializer(serializers.Serializer):
     """
     Input serializer for user registration
@@ -143,3 +190,55 @@ class RegistrationOutputSerializer(serializers.Serializer):
     """Output serializer for registration response"""
     message = serializers.CharField()
     user = UserOutputSerializer()
+
+
+class UserBulkProvisionInputSerializer(serializers.Serializer):
+    """Input serializer for bulk user provisioning upload"""
+    file = serializers.FileField(
+        help_text="CSV with header: username, email, password and optional first_name, last_name, role"
+    )
+    default_role = serializers.ChoiceField(
+        choices=[choice for choice, _ in CustomUser.ROLE_CHOICES],
+        default='staff',
+        help_text="Role for rows that leave the role column empty"
+    )
+    activate = serializers.BooleanField(
+        default=False,
+        help_text="Create active accounts instead of sending activation emails"
+    )
+    dry_run = serializers.BooleanField(default=False, help_text="Validate only, do not create accounts")
+
+
+class UserProvisionRejectSerializer(serializers.Serializer):
+    """Output serializer for a rejected provisioning row"""
+    line = serializers.IntegerField()
+    error = serializers.CharField()
+    username = serializers.CharField(allow_null=True)
+    email = serializers.CharField(allow_null=True)
+    first_name = serializers.CharField(allow_null=True)
+    last_name = serializers.CharField(allow_null=True)
+    role = serializers.CharField(allow_null=True)
+
+
+class UserBulkProvisionOutputSerializer(serializers.Serializer):
+    """Output serializer for bulk user provisioning response"""
+    total = serializers.IntegerField()
+    created = serializers.IntegerField()
+    rejected = serializers.IntegerField()
+    rejects = UserProvisionRejectSerializer(many=True)
+
+
+class UsersBulkActivateInputSerializer(serializers.Serializer):
+    """Input serializer for bulk account activation"""
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=150),
+        allow_empty=False,
+        max_length=10000,
+        help_text="Usernames of the accounts to activate"
+    )
+
+
+class UsersBulkActivateOutputSerializer(serializers.Serializer):
+    """Output serializer for bulk account activation response"""
+    activated = serializers.IntegerField()
+    not_found = serializers.ListField(child=serializers.CharField())
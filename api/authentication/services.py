@@ -1,27 +1,53 @@
 """
 Auth domain services.
 """
-from typing import Dict, Any
-from django.contrib.auth import authenticate
+import csv
+from typing import Dict, Any, Iterable, List, Optional, TextIO, Tuple
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from api.authentication.models import CustomUser
 from api.authentication.validators import validate_password_strength
 from api.common.exceptions import (
-    UserAlreadyExistsError, InvalidCredentialsError, AccountNotActivatedError,
+    BusinessLogicError, UserAlreadyExistsError, InvalidCredentialsError, AccountNotActivatedError,
     UserNotFoundError, EmailSendingError, WeakPasswordError
 )
-from api.authentication.tokens import generate_activation_token, validate_activation_token, generate_password_reset_token, validate_password_reset_token
-from api.authentication.emails import send_activation_email, send_password_reset_email
-from api.authentication.selectors import user_exists_by_username, user_exists_by_email, user_get_by_email
+from api.common.tracing import traced
+from api.authentication.tokens import generate_activation_token, validate_activation_token, generate_password_reset_token, validate_password_reset_token, UserRefreshToken
+from api.authentication.authentication import token_state_forget
+from api.authentication.hashing import password_make, password_verify, passwords_make_many
+from api.authentication.emails import send_activation_email, send_activation_emails, send_password_reset_email
+from api.authentication.selectors import user_get_by_email, user_get_by_login
 
 User = get_user_model()
 
+# Unique constraints on api_customuser, keyed by a fragment of their name
+_UNIQUE_VIOLATION_MESSAGES = {
+    'username': "A user with this username already exists.",
+    'email': "A user with this email already exists.",
+}
 
+
+def _unique_violation_message(error: IntegrityError) -> Optional[str]:
+    """Return the registration error message for a unique violation, or None."""
+    diag = getattr(error.__cause__, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None) or str(error)
+    for fragment, message in _UNIQUE_VIOLATION_MESSAGES.items():
+        if fragment in constraint:
+            return message
+    return None
+
+
+def _activation_url(user: CustomUser) -> str:
+    return f"{settings.FRONTEND_URL}/activate?token={generate_activation_token(user)}"
+
+
+@traced
 @transaction.atomic
 def user_register(
     *,
@@ -34,6 +60,11 @@ def user_register(
     """
     Register new inactive user and send activation email.
     
+    Uniqueness of username and (case-insensitive) email is left to the
+    database: the user is inserted directly and a unique violation is
+    reported as UserAlreadyExistsError, so concurrent signups for the same
+    name cannot both succeed.
+    
     Args:
         username: Username for the user
         email: Email address
@@ -50,19 +81,6 @@ def user_register(
         WeakPasswordError: If password doesn't meet strength requirements
     """
     
-    # Check for existing username/email first (before creating object)
-    if user_exists_by_username(username=username):
-        raise UserAlreadyExistsError("A user with this username already exists.")
-    
-    if user_exists_by_email(email=email):
-        raise UserAlreadyExistsError("A user with this email already exists.")
-    
-    # Validate password strength before hashing
-    try:
-        validate_password_strength(password)
-    except DjangoValidationError as e:
-        raise WeakPasswordError(str(e.message_dict.get('password', ['Weak password'])[0]))
-    
     # Create user instance
     user = CustomUser(
         username=username,
@@ -73,30 +91,42 @@ def user_register(
         role='customer'
     )
     
-    # Set password (hashes it)
-    user.set_password(password)
+    # Validate password strength before hashing
+    try:
+        validate_password_strength(password, user=user)
+    except DjangoValidationError as e:
+        raise WeakPasswordError(str(e.message_dict.get('password', ['Weak password'])[0]))
     
-    # Validate all business rules
+    # Validate field and business rules before paying for the hash; the password is
+    # checked above and uniqueness is enforced by the insert below
     try:
-        user.full_clean()
+        user.full_clean(exclude=['password'], validate_unique=False, validate_constraints=False)
     except DjangoValidationError as e:
         # Convert Django ValidationError to our custom exception
         raise UserAlreadyExistsError(str(e))
     
-    # Save user
-    user.save()
+    # Set password (hashed on the worker pool)
+    user.password = password_make(password)
+    
+    # Save user. No savepoint: a violation aborts the whole registration anyway.
+    try:
+        user.save()
+    except IntegrityError as e:
+        message = _unique_violation_message(e)
+        if message is None:
+            raise
+        raise UserAlreadyExistsError(message)
     
     # Generate and send activation email
-    activation_token = generate_activation_token(user)
     try:
-        activation_url = f"{settings.FRONTEND_URL}/activate?token={activation_token}"
-        send_activation_email(user, activation_url)
+        send_activation_email(user, _activation_url(user))
     except EmailSendingError:
         raise EmailSendingError("Failed to send activation email. Please try again later.")
     
     return user
 
 
+@traced
 @transaction.atomic
 def user_activate(*, token: str) -> Dict[str, Any]:
     """
@@ -122,7 +152,7 @@ def user_activate(*, token: str) -> Dict[str, Any]:
     user.is_active = True
     user.save()
     
-    refresh = RefreshToken.for_user(user)
+    refresh = UserRefreshToken.for_user(user)
     return {
         'user': {
             'id': user.id,
@@ -136,6 +166,200 @@ def user_activate(*, token: str) -> Dict[str, Any]:
     }
 
 
+PROVISION_COLUMNS = ('username', 'email', 'password', 'first_name', 'last_name', 'role')
+_PROVISION_REQUIRED_COLUMNS = {'username', 'email', 'password'}
+
+
+def _iter_provision_records(source: TextIO) -> Iterable[Tuple[int, Dict]]:
+    """Yield (line number, record) pairs from a provisioning CSV with a header row."""
+    reader = csv.DictReader(source)
+    missing = _PROVISION_REQUIRED_COLUMNS - set(reader.fieldnames or [])
+    if missing:
+        raise BusinessLogicError(f"CSV header is missing required columns: {', '.join(sorted(missing))}.")
+    for record in reader:
+        yield reader.line_num, {key: (value or '').strip() for key, value in record.items() if key}
+
+
+def _first_error(error: DjangoValidationError) -> str:
+    if hasattr(error, 'error_dict'):
+        field, messages = next(iter(error.message_dict.items()))
+        return messages[0] if field == '__all__' else f"{field}: {messages[0]}"
+    return error.messages[0]
+
+
+def _provision_reject(line_no: int, record: Dict, error: str) -> Dict:
+    # The password is never echoed back
+    return {
+        'line': line_no,
+        'error': error,
+        **{column: record.get(column) for column in PROVISION_COLUMNS if column != 'password'},
+    }
+
+
+@traced
+def user_bulk_provision(
+    *,
+    source: TextIO,
+    default_role: str = 'staff',
+    activate: bool = False,
+    dry_run: bool = False,
+    processes: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Create many user accounts from a CSV stream.
+    
+    Rows are validated like registrations (field rules, password strength,
+    duplicates within the file and against existing users, checked with one
+    query). Passwords of the accepted rows are hashed in parallel worker
+    processes, users are inserted with chunked bulk_create and, unless the
+    accounts are activated right away, activation emails are queued with
+    one batched insert. Inserts run in a single transaction.
+    
+    Args:
+        source: CSV text stream with a header naming PROVISION_COLUMNS (role, first_name, last_name optional)
+        default_role: Role for rows without a role column value
+        activate: Create active accounts instead of sending activation emails
+        dry_run: Validate only; hash and insert nothing
+        processes: Hashing processes (see passwords_make_many)
+        
+    Returns:
+        Dictionary with total, created and rejected counts and the rejected rows
+        
+    Raises:
+        BusinessLogicError: If the CSV header is invalid
+        UserAlreadyExistsError: If a concurrent registration took a username or email
+    """
+    chunk_size = getattr(settings, 'PROVISION_CHUNK_SIZE', 500)
+    rejects = []
+    # (line number, record, unsaved user) of rows that passed validation
+    accepted: List[Tuple[int, Dict, CustomUser]] = []
+    usernames = set()
+    emails = set()
+    total = 0
+    
+    for line_no, record in _iter_provision_records(source):
+        total += 1
+        user = CustomUser(
+            username=record.get('username', ''),
+            email=record.get('email', ''),
+            first_name=record.get('first_name', ''),
+            last_name=record.get('last_name', ''),
+            role=record.get('role') or default_role,
+            is_active=activate,
+        )
+        if not user.email:
+            rejects.append(_provision_reject(line_no, record, "email is required."))
+            continue
+        try:
+            user.full_clean(exclude=['password'], validate_unique=False, validate_constraints=False)
+            validate_password_strength(record['password'], user=user)
+        except DjangoValidationError as e:
+            rejects.append(_provision_reject(line_no, record, _first_error(e)))
+            continue
+        
+        email_key = user.email.upper()
+        if user.username in usernames:
+            rejects.append(_provision_reject(line_no, record, "Duplicate username in file."))
+            continue
+        if email_key in emails:
+            rejects.append(_provision_reject(line_no, record, "Duplicate email in file."))
+            continue
+        usernames.add(user.username)
+        emails.add(email_key)
+        accepted.append((line_no, record, user))
+    
+    if accepted:
+        taken = (
+            CustomUser.objects
+            .annotate(email_upper=Upper('email'))
+            .filter(Q(username__in=usernames) | Q(email_upper__in=emails))
+            .values_list('username', 'email_upper')
+        )
+        taken_usernames = set()
+        taken_emails = set()
+        for username, email_upper in taken:
+            taken_usernames.add(username)
+            taken_emails.add(email_upper)
+        
+        remaining = []
+        for line_no, record, user in accepted:
+            if user.username in taken_usernames:
+                error = _UNIQUE_VIOLATION_MESSAGES['username']
+            elif user.email.upper() in taken_emails:
+                error = _UNIQUE_VIOLATION_MESSAGES['email']
+            else:
+                remaining.append((line_no, record, user))
+                continue
+            rejects.append(_provision_reject(line_no, record, error))
+        accepted = remaining
+    
+    created = 0
+    if accepted and not dry_run:
+        # Hash before opening the transaction; this is the slow part
+        hashes = passwords_make_many([record['password'] for _, record, _ in accepted], processes=processes)
+        users = [user for _, _, user in accepted]
+        for user, encoded in zip(users, hashes):
+            user.password = encoded
+        
+        with transaction.atomic():
+            try:
+                users = CustomUser.objects.bulk_create(users, batch_size=chunk_size)
+            except IntegrityError as e:
+                message = _unique_violation_message(e)
+                if message is None:
+                    raise
+                raise UserAlreadyExistsError(message)
+            
+            if not activate:
+                send_activation_emails(((user, _activation_url(user)) for user in users), batch_size=chunk_size)
+        created = len(users)
+    
+    rejects.sort(key=lambda reject: reject['line'])
+    return {
+        'total': total,
+        'created': created,
+        'rejected': len(rejects),
+        'rejects': rejects,
+    }
+
+
+@traced
+def user_provision_write_rejects(*, rejects: List[Dict], destination: TextIO) -> None:
+    """
+    Write rejected provisioning rows as CSV (line, error, original columns except password).
+    
+    Args:
+        rejects: Rejected rows as returned by user_bulk_provision
+        destination: Text stream to write to
+    """
+    columns = [column for column in PROVISION_COLUMNS if column != 'password']
+    writer = csv.DictWriter(destination, fieldnames=['line', 'error', *columns])
+    writer.writeheader()
+    writer.writerows(rejects)
+
+
+@traced
+def users_bulk_activate(*, usernames: List[str]) -> Dict[str, Any]:
+    """
+    Activate many accounts with a single UPDATE.
+    
+    Args:
+        usernames: Usernames to activate; already active accounts are left as they are
+        
+    Returns:
+        Dictionary with the number of activated accounts and usernames that do not exist
+    """
+    usernames = set(usernames)
+    found = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+    activated = CustomUser.objects.filter(username__in=found, is_active=False).update(is_active=True)
+    
+    return {
+        'activated': activated,
+        'not_found': sorted(usernames - found),
+    }
+
+
+@traced
 def user_login(*, username: str, password: str) -> Dict[str, Any]:
     """
     Authenticate user and return JWT tokens.
@@ -151,27 +375,25 @@ def user_login(*, username: str, password: str) -> Dict[str, Any]:
         InvalidCredentialsError: If credentials are invalid
         AccountNotActivatedError: If account is not activated
     """
+    # One lookup serves the activation check and password verification
+    user = user_get_by_login(login=username)
+    
+    if user is None:
+        # Hash anyway so unknown usernames take as long as wrong passwords
+        password_make(password)
+        raise InvalidCredentialsError("Invalid username or password.")
+    
     # If an account exists but is not activated, inform explicitly
-    candidate_user: CustomUser | None = None
-    try:
-        candidate_user = CustomUser.objects.get(username=username)
-    except CustomUser.DoesNotExist:
-        try:
-            candidate_user = CustomUser.objects.get(email=username)
-        except CustomUser.DoesNotExist:
-            candidate_user = None
-
-    if candidate_user and not candidate_user.is_active:
+    if not user.is_active:
         raise AccountNotActivatedError("Account is not activated. Please check your email for activation link.")
-
-    # Authenticate with provided credentials
-    user = authenticate(username=username, password=password)
-
-    if not user:
+    
+    if not password_verify(user, password):
         raise InvalidCredentialsError("Invalid username or password.")
     
+    user_record_login(user=user)
+    
     # Generate JWT tokens
-    refresh = RefreshToken.for_user(user)
+    refresh = UserRefreshToken.for_user(user)
     access = refresh.access_token
     
     # Get user data
@@ -193,6 +415,30 @@ def user_login(*, username: str, password: str) -> Dict[str, Any]:
     }
 
 
+@traced
+def user_record_login(*, user: CustomUser) -> None:
+    """
+    Update last_login, at most once per LAST_LOGIN_UPDATE_INTERVAL per user.
+    
+    Repeated logins within the interval cost no write; concurrent logins
+    after it expires are coalesced by the conditional UPDATE.
+    
+    Args:
+        user: User who logged in
+    """
+    now = timezone.now()
+    threshold = now - settings.LAST_LOGIN_UPDATE_INTERVAL
+    if user.last_login is not None and user.last_login >= threshold:
+        return
+    
+    CustomUser.objects.filter(
+        Q(last_login__isnull=True) | Q(last_login__lt=threshold),
+        id=user.id,
+    ).update(last_login=now)
+    user.last_login = now
+
+
+@traced
 def password_reset_request(*, email: str) -> None:
     """
     Send password reset email.
@@ -221,6 +467,7 @@ def password_reset_request(*, email: str) -> None:
         raise EmailSendingError(f"Failed to send password reset email: {str(e)}")
 
 
+@traced
 @transaction.atomic
 def password_reset_confirm(*, token: str, new_password: str) -> None:
     """
@@ -240,14 +487,33 @@ def password_reset_confirm(*, token: str, new_password: str) -> None:
     user = validate_password_reset_token(token)
     
     # Check if new password is different from current password
-    if user.check_password(new_password):
+    if password_verify(user, new_password):
         raise DjangoValidationError({'new_password': 'New password must be different from your current password.'})
     
     # Validate password strength
     try:
-        validate_password_strength(new_password)
+        validate_password_strength(new_password, user=user)
     except DjangoValidationError as e:
         raise WeakPasswordError(str(e.message_dict.get('password', ['Weak password'])[0]))
     
-    user.set_password(new_password)
+    user.password = password_make(new_password)
     user.save()
+    
+    # Sign out every session that used the old password
+    user_tokens_revoke(user=user)
+
+
+@traced
+def user_tokens_revoke(*, user: CustomUser) -> None:
+    """
+    Revoke all access and refresh tokens issued to a user.
+    
+    Increments the user's token version; tokens carrying an older version
+    are refused by StatelessJWTAuthentication and the refresh endpoint.
+    
+    Args:
+        user: User whose tokens to revoke
+    """
+    CustomUser.objects.filter(id=user.id).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    transaction.on_commit(lambda: token_state_forget(user_id=user.id))
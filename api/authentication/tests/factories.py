@@ -4,7 +4,7 @@ Auth domain test factories.
 import factory
 from django.contrib.auth import get_user_model
 
-from api.models import CustomUser
+from api.authentication.models import CustomUser
 
 User = get_user_model()
 
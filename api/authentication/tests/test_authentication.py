@@ -0,0 +1,98 @@
+"""
+Auth domain JWT authentication tests.
+"""
+from unittest.mock import patch
+
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from api.authentication.authentication import (
+    CachedJWTAuthentication, StatelessJWTAuthentication, TokenPrincipal, token_state_forget
+)
+from api.authentication.services import user_tokens_revoke
+from api.authentication.tests.factories import UserFactory
+from api.authentication.tokens import UserRefreshToken
+
+
+class StatelessJWTAuthenticationTestCase(TestCase):
+    """Test authentication from access-token claims"""
+    
+    def setUp(self):
+        self.user = UserFactory(role='staff')
+        token_state_forget(user_id=self.user.id)
+        self.authentication = StatelessJWTAuthentication()
+    
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.authentication.authenticate(request)
+    
+    def test_principal_is_built_from_claims_without_user_query(self):
+        """Test repeated requests do not load the user row"""
+        access = UserRefreshToken.for_user(self.user).access_token
+        self.authenticate(access)
+        
+        with self.assertNumQueries(0):
+            principal, _ = self.authenticate(access)
+        
+        self.assertIsInstance(principal, TokenPrincipal)
+        self.assertEqual(principal.pk, self.user.id)
+        self.assertEqual(principal.role, 'staff')
+        self.assertTrue(principal.is_authenticated)
+    
+    def test_revoked_token_is_refused(self):
+        """Test tokens issued before a revocation are refused"""
+        access = UserRefreshToken.for_user(self.user).access_token
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            user_tokens_revoke(user=self.user)
+        
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+        
+        principal, _ = self.authenticate(UserRefreshToken.for_user(self.user).access_token)
+        self.assertEqual(principal.token_version, 1)
+    
+    def test_inactive_user_is_refused(self):
+        """Test tokens of a deactivated user are refused"""
+        access = UserRefreshToken.for_user(self.user).access_token
+        self.user.is_active = False
+        self.user.save()
+        token_state_forget(user_id=self.user.id)
+        
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    """Test the verified-token cache"""
+    
+    def setUp(self):
+        self.user = UserFactory()
+        token_state_forget(user_id=self.user.id)
+        self.authentication = CachedJWTAuthentication()
+        self.access = str(UserRefreshToken.for_user(self.user).access_token)
+    
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        return self.authentication.authenticate(request)
+    
+    def test_repeat_requests_skip_signature_verification(self):
+        """Test a cached token is not decoded again"""
+        self.authenticate()
+        
+        with patch('rest_framework_simplejwt.tokens.Token.__init__') as token_init:
+            principal, _ = self.authenticate()
+        
+        token_init.assert_not_called()
+        self.assertEqual(principal.id, self.user.id)
+    
+    def test_revocation_evicts_cached_tokens(self):
+        """Test revoking a user's tokens refuses an already cached token"""
+        self.authenticate()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            user_tokens_revoke(user=self.user)
+        
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
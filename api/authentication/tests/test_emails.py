@@ -0,0 +1,63 @@
+"""
+Auth domain email outbox tests.
+"""
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.authentication.emails import outbox_deliver_batch, send_activation_email
+from api.authentication.models import EmailOutbox
+from api.authentication.tests.factories import UserFactory
+
+
+class EmailOutboxTestCase(TestCase):
+    """Test queueing and background delivery of emails"""
+    
+    def setUp(self):
+        self.user = UserFactory(email='outbox@example.com')
+    
+    def test_send_activation_email_queues_without_sending(self):
+        """Test the request path only writes an outbox row"""
+        send_activation_email(self.user, 'http://localhost/activate?token=abc')
+        
+        self.assertEqual(len(mail.outbox), 0)
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.to_email, 'outbox@example.com')
+        self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+        self.assertIn('token=abc', message.body)
+    
+    def test_deliver_batch_sends_due_messages(self):
+        """Test due messages are sent and marked sent"""
+        send_activation_email(self.user, 'http://localhost/activate?token=abc')
+        later = send_activation_email(self.user, 'http://localhost/activate?token=def')
+        EmailOutbox.objects.filter(id=later.id).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+        
+        counts = outbox_deliver_batch(connection=get_connection())
+        
+        self.assertEqual(counts, {'sent': 1, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 1)
+    
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_delivery_is_retried_with_backoff_then_failed(self):
+        """Test send errors reschedule the message until attempts run out"""
+        message = send_activation_email(self.user, 'http://localhost/activate?token=abc')
+        connection = MagicMock()
+        connection.send_messages.side_effect = OSError('connection refused')
+        
+        counts = outbox_deliver_batch(connection=connection)
+        message.refresh_from_db()
+        self.assertEqual(counts['retried'], 1)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertIn('connection refused', message.last_error)
+        
+        EmailOutbox.objects.filter(id=message.id).update(next_attempt_at=timezone.now())
+        counts = outbox_deliver_batch(connection=connection)
+        message.refresh_from_db()
+        self.assertEqual(counts['failed'], 1)
+        self.assertEqual(message.status, EmailOutbox.STATUS_FAILED)
@@ -0,0 +1,77 @@
+"""
+Auth domain password hashing pool tests.
+"""
+import threading
+
+from django.contrib.auth.hashers import check_password
+from django.test import SimpleTestCase
+
+from api.authentication.hashing import HashingPool, passwords_make_many
+from api.common.exceptions import ServiceBusyError
+
+
+def run_ignoring_busy(pool, fn, *args):
+    try:
+        pool.run(fn, *args)
+    except ServiceBusyError:
+        pass
+
+
+class HashingPoolTestCase(SimpleTestCase):
+    """Test admission control of the hashing pool"""
+    
+    def test_run_returns_result(self):
+        pool = HashingPool(workers=1, max_pending=1, timeout=5)
+        
+        self.assertEqual(pool.run(pow, 2, 10), 1024)
+        self.assertEqual(pool.stats()['completed'], 1)
+        self.assertEqual(pool.stats()['in_flight'], 0)
+    
+    def test_full_queue_is_rejected_with_retry_after(self):
+        pool = HashingPool(workers=1, max_pending=1, timeout=5)
+        release = threading.Event()
+        callers = [threading.Thread(target=pool.run, args=(release.wait,)) for _ in range(2)]
+        for caller in callers:
+            caller.start()
+        while pool.stats()['in_flight'] < 2:
+            pass
+        
+        with self.assertRaises(ServiceBusyError) as cm:
+            pool.run(pow, 2, 10)
+        
+        release.set()
+        for caller in callers:
+            caller.join()
+        self.assertGreaterEqual(cm.exception.wait, 1)
+        self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(pool.stats()['rejected'], 1)
+        self.assertEqual(pool.stats()['max_queue_depth'], 1)
+    
+    def test_timed_out_queued_job_releases_its_slot(self):
+        pool = HashingPool(workers=1, max_pending=1, timeout=0.05)
+        release = threading.Event()
+        blocker = threading.Thread(target=run_ignoring_busy, args=(pool, release.wait, 1))
+        blocker.start()
+        while pool.stats()['in_flight'] < 1:
+            pass
+        
+        with self.assertRaises(ServiceBusyError):
+            pool.run(pow, 2, 10)
+        
+        release.set()
+        blocker.join()
+        pool._executor.shutdown(wait=True)
+        self.assertEqual(pool.stats()['in_flight'], 0)
+
+
+class PasswordsMakeManyTestCase(SimpleTestCase):
+    """Test batch hashing across processes"""
+    
+    def test_hashes_match_inputs_in_order(self):
+        passwords = [f'BulkPass{i}!' for i in range(6)]
+        
+        hashes = passwords_make_many(passwords, processes=2)
+        
+        self.assertEqual(len(hashes), len(passwords))
+        for password, encoded in zip(passwords, hashes):
+            self.assertTrue(check_password(password, encoded))
@@ -0,0 +1,48 @@
+"""
+Auth domain refresh-token revocation tests.
+"""
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from api.authentication.models import RevokedRefreshToken
+from api.authentication.revocation import refresh_token_is_revoked, refresh_token_revoke
+from api.authentication.serializers import VersionedTokenRefreshSerializer
+from api.authentication.tests.factories import UserFactory
+from api.authentication.tokens import UserRefreshToken
+
+
+class RefreshTokenRevocationTestCase(TestCase):
+    """Test rotation and reuse detection of refresh tokens"""
+    
+    def setUp(self):
+        self.user = UserFactory()
+        self.refresh = UserRefreshToken.for_user(self.user)
+    
+    def refresh_with(self, token):
+        serializer = VersionedTokenRefreshSerializer(data={'refresh': str(token)})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+    
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        """Test a refresh token is revoked once rotated"""
+        data = self.refresh_with(self.refresh)
+        
+        self.assertIn('refresh', data)
+        self.assertTrue(refresh_token_is_revoked(jti=self.refresh['jti']))
+        with self.assertRaises(AuthenticationFailed):
+            self.refresh_with(self.refresh)
+        self.assertIn('access', self.refresh_with(data['refresh']))
+    
+    @override_settings(REVOKED_TOKEN_PRUNE_PROBABILITY=0)
+    def test_refresh_is_one_read_and_one_write(self):
+        """Test a valid refresh looks up the user and inserts the revocation only"""
+        refresh_token_is_revoked(jti='warm-up')
+        
+        with self.assertNumQueries(2):
+            self.refresh_with(self.refresh)
+    
+    def test_revoke_reports_conflict(self):
+        """Test revoking twice is detected by the insert"""
+        self.assertTrue(refresh_token_revoke(jti='abc', exp=self.refresh['exp']))
+        self.assertFalse(refresh_token_revoke(jti='abc', exp=self.refresh['exp']))
+        self.assertEqual(RevokedRefreshToken.objects.count(), 1)
@@ -1,14 +1,25 @@
 """
 Auth domain service tests.
 """
-from django.test import TestCase
+import io
+import threading
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
 from unittest.mock import patch, MagicMock
 
 from api.authentication.services import (
     user_register, user_activate, user_login,
-    password_reset_request, password_reset_confirm
+    password_reset_request, password_reset_confirm,
+    user_bulk_provision, users_bulk_activate
 )
+from api.authentication.models import CustomUser, EmailOutbox
+from api.authentication.selectors import user_get_by_login
 from api.authentication.tests.factories import UserFactory, InactiveUserFactory
 from api.common.exceptions import (
     UserAlreadyExistsError, InvalidCredentialsError, AccountNotActivatedError,
@@ -31,7 +42,7 @@ class UserRegisterTestCase(TestCase):
             'last_name': 'User'
         }
         
-        with patch('api.auth.services.send_activation_email') as mock_email:
+        with patch('api.authentication.services.send_activation_email') as mock_email:
             user = user_register(**user_data)
             
             self.assertIsInstance(user, CustomUser)
@@ -73,6 +84,129 @@ class UserRegisterTestCase(TestCase):
             user_register(**user_data)
 
 
+class UserRegisterQueryTestCase(TestCase):
+    """Test registration relies on unique constraints instead of lookups"""
+    
+    def test_user_register_inserts_without_reading_users(self):
+        """Test registration writes the user without existence checks"""
+        with CaptureQueriesContext(connection) as queries:
+            user_register(username='newuser', email='new@example.com', password='TestPass123!')
+        
+        user_queries = [q['sql'] for q in queries.captured_queries if 'api_customuser' in q['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertTrue(user_queries[0].startswith('INSERT'))
+    
+    def test_user_register_with_duplicate_email_in_other_case_raises_error(self):
+        """Test email uniqueness ignores case"""
+        UserFactory(email='existing@example.com')
+        
+        with self.assertRaisesMessage(UserAlreadyExistsError, 'email'):
+            user_register(username='newuser', email='Existing@Example.com', password='TestPass123!')
+    
+    def test_user_register_with_duplicate_username_reports_username(self):
+        """Test the violated constraint picks the error message"""
+        UserFactory(username='existinguser')
+        
+        with self.assertRaisesMessage(UserAlreadyExistsError, 'username'):
+            user_register(username='existinguser', email='new@example.com', password='TestPass123!')
+
+
+class UserRegisterConcurrencyTestCase(TransactionTestCase):
+    """Test concurrent signups for the same account"""
+    
+    def test_concurrent_registrations_create_one_user(self):
+        """Test only one of several simultaneous signups succeeds"""
+        attempts = 4
+        barrier = threading.Barrier(attempts)
+        outcomes = []
+        
+        def register(index):
+            try:
+                barrier.wait()
+                user_register(
+                    username='rushuser',
+                    email=f'rush{index}@example.com',
+                    password='TestPass123!'
+                )
+                outcomes.append('created')
+            except UserAlreadyExistsError:
+                outcomes.append('duplicate')
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=register, args=(i,)) for i in range(attempts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(outcomes), ['created'] + ['duplicate'] * (attempts - 1))
+        self.assertEqual(User.objects.filter(username='rushuser').count(), 1)
+
+
+class UserBulkProvisionTestCase(TestCase):
+    """Test bulk account provisioning from CSV"""
+    
+    HEADER = 'username,email,password,first_name,role\n'
+    
+    def provision(self, rows, **kwargs):
+        return user_bulk_provision(source=io.StringIO(self.HEADER + rows), processes=1, **kwargs)
+    
+    def test_valid_rows_are_created_with_activation_emails(self):
+        result = self.provision(
+            'clerk_one,one@example.com,TestPass123!,Ann,\n'
+            'manager_two,two@example.com,TestPass123!,Bob,admin\n'
+        )
+        
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['rejected'], 0)
+        self.assertEqual(User.objects.get(username='clerk_one').role, 'staff')
+        self.assertEqual(User.objects.get(username='manager_two').role, 'admin')
+        self.assertFalse(User.objects.get(username='clerk_one').is_active)
+        self.assertTrue(User.objects.get(username='clerk_one').check_password('TestPass123!'))
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+    
+    def test_invalid_and_duplicate_rows_are_rejected(self):
+        UserFactory(username='taken', email='taken@example.com')
+        
+        result = self.provision(
+            'taken,fresh@example.com,TestPass123!,,\n'
+            'fresh,Taken@Example.com,TestPass123!,,\n'
+            'weak,weak@example.com,password,,\n'
+            'twice,twice@example.com,TestPass123!,,\n'
+            'twice,other@example.com,TestPass123!,,\n'
+            'bad-name,bad@example.com,TestPass123!,,\n'
+        )
+        
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([reject['line'] for reject in result['rejects']], [2, 3, 4, 6, 7])
+        self.assertNotIn('password', result['rejects'][0])
+    
+    def test_activate_creates_active_users_without_emails(self):
+        result = self.provision('active_one,active@example.com,TestPass123!,,\n', activate=True)
+        
+        self.assertEqual(result['created'], 1)
+        self.assertTrue(User.objects.get(username='active_one').is_active)
+        self.assertEqual(EmailOutbox.objects.count(), 0)
+    
+    def test_dry_run_creates_nothing(self):
+        result = self.provision('dry_one,dry@example.com,TestPass123!,,\n', dry_run=True)
+        
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['rejected'], 0)
+        self.assertFalse(User.objects.filter(username='dry_one').exists())
+    
+    def test_users_bulk_activate_updates_inactive_users(self):
+        InactiveUserFactory(username='pending_one')
+        InactiveUserFactory(username='pending_two')
+        
+        with self.assertNumQueries(2):
+            result = users_bulk_activate(usernames=['pending_one', 'pending_two', 'missing'])
+        
+        self.assertEqual(result, {'activated': 2, 'not_found': ['missing']})
+        self.assertEqual(User.objects.filter(is_active=False).count(), 0)
+
+
 class UserActivateTestCase(TestCase):
     """Test user activation service"""
     
@@ -125,6 +259,66 @@ class UserLoginTestCase(TestCase):
                 user_login(username='testuser', password='testpass123')
 
 
+class UserLoginQueryTestCase(TestCase):
+    """Test the database work done by user login"""
+    
+    def setUp(self):
+        self.user = UserFactory(username='loginuser', email='login@example.com')
+        self.user.password = make_password('TestPass123!')
+        self.user.last_login = timezone.now()
+        self.user.save()
+    
+    def test_user_login_reads_user_once(self):
+        """Test login with a recent last_login runs a single query"""
+        with self.assertNumQueries(1):
+            result = user_login(username='loginuser', password='TestPass123!')
+        
+        self.assertEqual(result['user']['id'], self.user.id)
+    
+    def test_user_login_accepts_email(self):
+        """Test login by email address uses the same lookup"""
+        with self.assertNumQueries(1):
+            result = user_login(username='login@example.com', password='TestPass123!')
+        
+        self.assertEqual(result['user']['username'], 'loginuser')
+    
+    def test_user_login_accepts_email_in_any_case(self):
+        """Test email login ignores case, like the unique constraint on email"""
+        with self.assertNumQueries(1):
+            result = user_login(username='Login@EXAMPLE.com', password='TestPass123!')
+        
+        self.assertEqual(result['user']['username'], 'loginuser')
+    
+    def test_user_login_lookup_uses_email_index(self):
+        """Test the login lookup can use the case-insensitive email index"""
+        with CaptureQueriesContext(connection) as captured:
+            user_get_by_login(login='Login@EXAMPLE.com')
+        
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + captured.captured_queries[-1]['sql'])
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute("RESET enable_seqscan")
+        
+        self.assertIn('api_customuser_email_ci_uniq', plan)
+    
+    def test_user_login_updates_stale_last_login(self):
+        """Test last_login is written once the update interval has passed"""
+        stale = timezone.now() - timedelta(days=1)
+        User.objects.filter(id=self.user.id).update(last_login=stale)
+        
+        with self.assertNumQueries(2):
+            user_login(username='loginuser', password='TestPass123!')
+        
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_login, stale)
+    
+    def test_user_login_with_unknown_user_raises_error(self):
+        """Test unknown usernames fail like wrong passwords"""
+        with self.assertRaises(InvalidCredentialsError):
+            user_login(username='nobody', password='TestPass123!')
+
+
 class PasswordResetTestCase(TestCase):
     """Test password reset services"""
     
@@ -0,0 +1,58 @@
+"""
+Auth domain password validator tests.
+"""
+from django.contrib.auth.password_validation import get_default_password_validators
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from api.authentication.models import CustomUser
+from api.authentication.validators import (
+    PreloadedCommonPasswordValidator, common_passwords_load, validate_password_strength
+)
+
+
+class ValidatePasswordStrengthTestCase(SimpleTestCase):
+    """Test the precompiled password strength rules"""
+    
+    def assertRejected(self, password, message, **kwargs):
+        with self.assertRaises(ValidationError) as context:
+            validate_password_strength(password, **kwargs)
+        self.assertIn(message, context.exception.message_dict['password'])
+    
+    def test_strong_password_passes(self):
+        validate_password_strength('TestPass123!')
+    
+    def test_character_rules_are_reported_together(self):
+        with self.assertRaises(ValidationError) as context:
+            validate_password_strength('short')
+        
+        self.assertEqual(len(context.exception.message_dict['password']), 4)
+    
+    def test_common_password_is_rejected(self):
+        self.assertIn('password1!', common_passwords_load())
+        self.assertRejected('Password1!', "This password is too common.")
+    
+    def test_password_similar_to_username_is_rejected(self):
+        user = CustomUser(username='marathonrunner', email='runner@example.com')
+        
+        self.assertRejected('Marathonrunner1!', "Password is too similar to your account details.", user=user)
+    
+    def test_password_similar_to_email_part_is_rejected(self):
+        user = CustomUser(username='someone', email='zanzibarflyer@example.com')
+        
+        self.assertRejected('Zanzibarflyer9?', "Password is too similar to your account details.", user=user)
+
+
+class PreloadedCommonPasswordValidatorTestCase(SimpleTestCase):
+    """Test the settings validator shares the preloaded list"""
+    
+    def test_validators_share_one_list(self):
+        self.assertTrue(PreloadedCommonPasswordValidator().passwords is common_passwords_load())
+    
+    def test_default_validators_use_preloaded_list(self):
+        validator = next(
+            v for v in get_default_password_validators() if isinstance(v, PreloadedCommonPasswordValidator)
+        )
+        
+        with self.assertRaises(ValidationError):
+            validator.validate('password1!')
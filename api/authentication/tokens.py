@@ -5,6 +5,7 @@ import time
 from django.core import signing
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import RefreshToken
 
 from api.common.exceptions import InvalidTokenError, TokenExpiredError, UserNotFoundError
 
@@ -119,3 +120,20 @@ def validate_password_reset_token(token):
         raise UserNotFoundError("User not found.")
     
     return user
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token embedding the claims StatelessJWTAuthentication relies on.
+    
+    role, is_active and ver (the user's token_version) are copied into every
+    access token derived from it.
+    """
+    
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['is_active'] = user.is_active
+        token['ver'] = user.token_version
+        return token
@@ -13,7 +13,9 @@ from api.authentication.apis import (
     UserMeApi,
     PasswordResetRequestApi,
     PasswordResetConfirmApi,
-    CustomTokenRefreshView
+    CustomTokenRefreshView,
+    UserBulkProvisionApi,
+    UsersBulkActivateApi
 )
 
 @api_view(['GET'])
@@ -34,7 +36,9 @@ def auth_root(request):
             'me': '/api/auth/me/',
             'password_reset': '/api/auth/password-reset/',
             'password_reset_confirm': '/api/auth/password-reset/confirm/',
-            'token_refresh': '/api/auth/token/refresh/'
+            'token_refresh': '/api/auth/token/refresh/',
+            'users_bulk_provision': '/api/auth/users/bulk/',
+            'users_bulk_activate': '/api/auth/users/bulk-activate/'
         }
     })
 
@@ -54,4 +58,8 @@ urlpatterns = [
     
     # Token refresh
     path('token/refresh/', CustomTokenRefreshView.as_view(), name='token-refresh'),
+    
+    # Staff onboarding (admin only)
+    path('users/bulk/', UserBulkProvisionApi.as_view(), name='users-bulk-provision'),
+    path('users/bulk-activate/', UsersBulkActivateApi.as_view(), name='users-bulk-activate'),
 ]
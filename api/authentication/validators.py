@@ -1,30 +1,116 @@
+"""
+Password strength rules.
+
+Everything a check needs is built once per process: the rule patterns are
+compiled at import and the common-password list is loaded into a frozenset by
+AuthenticationConfig.ready(), so validating a password does no I/O.
+"""
 import re
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from django.contrib.auth.password_validation import CommonPasswordValidator, exceeds_maximum_length_ratio
 from django.core.exceptions import ValidationError
 
+MIN_LENGTH = 8
+MAX_SIMILARITY = 0.7
+SIMILARITY_ATTRIBUTES = ('username', 'first_name', 'last_name', 'email')
+
+# (pattern, message) pairs; the password must match every pattern
+_CHARACTER_RULES = [
+    (re.compile(r'[A-Z]'), "Password must contain at least one uppercase letter."),
+    (re.compile(r'[a-z]'), "Password must contain at least one lowercase letter."),
+    (re.compile(r'\d'), "Password must contain at least one number."),
+    (re.compile(r'[!@#$%^&*(),.?":{}|<>]'), "Password must contain at least one special character."),
+]
+_ATTRIBUTE_SEPARATOR = re.compile(r'\W+')
+
+# Loaded lists keyed by path (None for Django's bundled list)
+_common_password_lists: Dict[Optional[str], FrozenSet[str]] = {}
+
+
+def common_passwords_load(path: Optional[str] = None) -> FrozenSet[str]:
+    """
+    Load a common-password list once per process.
+    
+    Args:
+        path: Plain or gzipped list, one lowercased password per line; Django's list by default
+        
+    Returns:
+        Frozen set of the listed passwords
+    """
+    passwords = _common_password_lists.get(path)
+    if passwords is None:
+        validator = CommonPasswordValidator() if path is None else CommonPasswordValidator(password_list_path=path)
+        passwords = _common_password_lists.setdefault(path, frozenset(validator.passwords))
+    return passwords
+
+
+def password_is_common(password: str) -> bool:
+    """Check a password against the preloaded common-password list."""
+    return password.lower().strip() in common_passwords_load()
+
 
-def validate_password_strength(password: str) -> None:
+def password_similar_attribute(password: str, values: Iterable[str]) -> Optional[str]:
+    """
+    Find a user attribute value the password is too similar to.
+    
+    Applies the same rule as Django's UserAttributeSimilarityValidator.
+    
+    Args:
+        password: Candidate password
+        values: Attribute values (username, names, email)
+        
+    Returns:
+        The offending value, or None
+    """
+    password = password.lower()
+    for value in values:
+        if not value:
+            continue
+        value_lower = value.lower()
+        for part in _ATTRIBUTE_SEPARATOR.split(value_lower) + [value_lower]:
+            if exceeds_maximum_length_ratio(password, MAX_SIMILARITY, part):
+                continue
+            if SequenceMatcher(a=password, b=part).quick_ratio() >= MAX_SIMILARITY:
+                return value
+    return None
+
+
+def validate_password_strength(password: str, *, user=None) -> None:
     """
     Validate password strength according to business rules.
     
+    Args:
+        password: Candidate password
+        user: Optional user the password is for, checked for similarity
+    
     Raises:
         ValidationError: If password doesn't meet requirements
     """
     errors = []
     
-    if len(password) < 8:
-        errors.append("Password must be at least 8 characters long.")
-    
-    if not re.search(r'[A-Z]', password):
-        errors.append("Password must contain at least one uppercase letter.")
+    if len(password) < MIN_LENGTH:
+        errors.append(f"Password must be at least {MIN_LENGTH} characters long.")
     
-    if not re.search(r'[a-z]', password):
-        errors.append("Password must contain at least one lowercase letter.")
+    for pattern, message in _CHARACTER_RULES:
+        if not pattern.search(password):
+            errors.append(message)
     
-    if not re.search(r'\d', password):
-        errors.append("Password must contain at least one number.")
+    if password_is_common(password):
+        errors.append("This password is too common.")
     
-    if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
-        errors.append("Password must contain at least one special character.")
+    if user is not None:
+        values = [getattr(user, attribute, None) for attribute in SIMILARITY_ATTRIBUTES]
+        if password_similar_attribute(password, [v for v in values if isinstance(v, str)]):
+            errors.append("Password is too similar to your account details.")
     
     if errors:
         raise ValidationError({'password': errors})
+
+
+class PreloadedCommonPasswordValidator(CommonPasswordValidator):
+    """CommonPasswordValidator sharing the per-process list instead of re-reading it per instance"""
+    
+    def __init__(self, password_list_path: Optional[str] = None):
+        self.passwords = common_passwords_load(password_list_path)
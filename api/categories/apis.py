@@ -9,8 +9,14 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from api.permissions import IsAuthenticatedReadOnly
+from api.common.encoders import DATABASE, EncodedJSON, response_mode, serialize_list
 from api.categories.services import category_create, category_update, category_delete
-from api.categories.selectors import category_list, category_get_by_id
+from api.categories.selectors import (
+    category_list,
+    category_get_by_id,
+    category_list_json,
+    category_get_by_id_json,
+)
 from api.categories.serializers import (
     CategoryOutputSerializer,
     CategoryCreateInputSerializer,
@@ -52,18 +58,22 @@ class CategoryListApi(APIView):
         
         offset = (page - 1) * page_size
         
-        categories, total_count = category_list(
-            limit=page_size,
-            offset=offset
-        )
-        
-        serializer = CategoryOutputSerializer(categories, many=True)
+        filters = {
+            'limit': page_size,
+            'offset': offset,
+        }
+        if response_mode() == DATABASE:
+            results, total_count = category_list_json(serializer_class=CategoryOutputSerializer, **filters)
+            results = EncodedJSON(results)
+        else:
+            categories, total_count = category_list(**filters)
+            results = serialize_list(CategoryOutputSerializer, categories)
         
         response_data = {
             'count': total_count,
             'next': None,
             'previous': None,
-            'results': serializer.data
+            'results': results
         }
         
         if offset + page_size < total_count:
@@ -118,11 +128,15 @@ class CategoryDetailApi(APIView):
     )
     def get(self, request, category_id):
         """Get category details"""
-        category = category_get_by_id(category_id=category_id)
-        serializer = CategoryOutputSerializer(category)
+        if response_mode() == DATABASE:
+            category = EncodedJSON(
+                category_get_by_id_json(category_id=category_id, serializer_class=CategoryOutputSerializer)
+            )
+        else:
+            category = CategoryOutputSerializer(category_get_by_id(category_id=category_id)).data
         return Response(
             {
-                'category': serializer.data
+                'category': category
             },
             status=status.HTTP_200_OK
         )
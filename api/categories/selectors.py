@@ -4,8 +4,13 @@ Category domain selectors using raw SQL queries.
 from typing import List, Dict, Optional, Tuple
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import NotFoundError
+from api.common.json_sql import json_page_params, json_page_sql, json_row_sql
+from api.common.tracing import traced
 
+CATEGORY_COLUMNS = "category_id, name, last_update"
 
+
+@traced
 def category_list(
     *,
     limit: int = 20,
@@ -30,7 +35,7 @@ def category_list(
         
         # Get paginated results
         cursor.execute(
-            "SELECT category_id, name, last_update FROM category ORDER BY name LIMIT %s OFFSET %s",
+            f"SELECT {CATEGORY_COLUMNS} FROM category ORDER BY name LIMIT %s OFFSET %s",
             [limit, offset]
         )
         
@@ -40,6 +45,7 @@ def category_list(
         return categories, total_count
 
 
+@traced
 def category_get_by_id(*, category_id: int) -> Dict:
     """
     Get a single category by ID.
@@ -57,7 +63,7 @@ def category_get_by_id(*, category_id: int) -> Dict:
     
     with conn.cursor() as cursor:
         cursor.execute(
-            "SELECT category_id, name, last_update FROM category WHERE category_id = %s",
+            f"SELECT {CATEGORY_COLUMNS} FROM category WHERE category_id = %s",
             [category_id]
         )
         
@@ -70,6 +76,68 @@ def category_get_by_id(*, category_id: int) -> Dict:
         return dict(zip(columns, row))
 
 
+@traced
+def category_list_json(
+    *,
+    serializer_class,
+    limit: int = 20,
+    offset: int = 0
+) -> Tuple[bytes, int]:
+    """
+    List categories like category_list, rendered as a JSON array by Postgres.
+    
+    Args:
+        serializer_class: Output serializer each category is rendered as
+        limit: Number of records to return
+        offset: Number of records to skip
+        
+    Returns:
+        Tuple of (JSON array bytes, total count)
+    """
+    conn = get_dvdrental_connection()
+    
+    with conn.cursor() as cursor:
+        cursor.execute(
+            json_page_sql(serializer_class, columns=CATEGORY_COLUMNS, table='category', where='', order_by='name'),
+            json_page_params([], limit=limit, offset=offset)
+        )
+        total_count, results = cursor.fetchone()
+        
+        return results.encode(), total_count
+
+
+@traced
+def category_get_by_id_json(*, category_id: int, serializer_class) -> bytes:
+    """
+    Get a single category rendered as a JSON object by Postgres.
+    
+    Args:
+        category_id: Category ID to retrieve
+        serializer_class: Output serializer the category is rendered as
+        
+    Returns:
+        JSON object bytes
+        
+    Raises:
+        NotFoundError: If category not found
+    """
+    conn = get_dvdrental_connection()
+    
+    with conn.cursor() as cursor:
+        cursor.execute(
+            json_row_sql(serializer_class, columns=CATEGORY_COLUMNS, table='category',
+                         where=' WHERE category_id = %s'),
+            [category_id]
+        )
+        row = cursor.fetchone()
+        
+        if not row:
+            raise NotFoundError(f"Category with id {category_id} not found.")
+        
+        return row[0].encode()
+
+
+@traced
 def category_exists(*, category_id: int) -> bool:
     """
     Check if a category exists.
@@ -87,6 +155,7 @@ def category_exists(*, category_id: int) -> bool:
         return cursor.fetchone() is not None
 
 
+@traced
 def category_exists_by_name(*, name: str) -> bool:
     """
     Check if a category with the given name already exists.
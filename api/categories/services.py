@@ -5,9 +5,11 @@ from typing import Dict
 from django.db import transaction
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import NotFoundError, BusinessLogicError
+from api.common.tracing import traced
 from api.categories.selectors import category_exists, category_get_by_id, category_exists_by_name
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def category_create(*, name: str) -> Dict:
     """
@@ -42,6 +44,7 @@ def category_create(*, name: str) -> Dict:
         return dict(zip(columns, row))
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def category_update(*, category_id: int, name: str) -> Dict:
     """
@@ -83,6 +86,7 @@ def category_update(*, category_id: int, name: str) -> Dict:
         return dict(zip(columns, row))
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def category_delete(*, category_id: int) -> None:
     """
@@ -0,0 +1,3 @@
+"""
+Shared utilities used across API domains.
+"""
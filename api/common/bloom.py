@@ -0,0 +1,55 @@
+"""
+Bloom filter for fast negative membership checks.
+"""
+import hashlib
+import math
+import threading
+from typing import Iterable
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+    
+    ``in`` never returns a false negative for added items; false positives
+    occur at roughly error_rate once capacity items have been added, so a
+    positive answer must be confirmed against the authoritative store.
+    
+    Args:
+        capacity: Expected number of items
+        error_rate: Target false-positive rate at capacity
+    """
+    
+    def __init__(self, *, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+    
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    
+    def add(self, item: str) -> None:
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+    
+    def update(self, items: Iterable[str]) -> None:
+        for item in items:
+            self.add(item)
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+    
+    @property
+    def is_saturated(self) -> bool:
+        """True once more than capacity items were added and the error rate exceeds its target."""
+        return self.count > self.capacity
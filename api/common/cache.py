@@ -0,0 +1,87 @@
+"""
+In-process caching utilities.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU mapping whose entries expire after a TTL.
+
+    Used as an in-memory front for lookups that are otherwise backed by the
+    database; every worker process keeps its own instance. Caches given a
+    name report their size and hit rate through cache_stats().
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        if name is not None:
+            _named_caches.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting the least recently used entry when full."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value (expired or not)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def evict(self, predicate: Callable[[Any], bool]) -> int:
+        """Remove all entries whose value matches predicate. Returns the number removed."""
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_named_caches: List[TTLCache] = []
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Size, hits and misses of every named TTLCache in this process."""
+    return {
+        cache.name: {'size': len(cache), 'hits': cache.hits, 'misses': cache.misses}
+        for cache in _named_caches
+    }
@@ -0,0 +1,406 @@
+"""
+Synthetic data generator for the dvdrental_sample database.
+
+Adds films (with category and inventory), customers, rentals and payments on
+top of whatever is loaded, with referentially consistent ids and the shapes
+that matter for query plans:
+
+- popularity skew: films are ranked in a seeded random order and rented with
+  Zipf weights ``1 / rank ** popularity_skew``, spread over their copies;
+- rentals per customer: every customer (existing and new) gets a log-normal
+  activity weight, so a minority of customers accounts for most rentals;
+- seasonal dates: day weights follow a yearly cosine peaking in
+  ``peak_month`` with busier weekends, and rental hours peak in the evening;
+- return lags: most rentals come back within the film's rental_duration,
+  ``late_rate`` of them days late, and recent ones may still be out;
+- payments: ``payment_ratio`` of returned rentals are paid, shortly after the
+  return, for rental_rate plus ``late_fee`` per late day.
+
+The small tables are written by the calling process. Rentals and payments are
+generated in chunks of ``chunk_size`` rentals by worker processes that each
+COPY their chunk over their own connection. Every chunk draws from its own
+random stream derived from (seed, chunk number), so the output depends only
+on the seed, the parameters and the data already present, not on the number
+of workers. Monthly partitions covering the generated dates are created
+first when rental/payment are partitioned.
+
+customer_id and film_id are smallint columns in the sample schema, which
+caps customers and films at 32767 each; scale goes into rentals.
+"""
+import io
+import math
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from api.common.db import get_dvdrental_connection
+from api.common.exceptions import BusinessLogicError
+from api.common.partitioning import PARTITIONED_TABLES, partitions_create_range, table_is_partitioned
+
+SMALLINT_MAX = 32767
+DAY = 86400
+# Latest return: rental_duration (max 7) plus the late tail, plus the payment lag
+_MAX_LATE_DAYS = 30
+_MAX_PAYMENT_LAG_DAYS = 2
+_TAIL_DAYS = 7 + _MAX_LATE_DAYS + _MAX_PAYMENT_LAG_DAYS + 1
+# Rentals still out at the end of the range: within this window, with this probability
+_OPEN_WINDOW_DAYS = 14
+_OPEN_RATE = 0.3
+_LOST_RATE = 0.002
+# Rows per COPY statement inside a chunk
+_COPY_BATCH = 100_000
+_NULL = '\\N'
+
+_WEEKDAY_WEIGHTS = (1.0, 0.95, 0.95, 1.0, 1.2, 1.35, 1.15)  # Monday first
+_HOUR_WEIGHTS = (
+    0.2, 0.1, 0.05, 0.05, 0.05, 0.1, 0.2, 0.4, 0.6, 0.8, 1.0, 1.1,
+    1.2, 1.2, 1.1, 1.1, 1.3, 1.6, 2.0, 2.4, 2.5, 2.2, 1.4, 0.6,
+)
+_HOUR_CUM_WEIGHTS = list(accumulate(_HOUR_WEIGHTS))
+
+_ADJECTIVES = (
+    'ACADEMY', 'AFFAIR', 'ALIEN', 'AMERICAN', 'ANGELS', 'ARMAGEDDON', 'BANGER', 'BLADE', 'BRIDE', 'CHAMPION',
+    'CHICAGO', 'CLUELESS', 'CROSSING', 'DANGEROUS', 'DRAGON', 'EFFECT', 'FANTASY', 'FIDELITY', 'GOLDEN',
+    'GRACELAND', 'HAUNTED', 'IDOLS', 'JEDI', 'LEGEND', 'MIDNIGHT', 'NATURAL', 'PRIDE', 'ROCKY', 'SATURDAY',
+    'SPIRITED', 'TELEGRAPH', 'WESTWARD',
+)
+_NOUNS = (
+    'DINOSAUR', 'PREJUDICE', 'EGG', 'HOBBIT', 'DARKO', 'HORN', 'TRAIN', 'SQUAD', 'WIFE', 'ATTACKS', 'CARRIE',
+    'CONFESSIONS', 'DIVORCE', 'FLATLINERS', 'GALAXY', 'HOURS', 'ISLAND', 'LABYRINTH', 'MOCKINGBIRD', 'NETWORK',
+    'PANTHER', 'RAIDERS', 'SUNSET', 'TOWERS', 'VOYAGE', 'WARS',
+)
+_ROLES = ('Teacher', 'Astronaut', 'Dentist', 'Butler', 'Feminist', 'Squirrel', 'Mad Scientist', 'Robot', 'Cat')
+_PLACES = ('a Shark Tank', 'The Canadian Rockies', 'A Monastery', 'A Baloon Factory', 'Ancient India', 'Nigeria')
+_FIRST_NAMES = ('MARY', 'PATRICIA', 'LINDA', 'BARBARA', 'JOHN', 'ROBERT', 'MICHAEL', 'WILLIAM', 'DAVID', 'JAMES',
+                'SUSAN', 'KAREN', 'NANCY', 'BETTY', 'RICHARD', 'JOSEPH', 'THOMAS', 'CHARLES', 'LISA', 'DANIEL')
+_LAST_NAMES = ('SMITH', 'JOHNSON', 'WILLIAMS', 'JONES', 'BROWN', 'DAVIS', 'MILLER', 'WILSON', 'MOORE', 'TAYLOR',
+               'ANDERSON', 'THOMAS', 'JACKSON', 'WHITE', 'HARRIS', 'MARTIN', 'THOMPSON', 'GARCIA', 'LEE', 'WALKER')
+_RATINGS = ('G', 'PG', 'PG-13', 'R', 'NC-17')
+_RENTAL_RATES = ('0.99', '2.99', '4.99')
+_SPECIAL_FEATURES = ('Trailers', 'Commentaries', 'Deleted Scenes', 'Behind the Scenes')
+
+
+def _chunk_random(seed: int, stream: int) -> random.Random:
+    """Independent, reproducible random stream number stream of seed."""
+    return random.Random(seed * 1_000_003 + stream)
+
+
+def _copy_rows(cursor, table: str, columns: Tuple[str, ...], rows: List[str]) -> None:
+    """COPY tab-separated text lines into table."""
+    if rows:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", io.StringIO(''.join(rows)))
+
+
+def day_cum_weights(*, start: date, days: int, peak_month: int, seasonality: float) -> List[float]:
+    """Cumulative weight per day: yearly cosine around peak_month times the weekday factor."""
+    weights = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        season = 1 + seasonality * math.cos(2 * math.pi * (day.month - peak_month) / 12)
+        weights.append(season * _WEEKDAY_WEIGHTS[day.weekday()])
+    return list(accumulate(weights))
+
+
+def _max_ids(cursor) -> Dict[str, int]:
+    ids = {}
+    for table, column in (('film', 'film_id'), ('inventory', 'inventory_id'), ('customer', 'customer_id'),
+                          ('rental', 'rental_id'), ('payment', 'payment_id')):
+        cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+        ids[table] = cursor.fetchone()[0]
+    return ids
+
+
+def _ids(cursor, query: str) -> List[int]:
+    cursor.execute(query)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _insert_films(cursor, rng: random.Random, *, first_id: int, count: int, inventory_per_film: float,
+                  first_inventory_id: int, store_ids: List[int], language_id: int,
+                  category_ids: List[int]) -> int:
+    """Insert count films with a category and inventory copies. Returns the number of copies."""
+    films, categories, inventory = [], [], []
+    inventory_id = first_inventory_id
+    for film_id in range(first_id, first_id + count):
+        title = f'{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}'
+        description = (
+            f'A {rng.choice(("Epic", "Touching", "Fateful", "Stunning", "Boring"))} '
+            f'{rng.choice(("Drama", "Story", "Saga", "Documentary", "Yarn"))} of a {rng.choice(_ROLES)} '
+            f'And a {rng.choice(_ROLES)} who must {rng.choice(("Fight", "Chase", "Outgun", "Redeem"))} '
+            f'a {rng.choice(_ROLES)} in {rng.choice(_PLACES)}'
+        )
+        features = '{' + ','.join(f'"{f}"' for f in rng.sample(_SPECIAL_FEATURES, rng.randint(1, 3))) + '}'
+        films.append(
+            f'{film_id}\t{title}\t{description}\t{rng.randint(1990, 2010)}\t{language_id}\t{rng.randint(3, 7)}\t'
+            f'{rng.choice(_RENTAL_RATES)}\t{rng.randint(46, 185)}\t{rng.randint(9, 29)}.99\t'
+            f'{rng.choice(_RATINGS)}\t{features}\n'
+        )
+        categories.append(f'{film_id}\t{rng.choice(category_ids)}\n')
+        copies = max(1, round(rng.expovariate(1 / inventory_per_film))) if inventory_per_film > 0 else 0
+        for _ in range(copies):
+            inventory.append(f'{inventory_id}\t{film_id}\t{rng.choice(store_ids)}\n')
+            inventory_id += 1
+
+    _copy_rows(cursor, 'film', ('film_id', 'title', 'description', 'release_year', 'language_id', 'rental_duration',
+                                'rental_rate', 'length', 'replacement_cost', 'rating', 'special_features'), films)
+    _copy_rows(cursor, 'film_category', ('film_id', 'category_id'), categories)
+    _copy_rows(cursor, 'inventory', ('inventory_id', 'film_id', 'store_id'), inventory)
+    return len(inventory)
+
+
+def _insert_customers(cursor, rng: random.Random, *, first_id: int, count: int, start: date,
+                      store_ids: List[int], address_ids: List[int]) -> None:
+    customers = []
+    for customer_id in range(first_id, first_id + count):
+        first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+        created = start - timedelta(days=rng.randint(0, 365))
+        active = 1 if rng.random() < 0.97 else 0
+        customers.append(
+            f'{customer_id}\t{rng.choice(store_ids)}\t{first}\t{last}\t'
+            f'{first.lower()}.{last.lower()}.{customer_id}@sakilacustomer.org\t{rng.choice(address_ids)}\t'
+            f'{"t" if active else "f"}\t{created.isoformat()}\t{active}\n'
+        )
+    _copy_rows(cursor, 'customer', ('customer_id', 'store_id', 'first_name', 'last_name', 'email', 'address_id',
+                                    'activebool', 'create_date', 'active'), customers)
+
+
+def _rental_plan(cursor, *, seed: int, popularity_skew: float, customer_activity_sigma: float) -> Dict:
+    """Inventory/customer sampling tables over all rows now in the database."""
+    rng = _chunk_random(seed, -1)
+    cursor.execute(
+        "SELECT i.inventory_id, i.film_id, i.store_id, f.rental_duration, f.rental_rate "
+        "FROM inventory i JOIN film f ON f.film_id = i.film_id ORDER BY i.inventory_id"
+    )
+    inventory = cursor.fetchall()
+    if not inventory:
+        raise BusinessLogicError("There is no inventory to rent.")
+
+    film_ids = sorted({row[1] for row in inventory})
+    rng.shuffle(film_ids)
+    film_weight = {film_id: 1 / (rank + 1) ** popularity_skew for rank, film_id in enumerate(film_ids)}
+    copies: Dict[int, int] = {}
+    for row in inventory:
+        copies[row[1]] = copies.get(row[1], 0) + 1
+
+    customers = _ids(cursor, "SELECT customer_id FROM customer ORDER BY customer_id")
+    cursor.execute("SELECT store_id, array_agg(staff_id ORDER BY staff_id) FROM staff GROUP BY store_id")
+    staff_by_store = dict(cursor.fetchall())
+    all_staff = sorted(staff_id for staff in staff_by_store.values() for staff_id in staff)
+
+    return {
+        'inventory_ids': [row[0] for row in inventory],
+        'inventory_duration': [row[3] for row in inventory],
+        'inventory_rate': [float(row[4]) for row in inventory],
+        'inventory_staff': [staff_by_store.get(row[2]) or all_staff for row in inventory],
+        'inventory_cum_weights': list(accumulate(film_weight[row[1]] / copies[row[1]] for row in inventory)),
+        'customer_ids': customers,
+        'customer_cum_weights': list(accumulate(rng.lognormvariate(0, customer_activity_sigma) for _ in customers)),
+    }
+
+
+def generate_rental_chunk(plan: Dict, chunk: int) -> Tuple[List[str], List[str]]:
+    """
+    Rental and payment COPY lines of one chunk.
+
+    Rental ids are rental_base + the rental's position in the whole run; a
+    rental's payment reuses that position on top of payment_base.
+    """
+    rng = _chunk_random(plan['seed'], chunk)
+    first = chunk * plan['chunk_size']
+    count = min(plan['chunk_size'], plan['rentals'] - first)
+    day_strings = plan['day_strings']
+    end = plan['days'] * DAY
+    open_from = end - _OPEN_WINDOW_DAYS * DAY
+
+    def timestamp(seconds: float) -> str:
+        day, rest = divmod(seconds, DAY)
+        whole = int(rest)
+        hours, remainder = divmod(whole, 3600)
+        minutes, secs = divmod(remainder, 60)
+        return f'{day_strings[int(day)]} {hours:02d}:{minutes:02d}:{secs:02d}.{int((rest - whole) * 1e6):06d}'
+
+    inventory_index = rng.choices(range(len(plan['inventory_ids'])), cum_weights=plan['inventory_cum_weights'], k=count)
+    customer_ids = rng.choices(plan['customer_ids'], cum_weights=plan['customer_cum_weights'], k=count)
+    days = rng.choices(range(plan['days']), cum_weights=plan['day_cum_weights'], k=count)
+    hours = rng.choices(range(24), cum_weights=_HOUR_CUM_WEIGHTS, k=count)
+
+    rentals, payments = [], []
+    for offset in range(count):
+        index = inventory_index[offset]
+        duration = plan['inventory_duration'][index]
+        rented_at = days[offset] * DAY + hours[offset] * 3600 + rng.random() * 3600
+        staff_id = rng.choice(plan['inventory_staff'][index])
+        position = first + offset + 1
+
+        if (rented_at >= open_from and rng.random() < _OPEN_RATE) or rng.random() < _LOST_RATE:
+            returned_at = None
+        elif rng.random() < plan['late_rate']:
+            late_days = min(rng.expovariate(1 / 3), _MAX_LATE_DAYS)
+            returned_at = rented_at + (duration + late_days) * DAY
+        else:
+            returned_at = rented_at + rng.uniform(0.2, duration) * DAY
+
+        rentals.append(
+            f"{plan['rental_base'] + position}\t{timestamp(rented_at)}\t{plan['inventory_ids'][index]}\t"
+            f"{customer_ids[offset]}\t{timestamp(returned_at) if returned_at is not None else _NULL}\t{staff_id}\n"
+        )
+        if returned_at is not None and rng.random() < plan['payment_ratio']:
+            late = max(0, math.ceil((returned_at - rented_at) / DAY - duration))
+            amount = plan['inventory_rate'][index] + late * plan['late_fee']
+            paid_at = returned_at + rng.random() * _MAX_PAYMENT_LAG_DAYS * DAY
+            payments.append(
+                f"{plan['payment_base'] + position}\t{customer_ids[offset]}\t{staff_id}\t"
+                f"{plan['rental_base'] + position}\t{amount:.2f}\t{timestamp(paid_at)}\n"
+            )
+    return rentals, payments
+
+
+# Set in every worker process by _setup_datagen_process
+_worker_plan: Optional[Dict] = None
+
+
+def _write_rental_chunk(chunk: int) -> Tuple[int, int]:
+    rentals, payments = generate_rental_chunk(_worker_plan, chunk)
+    with transaction.atomic(using='dvdrental_sample'), get_dvdrental_connection().cursor() as cursor:
+        for batch in range(0, len(rentals), _COPY_BATCH):
+            _copy_rows(cursor, 'rental', ('rental_id', 'rental_date', 'inventory_id', 'customer_id', 'return_date',
+                                          'staff_id'), rentals[batch:batch + _COPY_BATCH])
+        for batch in range(0, len(payments), _COPY_BATCH):
+            _copy_rows(cursor, 'payment', ('payment_id', 'customer_id', 'staff_id', 'rental_id', 'amount',
+                                           'payment_date'), payments[batch:batch + _COPY_BATCH])
+    return len(rentals), len(payments)
+
+
+def _setup_datagen_process(plan: Dict) -> None:
+    global _worker_plan
+    import django
+    django.setup()
+    _worker_plan = plan
+
+
+def generate_dvdrental_data(
+    *,
+    seed: int = 0,
+    films: int = 0,
+    customers: int = 0,
+    rentals: int = 0,
+    start: date = date(2008, 1, 1),
+    months: int = 12,
+    inventory_per_film: float = 4.0,
+    popularity_skew: float = 1.0,
+    customer_activity_sigma: float = 0.6,
+    seasonality: float = 0.25,
+    peak_month: int = 7,
+    late_rate: float = 0.2,
+    late_fee: float = 1.0,
+    payment_ratio: float = 0.95,
+    chunk_size: int = 1_000_000,
+    processes: Optional[int] = None,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Generate films, customers, rentals and payments; see the module docstring.
+
+    Args:
+        seed: Random seed; equal seeds on equal databases give equal data
+        films: New films (each with one category and inventory copies)
+        customers: New customers
+        rentals: New rentals, dated from start over months
+        start: First day of the rental dates
+        months: Length of the rental date range
+        inventory_per_film: Mean inventory copies per new film
+        popularity_skew: Zipf exponent of film popularity (0 = uniform)
+        customer_activity_sigma: Spread of the log-normal customer activity
+        seasonality: Relative amplitude of the yearly cycle
+        peak_month: Busiest month (1-12)
+        late_rate: Share of rentals returned after rental_duration
+        late_fee: Fee per late day added to the payment
+        payment_ratio: Share of returned rentals that get a payment
+        chunk_size: Rentals per worker task and transaction
+        processes: Worker processes (default: CPU count)
+        progress: Called with (done chunks, total chunks, payments so far)
+
+    Returns:
+        Number of rows inserted per table
+
+    Raises:
+        BusinessLogicError: If the parameters do not fit the schema
+    """
+    if not 1 <= peak_month <= 12 or months < 1 or chunk_size < 1:
+        raise BusinessLogicError("Invalid date range or chunk size.")
+
+    rng = _chunk_random(seed, -2)
+    conn = get_dvdrental_connection()
+    with transaction.atomic(using='dvdrental_sample'), conn.cursor() as cursor:
+        max_ids = _max_ids(cursor)
+        if max_ids['film'] + films > SMALLINT_MAX or max_ids['customer'] + customers > SMALLINT_MAX:
+            raise BusinessLogicError(
+                f"film_id and customer_id are smallint: at most {SMALLINT_MAX - max_ids['film']} more films "
+                f"and {SMALLINT_MAX - max_ids['customer']} more customers fit."
+            )
+        store_ids = _ids(cursor, "SELECT store_id FROM store ORDER BY store_id")
+        inserted = {'film': films, 'customer': customers}
+        inserted['inventory'] = _insert_films(
+            cursor, rng, first_id=max_ids['film'] + 1, count=films, inventory_per_film=inventory_per_film,
+            first_inventory_id=max_ids['inventory'] + 1, store_ids=store_ids,
+            language_id=_ids(cursor, "SELECT MIN(language_id) FROM language")[0],
+            category_ids=_ids(cursor, "SELECT category_id FROM category ORDER BY category_id"),
+        )
+        _insert_customers(
+            cursor, rng, first_id=max_ids['customer'] + 1, count=customers, start=start, store_ids=store_ids,
+            address_ids=_ids(cursor, "SELECT address_id FROM address ORDER BY address_id"),
+        )
+        plan = _rental_plan(cursor, seed=seed, popularity_skew=popularity_skew,
+                            customer_activity_sigma=customer_activity_sigma)
+
+    month_index = start.year * 12 + start.month - 1 + months
+    end = date(month_index // 12, month_index % 12 + 1, 1)
+    days = (end - start).days
+    plan.update({
+        'seed': seed,
+        'rentals': rentals,
+        'chunk_size': chunk_size,
+        'rental_base': max_ids['rental'],
+        'payment_base': max_ids['payment'],
+        'days': days,
+        'day_strings': [(start + timedelta(days=offset)).isoformat() for offset in range(days + _TAIL_DAYS)],
+        'day_cum_weights': day_cum_weights(start=start, days=days, peak_month=peak_month, seasonality=seasonality),
+        'late_rate': late_rate,
+        'late_fee': late_fee,
+        'payment_ratio': payment_ratio,
+    })
+
+    for table in PARTITIONED_TABLES:
+        if table_is_partitioned(table=table):
+            partitions_create_range(table=table, start=start, end=end + timedelta(days=_TAIL_DAYS))
+
+    chunks = math.ceil(rentals / chunk_size)
+    inserted.update({'rental': 0, 'payment': 0})
+    if chunks:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_setup_datagen_process,
+            initargs=(plan,),
+        ) as executor:
+            futures = [executor.submit(_write_rental_chunk, chunk) for chunk in range(chunks)]
+            for done, future in enumerate(futures, start=1):
+                rental_count, payment_count = future.result()
+                inserted['rental'] += rental_count
+                inserted['payment'] += payment_count
+                if progress is not None:
+                    progress(done, chunks, inserted['payment'])
+
+    with conn.cursor() as cursor:
+        for table, column in (('film', 'film_id'), ('inventory', 'inventory_id'), ('customer', 'customer_id'),
+                              ('rental', 'rental_id'), ('payment', 'payment_id')):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, %s), (SELECT MAX({column}) FROM {table}))",
+                [table, column],
+            )
+    return inserted
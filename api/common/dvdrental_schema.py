@@ -0,0 +1,85 @@
+"""
+Auxiliary schema objects owned by the API inside the dvdrental_sample database.
+
+The sample schema itself is restored by db_init/20_load_dvdrental.sh and is not
+managed by Django migrations. Tables and indexes the API adds on top of it are
+listed here as idempotent DDL and applied with ``manage.py sync_dvdrental_schema``
+(run by entrypoint.sh on every start).
+"""
+from typing import List, Tuple
+
+from api.common.db import get_dvdrental_connection
+
+
+# (name, statement) pairs, applied in order. Every statement must be idempotent.
+DVDRENTAL_DDL: List[Tuple[str, str]] = [
+    (
+        'api_idempotency_key',
+        """
+        CREATE TABLE IF NOT EXISTS api_idempotency_key (
+            key_digest bytea PRIMARY KEY,
+            request_digest bytea NOT NULL,
+            response_status smallint,
+            response_body jsonb,
+            created_at timestamptz NOT NULL DEFAULT NOW(),
+            expires_at timestamptz NOT NULL
+        )
+        """,
+    ),
+    (
+        'api_idempotency_key_expires_at_idx',
+        "CREATE INDEX IF NOT EXISTS api_idempotency_key_expires_at_idx ON api_idempotency_key (expires_at)",
+    ),
+    # Date-range listings. payment/rental are append-mostly and physically ordered
+    # by date, so BRIN indexes stay a few pages large and are cheap to maintain.
+    (
+        'payment_payment_date_brin_idx',
+        "CREATE INDEX IF NOT EXISTS payment_payment_date_brin_idx ON payment USING brin (payment_date)",
+    ),
+    (
+        'rental_rental_date_brin_idx',
+        "CREATE INDEX IF NOT EXISTS rental_rental_date_brin_idx ON rental USING brin (rental_date)",
+    ),
+    # Customer history: equality on customer_id, range/order on the date
+    (
+        'payment_customer_id_payment_date_idx',
+        "CREATE INDEX IF NOT EXISTS payment_customer_id_payment_date_idx ON payment (customer_id, payment_date)",
+    ),
+    (
+        'rental_customer_id_rental_date_idx',
+        "CREATE INDEX IF NOT EXISTS rental_customer_id_rental_date_idx ON rental (customer_id, rental_date)",
+    ),
+    # Per-customer counters maintained by rental/payment services (api/customers/services.py)
+    (
+        'customer_summary',
+        """
+        CREATE TABLE IF NOT EXISTS customer_summary (
+            customer_id integer PRIMARY KEY,
+            rental_count integer NOT NULL DEFAULT 0,
+            open_rental_count integer NOT NULL DEFAULT 0,
+            rental_charges numeric(10,2) NOT NULL DEFAULT 0,
+            payment_count integer NOT NULL DEFAULT 0,
+            lifetime_spend numeric(10,2) NOT NULL DEFAULT 0,
+            updated_at timestamptz NOT NULL DEFAULT NOW()
+        )
+        """,
+    ),
+]
+
+
+def apply_dvdrental_ddl() -> List[str]:
+    """
+    Apply all auxiliary DDL to the dvdrental_sample database.
+
+    Returns:
+        Names of the statements that were executed
+    """
+    conn = get_dvdrental_connection()
+    applied = []
+
+    with conn.cursor() as cursor:
+        for name, statement in DVDRENTAL_DDL:
+            cursor.execute(statement)
+            applied.append(name)
+
+    return applied
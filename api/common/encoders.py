@@ -0,0 +1,282 @@
+"""
+Compiled JSON encoders for output serializers.
+
+The list endpoints run flat output serializers over selector rows, so DRF
+builds a field-by-field representation of every row before the renderer
+encodes it again. compile_encoder() instead generates one Python function
+per serializer class (and row shape) that writes each row straight to JSON
+text, with the same output as ``Serializer(many=True).data`` plus
+JSONRenderer:
+
+* IntegerField -> ``int(value)``; CharField -> ``str(value)``, escaped like
+  the renderer (UNICODE_JSON, U+2028/U+2029);
+* DecimalField -> string quantized with the field's max_digits,
+  decimal_places and rounding (COERCE_DECIMAL_TO_STRING);
+* DateTimeField -> ISO 8601 with ``Z`` in a UTC current timezone;
+* None -> null, like Serializer.to_representation;
+* any other field (ListField, a DateTimeField with a custom format or
+  another timezone, ...) -> its own to_representation, JSON-encoded.
+
+Rows are dicts keyed by field name, or tuples with ``columns`` naming their
+positions (cursor rows, skipping the ``dict(zip(...))`` step).
+
+List APIs opt in through serialize_list(): with ``RESPONSE_MODE =
+'compiled'`` it returns an EncodedJSON fragment that EncodedJSONRenderer
+splices into the response unparsed; otherwise the serializer's ``.data``.
+(``'database'`` has Postgres render the JSON instead; see json_sql.) The
+serializers stay the documented response schema either way.
+"""
+import datetime
+import decimal
+import json
+import threading
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders as drf_encoders
+
+from api.common.tracing import span
+
+SERIALIZER = 'serializer'
+COMPILED = 'compiled'
+DATABASE = 'database'
+
+DECIMAL_CACHE_SIZE = 4096
+
+_encoders: Dict[Tuple[type, Optional[Tuple[str, ...]]], Callable] = {}
+_encoders_lock = threading.Lock()
+
+
+class EncodedJSON:
+    """A finished JSON fragment, written to the response as is by EncodedJSONRenderer."""
+
+    __slots__ = ('content',)
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def __repr__(self) -> str:
+        return f'EncodedJSON({len(self.content)} bytes)'
+
+
+def _json_dumps(value: Any) -> str:
+    """JSON text for value, encoded with the same options as JSONRenderer's compact output."""
+    return json.dumps(
+        value,
+        cls=drf_encoders.JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':'),
+    )
+
+
+def _escape_renderer(text: str) -> str:
+    # JSONRenderer escapes these for JavaScript compatibility
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+def _string_encoder() -> Callable[[str], str]:
+    return json.encoder.encode_basestring if api_settings.UNICODE_JSON else json.encoder.encode_basestring_ascii
+
+
+def _decimal_formatter(field: serializers.DecimalField) -> Callable[[Any], str]:
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    quantum = Decimal('.1') ** field.decimal_places
+    rounding = field.rounding
+    # Money columns repeat a small set of values; remember their formatting
+    formatted: Dict[Any, str] = {}
+
+    def format_decimal(value):
+        text = formatted.get(value)
+        if text is None:
+            number = value if value.__class__ is Decimal else Decimal(str(value).strip())
+            text = '"{:f}"'.format(number.quantize(quantum, rounding=rounding, context=context))
+            if len(formatted) < DECIMAL_CACHE_SIZE:
+                formatted[value] = text
+        return text
+    return format_decimal
+
+
+def _utc_datetime(value) -> str:
+    if value.__class__ is str:
+        return _json_dumps(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return f'"{value.isoformat()}Z"'
+
+
+def _field_timezone(field: serializers.DateTimeField):
+    return field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+
+def _is_utc(tz) -> bool:
+    return tz is datetime.timezone.utc or getattr(tz, 'key', None) == 'UTC'
+
+
+def _generic_formatter(field: serializers.Field) -> Callable[[Any], str]:
+    return lambda value: _json_dumps(field.to_representation(value))
+
+
+def is_utc_iso_datetime(field: serializers.DateTimeField) -> bool:
+    """Whether field renders ISO 8601 in UTC (with ``Z``) in the current timezone."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return isinstance(output_format, str) and output_format.lower() == 'iso-8601' and _is_utc(_field_timezone(field))
+
+
+def _datetime_formatter(field: serializers.DateTimeField) -> Callable[[Any], str]:
+    """Depends on the current timezone, so resolved on every encoder call."""
+    if is_utc_iso_datetime(field):
+        return _utc_datetime
+    return _generic_formatter(field)
+
+
+def _field_formatter(field: serializers.Field) -> Callable[[Any], str]:
+    """Formatter for non-null values of field (not a DateTimeField)."""
+    if isinstance(field, serializers.DecimalField):
+        coerce = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if coerce and not field.localize and field.decimal_places is not None:
+            return _decimal_formatter(field)
+        return _generic_formatter(field)
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.CharField:
+        return _string_encoder()
+    return _generic_formatter(field)
+
+
+def _readable_fields(serializer_class) -> List[Tuple[str, serializers.Field]]:
+    fields = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.BaseSerializer) or field.source in ('*', '') or '.' in field.source:
+            raise ValueError(f"{serializer_class.__name__}.{name}: only flat fields can be compiled")
+        fields.append((name, field))
+    if not fields:
+        raise ValueError(f"{serializer_class.__name__} has no readable fields")
+    return fields
+
+
+def _generate(serializer_class, columns: Optional[Tuple[str, ...]]) -> Tuple[Callable, List[serializers.Field]]:
+    """Source of the row loop for serializer_class, compiled; returns it with the fields in order."""
+    fields = _readable_fields(serializer_class)
+    reads, parts = [], []
+    for index, (name, field) in enumerate(fields):
+        if columns is None:
+            reads.append(f'v{index} = row[{field.source!r}]')
+        else:
+            if field.source not in columns:
+                raise ValueError(f"{serializer_class.__name__}.{name}: column {field.source!r} not in row")
+            reads.append(f'v{index} = row[{columns.index(field.source)}]')
+        key = json.dumps(name).replace('{', '{{').replace('}', '}}')
+        value = f'v{index}'
+        if type(field) is serializers.CharField:
+            # Skip the str() call for values that already are strings
+            value = f'v{index} if v{index}.__class__ is str else str(v{index})'
+        parts.append(f'{key}:{{"null" if v{index} is None else f{index}({value})}}')
+
+    formatter_names = ', '.join(f'f{index}' for index in range(len(fields)))
+    body = '\n'.join(f'        {read}' for read in reads)
+    row = ','.join(parts)
+    source = (
+        f"def encode_rows(rows, formatters):\n"
+        f"    {formatter_names}{',' if len(fields) == 1 else ''} = formatters\n"
+        f"    out = []\n"
+        f"    append = out.append\n"
+        f"    for row in rows:\n"
+        f"{body}\n"
+        f"        append(f'{{{{{row}}}}}')\n"
+        f"    return out\n"
+    )
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, f'<encoder {serializer_class.__qualname__}>', 'exec'), namespace)
+    return namespace['encode_rows'], [field for _, field in fields]
+
+
+def compile_encoder(serializer_class, *, columns: Optional[Sequence[str]] = None) -> Callable[[Sequence], bytes]:
+    """
+    Encoder turning a sequence of rows into the JSON array serializer_class would render.
+
+    Generated once per (serializer class, columns) and cached.
+
+    Args:
+        serializer_class: Flat output serializer (no nested serializers or dotted sources)
+        columns: Column names of tuple rows; None for rows that are dicts
+
+    Returns:
+        Function rows -> JSON bytes
+
+    Raises:
+        ValueError: If the serializer cannot be compiled for these rows
+    """
+    key = (serializer_class, tuple(columns) if columns is not None else None)
+    encoder = _encoders.get(key)
+    if encoder is not None:
+        return encoder
+
+    encode_rows, fields = _generate(serializer_class, key[1])
+    static = [
+        None if isinstance(field, serializers.DateTimeField) else _field_formatter(field)
+        for field in fields
+    ]
+
+    def encoder(rows: Sequence) -> bytes:
+        formatters = [
+            _datetime_formatter(field) if formatter is None else formatter
+            for field, formatter in zip(fields, static)
+        ]
+        text = '[' + ','.join(encode_rows(rows, formatters)) + ']'
+        return _escape_renderer(text).encode()
+
+    with _encoders_lock:
+        return _encoders.setdefault(key, encoder)
+
+
+def rows_to_json(serializer_class, rows: Sequence, *, columns: Optional[Sequence[str]] = None) -> bytes:
+    """JSON bytes of ``serializer_class(rows, many=True).data`` as JSONRenderer would render them."""
+    encoder = compile_encoder(serializer_class, columns=columns)
+    with span(f'{serializer_class.__name__}.encode', rows=len(rows)):
+        return encoder(rows)
+
+
+def response_mode() -> str:
+    """RESPONSE_MODE: 'serializer' (default), 'compiled' or 'database'."""
+    return getattr(settings, 'RESPONSE_MODE', SERIALIZER)
+
+
+def serialize_list(serializer_class, rows: Sequence):
+    """
+    Representation of rows for a list response, depending on RESPONSE_MODE.
+
+    Returns:
+        EncodedJSON in 'compiled' mode, otherwise ``serializer_class(rows, many=True).data``
+    """
+    if response_mode() == COMPILED:
+        return EncodedJSON(rows_to_json(serializer_class, rows))
+    return serializer_class(rows, many=True).data
+
+
+class EncodedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that writes EncodedJSON data, or EncodedJSON values of a
+    top-level dict, without re-encoding them.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, EncodedJSON):
+            return data.content
+        if not isinstance(data, dict) or not any(isinstance(value, EncodedJSON) for value in data.values()):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        parts = []
+        for key, value in data.items():
+            encoded = value.content if isinstance(value, EncodedJSON) else \
+                _escape_renderer(_json_dumps(value)).encode()
+            parts.append(_escape_renderer(_json_dumps(str(key))).encode() + b':' + encoded)
+        return b'{' + b','.join(parts) + b'}'
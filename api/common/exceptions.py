@@ -73,3 +73,22 @@ class NotFoundError(BusinessLogicError):
     status_code = status.HTTP_404_NOT_FOUND
     default_detail = 'Resource not found.'
     default_code = 'not_found'
+
+
+class IdempotencyKeyMismatchError(BusinessLogicError):
+    """Exception raised when an idempotency key is reused with a different payload"""
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'Idempotency-Key has already been used with a different request payload.'
+    default_code = 'idempotency_key_mismatch'
+
+
+class ServiceBusyError(BusinessLogicError):
+    """Exception raised when a bounded worker pool cannot accept more work"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy. Please retry shortly.'
+    default_code = 'service_busy'
+    
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        # Sent as the Retry-After header by DRF's exception handler
+        self.wait = wait
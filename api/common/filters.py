@@ -0,0 +1,62 @@
+"""
+Query parameter parsing shared by list APIs.
+"""
+from datetime import datetime, time, timedelta, timezone
+from typing import Optional, Tuple
+
+from django.utils import timezone as django_timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def _parse_bound(name: str, value: str, *, upper: bool) -> datetime:
+    """
+    Parse an ISO date or datetime query parameter into a naive UTC datetime.
+
+    The dvdrental timestamp columns are ``timestamp without time zone``, so aware
+    values are converted to UTC and made naive. A date-only upper bound covers
+    the whole day.
+    """
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        if django_timezone.is_aware(parsed):
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    try:
+        parsed_date = parse_date(value)
+    except ValueError:
+        parsed_date = None
+    if parsed_date is None:
+        raise ValidationError({name: ['Must be an ISO 8601 date (YYYY-MM-DD) or datetime.']})
+
+    bound = datetime.combine(parsed_date, time.min)
+    return bound + timedelta(days=1) if upper else bound
+
+
+def parse_date_range(query_params) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Parse date_from/date_to query parameters.
+
+    Args:
+        query_params: Request query parameters
+
+    Returns:
+        Tuple of (inclusive lower bound, exclusive upper bound); either may be None
+
+    Raises:
+        ValidationError: If a value is not a date/datetime or the range is inverted
+    """
+    date_from = query_params.get('date_from')
+    date_to = query_params.get('date_to')
+
+    lower = _parse_bound('date_from', date_from, upper=False) if date_from else None
+    upper = _parse_bound('date_to', date_to, upper=True) if date_to else None
+
+    if lower is not None and upper is not None and lower >= upper:
+        raise ValidationError({'date_to': ['Must be later than date_from.']})
+
+    return lower, upper
@@ -0,0 +1,169 @@
+"""
+Idempotency-Key support for retried POST requests.
+
+Keys live in the ``api_idempotency_key`` table of the dvdrental_sample database
+(see api/common/dvdrental_schema.py), fronted by a per-process TTL cache. The key
+row is inserted in the same transaction as the wrapped service call, so:
+
+- a replay of a completed request returns the stored response without running
+  the service again;
+- a concurrent duplicate blocks on the primary key until the first execution
+  commits (and then replays it) or rolls back (and then executes itself);
+- a failed execution leaves no key behind, so the client can retry.
+
+Keys are bound to the operation and the authenticated user, so one user cannot
+replay (or collide with) another user's request by sending the same key.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Callable, Dict, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.response import Response
+
+from api.common.cache import TTLCache
+from api.common.db import get_dvdrental_connection
+from api.common.exceptions import BusinessLogicError, IdempotencyKeyMismatchError
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+_front_cache = TTLCache(
+    maxsize=getattr(settings, 'IDEMPOTENCY_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'IDEMPOTENCY_CACHE_TTL', 300),
+    name='idempotency',
+)
+
+
+def _key_ttl() -> timedelta:
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+
+
+def _digest(value: str) -> bytes:
+    return hashlib.sha256(value.encode('utf-8')).digest()
+
+
+def _request_digest(payload: Dict[str, Any]) -> bytes:
+    return _digest(json.dumps(payload, sort_keys=True, default=str))
+
+
+def _key_owner(request) -> str:
+    user = getattr(request, 'user', None)
+    return str(user.pk) if user is not None and user.is_authenticated else ''
+
+
+def _replay(body: Dict[str, Any], status_code: int) -> Response:
+    return Response(body, status=status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def idempotent_response(
+    request,
+    *,
+    scope: str,
+    payload: Dict[str, Any],
+    handler: Callable[[], Tuple[Dict[str, Any], int]]
+) -> Response:
+    """
+    Run handler at most once per Idempotency-Key and return its response.
+
+    Requests without the header are passed straight through to handler.
+
+    Args:
+        request: DRF request carrying the optional Idempotency-Key header; the key is
+            scoped to its authenticated user
+        scope: Operation name the key is bound to (e.g. 'rentals_create')
+        payload: Validated request data, used to detect key reuse with a different body
+        handler: Callable performing the operation and returning (body, status code)
+
+    Returns:
+        Response with the original or the replayed body
+
+    Raises:
+        BusinessLogicError: If the key is empty or too long
+        IdempotencyKeyMismatchError: If the key was used with a different payload
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        body, status_code = handler()
+        return Response(body, status=status_code)
+
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise BusinessLogicError(f"{IDEMPOTENCY_HEADER} must be between 1 and {MAX_KEY_LENGTH} characters.")
+
+    key_digest = _digest(f"{scope}:{_key_owner(request)}:{key}")
+    request_digest = _request_digest(payload)
+
+    cached = _front_cache.get(key_digest)
+    if cached is not None:
+        cached_request_digest, body, status_code = cached
+        if cached_request_digest != request_digest:
+            raise IdempotencyKeyMismatchError()
+        return _replay(body, status_code)
+
+    ttl = _key_ttl()
+    conn = get_dvdrental_connection()
+
+    with transaction.atomic(using='dvdrental_sample'):
+        with conn.cursor() as cursor:
+            # Claim the key. A live duplicate blocks here until its transaction ends;
+            # an expired key is reclaimed in place.
+            cursor.execute(
+                """
+                INSERT INTO api_idempotency_key (key_digest, request_digest, expires_at)
+                VALUES (%s, %s, NOW() + %s)
+                ON CONFLICT (key_digest) DO UPDATE
+                    SET request_digest = EXCLUDED.request_digest,
+                        response_status = NULL,
+                        response_body = NULL,
+                        created_at = NOW(),
+                        expires_at = EXCLUDED.expires_at
+                    WHERE api_idempotency_key.expires_at < NOW()
+                RETURNING 1
+                """,
+                [key_digest, request_digest, ttl]
+            )
+            claimed = cursor.fetchone() is not None
+
+            if not claimed:
+                cursor.execute(
+                    "SELECT request_digest, response_status, response_body, "
+                    "EXTRACT(EPOCH FROM expires_at - NOW()) FROM api_idempotency_key WHERE key_digest = %s",
+                    [key_digest]
+                )
+                stored_digest, status_code, body, remaining = cursor.fetchone()
+                stored_digest = bytes(stored_digest)
+                if stored_digest != request_digest:
+                    raise IdempotencyKeyMismatchError()
+                if isinstance(body, str):
+                    body = json.loads(body)
+                _front_cache.set(key_digest, (stored_digest, body, status_code), ttl=float(remaining))
+                return _replay(body, status_code)
+
+        body, status_code = handler()
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE api_idempotency_key SET response_status = %s, response_body = %s WHERE key_digest = %s",
+                [status_code, json.dumps(body, default=str), key_digest]
+            )
+
+    _front_cache.set(key_digest, (request_digest, body, status_code), ttl=ttl.total_seconds())
+    return Response(body, status=status_code)
+
+
+def idempotency_keys_purge_expired() -> int:
+    """
+    Delete expired idempotency keys.
+
+    Returns:
+        Number of deleted keys
+    """
+    conn = get_dvdrental_connection()
+
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM api_idempotency_key WHERE expires_at < NOW()")
+        return cursor.rowcount
@@ -0,0 +1,156 @@
+"""
+Per-request SQL instrumentation.
+
+QueryInstrumentationMiddleware installs an execute wrapper on every configured
+database connection (``default`` and ``dvdrental_sample``) for the duration of
+a request and records, per alias, the number of statements, the total time
+spent in the database and the slowest statement. The totals are returned in a
+``Server-Timing`` header (visible in browser dev tools), logged as structured
+fields on the ``api.instrumentation`` logger and compared against the
+``QUERY_BUDGET_COUNT`` / ``QUERY_BUDGET_MS`` budgets; requests over budget are
+logged as warnings.
+
+The stats of the current request are available as ``request.query_stats``.
+COPY (``cursor.copy_expert``) bypasses execute wrappers and is not counted.
+"""
+import logging
+import time
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('api.instrumentation')
+
+SERVER_TIMING_HEADER = 'Server-Timing'
+# Statements are truncated in logs; parameters are never logged
+_SQL_LOG_LENGTH = 300
+
+
+class AliasQueryStats:
+    """Statement count, total time and slowest statement of one connection."""
+
+    __slots__ = ('count', 'seconds', 'slowest_seconds', 'slowest_sql')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_sql: Optional[str] = None
+
+    def record(self, sql: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_sql = sql
+
+
+class RequestQueryStats:
+    """Query statistics of one request, per database alias."""
+
+    def __init__(self, aliases: List[str]):
+        self.aliases = {alias: AliasQueryStats() for alias in aliases}
+
+    def wrapper(self, alias: str) -> Callable:
+        """Return an execute wrapper (see connection.execute_wrapper) recording into alias."""
+        stats = self.aliases[alias]
+
+        def record(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats.record(sql, time.perf_counter() - start)
+
+        return record
+
+    @property
+    def count(self) -> int:
+        return sum(stats.count for stats in self.aliases.values())
+
+    @property
+    def seconds(self) -> float:
+        return sum(stats.seconds for stats in self.aliases.values())
+
+    def slowest(self) -> Optional[AliasQueryStats]:
+        busiest = max(self.aliases.values(), key=lambda stats: stats.slowest_seconds, default=None)
+        return busiest if busiest is not None and busiest.count else None
+
+    def server_timing(self, total_seconds: float) -> str:
+        """Format as a Server-Timing header value (durations in milliseconds)."""
+        metrics = [
+            f'db-{alias};dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'
+            for alias, stats in self.aliases.items() if stats.count
+        ]
+        metrics.append(f'total;dur={total_seconds * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def _budgets() -> Dict[str, float]:
+    return {
+        'count': getattr(settings, 'QUERY_BUDGET_COUNT', 10),
+        'ms': getattr(settings, 'QUERY_BUDGET_MS', 200),
+    }
+
+
+class QueryInstrumentationMiddleware:
+    """Count queries and DB time per request; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.aliases = list(settings.DATABASES)
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', True):
+            return self.get_response(request)
+
+        stats = RequestQueryStats(self.aliases)
+        request.query_stats = stats
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in self.aliases:
+                stack.enter_context(connections[alias].execute_wrapper(stats.wrapper(alias)))
+            response = self.get_response(request)
+        total_seconds = time.perf_counter() - start
+
+        timing = stats.server_timing(total_seconds)
+        existing = response.get(SERVER_TIMING_HEADER)
+        response[SERVER_TIMING_HEADER] = f'{existing}, {timing}' if existing else timing
+
+        self._log(request, response, stats, total_seconds)
+        return response
+
+    def _log(self, request, response, stats: RequestQueryStats, total_seconds: float) -> None:
+        budgets = _budgets()
+        db_ms = stats.seconds * 1000
+        over_budget = stats.count > budgets['count'] or db_ms > budgets['ms']
+        level = logging.WARNING if over_budget else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+
+        slowest = stats.slowest()
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total_seconds * 1000, 1),
+            'queries': stats.count,
+            'db_ms': round(db_ms, 1),
+            'db': {
+                alias: {'queries': alias_stats.count, 'ms': round(alias_stats.seconds * 1000, 1)}
+                for alias, alias_stats in stats.aliases.items()
+            },
+            'slowest_ms': round(slowest.slowest_seconds * 1000, 1) if slowest else 0.0,
+            'slowest_sql': slowest.slowest_sql[:_SQL_LOG_LENGTH] if slowest else None,
+            'over_budget': over_budget,
+        }
+        logger.log(
+            level,
+            "%s %s %s %.1fms queries=%d db=%.1fms%s",
+            request.method, request.path, response.status_code, fields['duration_ms'],
+            stats.count, db_ms, ' over budget' if over_budget else '',
+            extra={'request_stats': fields},
+        )
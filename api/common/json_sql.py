@@ -0,0 +1,107 @@
+"""
+Postgres-side JSON rendering of output serializers.
+
+For ``RESPONSE_MODE = 'database'`` the simple read selectors ask Postgres for
+the finished JSON (``json_build_object`` per row, ``json_agg`` per page) and
+the APIs pass the text through as EncodedJSON without parsing it. The
+object built for a serializer has its fields in order, with the values DRF
+would produce for dvdrental columns:
+
+* IntegerField, BooleanField, ListField -> the column as is;
+* CharField -> ``column::text``;
+* DecimalField -> string rounded to decimal_places (COERCE_DECIMAL_TO_STRING);
+* DateTimeField -> ISO 8601 with microseconds only if non-zero and ``Z``;
+  timestamps are ``timestamp without time zone`` and taken as UTC, like the
+  serializers do with the UTC current timezone.
+
+Whitespace differs from JSONRenderer's compact output and U+2028/U+2029 are
+not escaped; the values are the same.
+"""
+from typing import List, Tuple
+
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from api.common.encoders import is_utc_iso_datetime
+
+_DATETIME_SQL = (
+    "to_char({column}, 'YYYY-MM-DD\"T\"HH24:MI:SS') || "
+    "CASE WHEN to_char({column}, 'US') = '000000' THEN '' ELSE to_char({column}, '.US') END || 'Z'"
+)
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _value_sql(serializer_class, name: str, field: serializers.Field) -> str:
+    column = field.source
+    if not column.isidentifier():
+        raise ValueError(f"{serializer_class.__name__}.{name}: source {column!r} is not a column")
+
+    if isinstance(field, serializers.DateTimeField):
+        if not is_utc_iso_datetime(field):
+            raise ValueError(f"{serializer_class.__name__}.{name}: only ISO 8601 datetimes in UTC are supported")
+        return _DATETIME_SQL.format(column=column)
+    if isinstance(field, serializers.DecimalField):
+        if field.decimal_places is None:
+            return f'{column}::text'
+        rounded = f'round({column}::numeric, {field.decimal_places})'
+        if getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+            return f'{rounded}::text'
+        return rounded
+    if type(field) is serializers.CharField:
+        return f'{column}::text'
+    if type(field) in (serializers.IntegerField, serializers.BooleanField, serializers.ListField):
+        return column
+    raise ValueError(f"{serializer_class.__name__}.{name}: {type(field).__name__} cannot be rendered in SQL")
+
+
+def json_object_sql(serializer_class) -> str:
+    """
+    ``json_build_object(...)`` expression rendering one row as serializer_class would.
+
+    Columns are referenced unqualified, by field source.
+
+    Raises:
+        ValueError: If a field has no SQL rendering
+    """
+    pairs: List[str] = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            raise ValueError(f"{serializer_class.__name__}.{name}: nested serializers are not supported")
+        pairs.append(f'{_literal(name)}, {_value_sql(serializer_class, name, field)}')
+    return f"json_build_object({', '.join(pairs)})"
+
+
+def json_page_sql(serializer_class, *, columns: str, table: str, where: str, order_by: str) -> str:
+    """
+    Query returning ``(count, results JSON text)`` for one page of table.
+
+    Takes the where parameters twice (count, then page) followed by limit and offset.
+
+    Args:
+        serializer_class: Output serializer of one row
+        columns: Columns the page selects (the selector's column list)
+        table: Table to read
+        where: ``" WHERE ..."`` clause or empty
+        order_by: ORDER BY expression over the selected columns
+    """
+    return (
+        f"SELECT (SELECT COUNT(*) FROM {table}{where}), "
+        f"COALESCE((SELECT json_agg({json_object_sql(serializer_class)} ORDER BY {order_by}) "
+        f"FROM (SELECT {columns} FROM {table}{where} ORDER BY {order_by} LIMIT %s OFFSET %s) t), "
+        f"'[]'::json)::text"
+    )
+
+
+def json_row_sql(serializer_class, *, columns: str, table: str, where: str) -> str:
+    """Query returning one row of table as JSON text, or no row."""
+    return f"SELECT {json_object_sql(serializer_class)}::text FROM (SELECT {columns} FROM {table}{where}) t"
+
+
+def json_page_params(params: List, *, limit: int, offset: int) -> Tuple:
+    """Parameters for json_page_sql from the where parameters."""
+    return (*params, *params, limit, offset)
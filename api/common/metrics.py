@@ -0,0 +1,486 @@
+"""
+Prometheus-style metrics shared across gunicorn worker processes.
+
+Every process appends its samples to its own memory-mapped file in
+``METRICS_DIR`` (``<pid>.db``); recording a sample is a dict lookup and a
+float update in the map under a process-local lock, with no system call.
+Histogram observations update a bucket, the sum and the count in one go. ``/metrics`` reads all files and merges them: counters and histograms
+are summed over all files (including those of exited workers, so totals do not
+drop on a worker restart), gauges only over the files of live processes.
+Empty METRICS_DIR on deploy (entrypoint.sh does) to reset the counters.
+
+File layout: an 8-byte header holding the number of used bytes, followed by
+entries of ``uint32 key length, key (JSON [kind, name, labels]), padding to 8
+bytes, float64 value``. Entries are only ever appended, and the header is
+updated after the entry is written, so readers never see a partial entry.
+
+Process-local state (hashing pool, in-process caches) is published by
+snapshot collectors, see register_collector().
+"""
+import bisect
+import hmac
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from api.common.cache import cache_stats
+
+Labels = Tuple[Tuple[str, str], ...]
+
+COUNTER = 'c'
+GAUGE = 'g'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# name -> (type, help) for the exposition; unknown names are exposed as untyped
+METRICS: Dict[str, Tuple[str, str]] = {
+    'api_requests_total': ('counter', 'Requests by operation, method and status code.'),
+    'api_request_duration_seconds': ('histogram', 'Request latency by operation.'),
+    'api_requests_in_flight': ('gauge', 'Requests currently being processed.'),
+    'api_db_queries_total': ('counter', 'SQL statements executed by requests, per database alias.'),
+    'api_db_seconds_total': ('counter', 'Time spent in SQL statements by requests, per database alias.'),
+    'api_db_connections': ('gauge', 'Server connections per database and state (pg_stat_activity).'),
+    'api_hashing_pool': ('gauge', 'Password hashing pool counters per statistic.'),
+    'api_cache_entries': ('gauge', 'Entries in in-process caches.'),
+    'api_cache_requests': ('gauge', 'Lookups of in-process caches by result since process start.'),
+}
+
+_HEADER = struct.Struct('I4x')
+_LENGTH = struct.Struct('I')
+_VALUE = struct.Struct('d')
+_INITIAL_SIZE = 64 * 1024
+
+
+def _padded(length: int) -> int:
+    """Key length padded so the value that follows is 8-byte aligned."""
+    return length + (-(_LENGTH.size + length) % 8)
+
+
+def _iter_entries(data) -> Iterable[Tuple[bytes, float, int]]:
+    """Yield (key, value, value offset) for every entry of a file image."""
+    used = _HEADER.unpack_from(data, 0)[0]
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        key_start = position + _LENGTH.size
+        value_position = key_start + _padded(length)
+        yield bytes(data[key_start:key_start + length]), _VALUE.unpack_from(data, value_position)[0], value_position
+        position = value_position + _VALUE.size
+
+
+class MmapValues:
+    """
+    Append-only mapping of (kind, name, labels) to float64, backed by a memory-mapped file.
+
+    Args:
+        path: File owned by this process
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        # float64 view of the map; values are 8-byte aligned, so index = offset // 8
+        self._values = memoryview(self._map).cast('d')
+        self._indexes: Dict[tuple, int] = {}
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        # A reused pid keeps its file; continue where the previous process stopped
+        for key, _, position in _iter_entries(self._map):
+            kind, name, labels = json.loads(key)
+            self._indexes[(kind, name, tuple(tuple(pair) for pair in labels))] = position // _VALUE.size
+
+    def _index(self, key: tuple) -> int:
+        # Caller holds the lock
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+        encoded = json.dumps([key[0], key[1], key[2]]).encode('utf-8')
+        entry_size = _LENGTH.size + _padded(len(encoded)) + _VALUE.size
+        if self._used + entry_size > len(self._map):
+            new_size = max(len(self._map) * 2, self._used + entry_size)
+            self._values.release()
+            self._map.close()
+            self._file.truncate(new_size)
+            self._map = mmap.mmap(self._file.fileno(), new_size)
+            self._values = memoryview(self._map).cast('d')
+        _LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _LENGTH.size:self._used + _LENGTH.size + len(encoded)] = encoded
+        position = self._used + _LENGTH.size + _padded(len(encoded))
+        _VALUE.pack_into(self._map, position, 0.0)
+        self._used += entry_size
+        _HEADER.pack_into(self._map, 0, self._used)
+        index = self._indexes[key] = position // _VALUE.size
+        return index
+
+    def inc(self, key: tuple, amount: float) -> None:
+        with self._lock:
+            index = self._indexes.get(key) or self._index(key)
+            self._values[index] += amount
+
+    def set(self, key: tuple, value: float) -> None:
+        with self._lock:
+            index = self._indexes.get(key) or self._index(key)
+            self._values[index] = value
+
+    def observe(self, keys: Tuple[tuple, tuple, tuple], value: float) -> None:
+        """Add 1 to keys[0] (bucket), value to keys[1] (sum) and 1 to keys[2] (count)."""
+        bucket, total, count = keys
+        with self._lock:
+            indexes = self._indexes
+            bucket_index = indexes.get(bucket) or self._index(bucket)
+            total_index = indexes.get(total) or self._index(total)
+            count_index = indexes.get(count) or self._index(count)
+            # Read after _index(): growing the file replaces the view
+            values = self._values
+            values[bucket_index] += 1.0
+            values[total_index] += value
+            values[count_index] += 1.0
+
+
+_UNSET = object()
+# This process's store: _UNSET until first use, None when metrics are disabled
+_store = _UNSET
+_store_lock = threading.Lock()
+
+
+def _reset_store_after_fork() -> None:
+    global _store
+    _store = _UNSET
+
+
+os.register_at_fork(after_in_child=_reset_store_after_fork)
+
+
+def metrics_dir() -> str:
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'dvdrental_metrics')
+
+
+def _get_store() -> Optional[MmapValues]:
+    """Open this process's store on first use (i.e. after fork); None when metrics are disabled."""
+    global _store
+    with _store_lock:
+        if _store is _UNSET:
+            store = None
+            if getattr(settings, 'METRICS_ENABLED', True):
+                directory = metrics_dir()
+                os.makedirs(directory, exist_ok=True)
+                store = MmapValues(os.path.join(directory, f'{os.getpid()}.db'))
+            _store = store
+    return _store
+
+
+def counter_inc(name: str, labels: Labels = (), amount: float = 1.0) -> None:
+    """Add amount to a counter."""
+    store = _store if _store is not _UNSET else _get_store()
+    if store is not None:
+        store.inc((COUNTER, name, labels), amount)
+
+
+def gauge_inc(name: str, labels: Labels = (), amount: float = 1.0) -> None:
+    """Add amount (may be negative) to this process's gauge."""
+    store = _store if _store is not _UNSET else _get_store()
+    if store is not None:
+        store.inc((GAUGE, name, labels), amount)
+
+
+def gauge_set(name: str, labels: Labels, value: float) -> None:
+    """Set this process's gauge."""
+    store = _store if _store is not _UNSET else _get_store()
+    if store is not None:
+        store.set((GAUGE, name, labels), value)
+
+
+# (name, labels) -> per-bucket keys (last one +Inf), sum key, count key
+_histogram_keys: Dict[tuple, Tuple[List[tuple], tuple, tuple]] = {}
+
+
+def _histogram_keys_for(name: str, labels: Labels) -> Tuple[List[tuple], tuple, tuple]:
+    keys = _histogram_keys.get((name, labels))
+    if keys is None:
+        bounds = [repr(bound) for bound in DEFAULT_BUCKETS] + ['+Inf']
+        keys = _histogram_keys[(name, labels)] = (
+            [(COUNTER, name + '_bucket', labels + (('le', bound),)) for bound in bounds],
+            (COUNTER, name + '_sum', labels),
+            (COUNTER, name + '_count', labels),
+        )
+    return keys
+
+
+def histogram_observe(name: str, labels: Labels, value: float) -> None:
+    """
+    Record an observation in DEFAULT_BUCKETS.
+
+    Buckets are stored non-cumulatively and summed up in the exposition.
+    """
+    store = _store if _store is not _UNSET else _get_store()
+    if store is None:
+        return
+    buckets, total, count = _histogram_keys.get((name, labels)) or _histogram_keys_for(name, labels)
+    store.observe((buckets[bisect.bisect_left(DEFAULT_BUCKETS, value)], total, count), value)
+
+
+# Snapshot collectors: callables returning (gauge name, labels, value) triples
+_collectors: List[Callable[[], Iterable[Tuple[str, Labels, float]]]] = []
+_last_snapshot = 0.0
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, Labels, float]]]) -> None:
+    """
+    Publish process-local state as gauges.
+
+    Collectors run in every worker at most every METRICS_SNAPSHOT_SECONDS (after
+    a request completes), so the scraping worker sees the values of all workers.
+    """
+    _collectors.append(collector)
+
+
+def collect_snapshots(*, force: bool = False) -> None:
+    """Run the snapshot collectors if the interval has passed."""
+    global _last_snapshot
+    now = time.monotonic()
+    if not force and now - _last_snapshot < getattr(settings, 'METRICS_SNAPSHOT_SECONDS', 5):
+        return
+    _last_snapshot = now
+    for collector in _collectors:
+        for name, labels, value in collector():
+            gauge_set(name, labels, value)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge_files(directory: str) -> Dict[tuple, float]:
+    totals: Dict[tuple, float] = defaultdict(float)
+    for filename in os.listdir(directory):
+        if not filename.endswith('.db'):
+            continue
+        try:
+            pid = int(filename[:-3])
+            with open(os.path.join(directory, filename), 'rb') as source:
+                data = source.read()
+        except (ValueError, OSError):
+            continue
+        if len(data) < _HEADER.size:
+            continue
+        alive = None
+        for key, value, _ in _iter_entries(data):
+            kind, name, labels = json.loads(key)
+            if kind == GAUGE:
+                if alive is None:
+                    alive = _pid_alive(pid)
+                if not alive:
+                    continue
+            totals[(name, tuple(tuple(pair) for pair in labels))] += value
+    return totals
+
+
+def _connection_samples() -> Dict[tuple, float]:
+    """Server connection counts per database and state, read at scrape time."""
+    samples = {}
+    with connections['default'].cursor() as cursor:
+        cursor.execute(
+            "SELECT datname, COALESCE(state, 'unknown'), COUNT(*) FROM pg_stat_activity "
+            "WHERE datname IS NOT NULL GROUP BY 1, 2"
+        )
+        for database, state, count in cursor.fetchall():
+            samples[('api_db_connections', (('database', database), ('state', state)))] = float(count)
+    return samples
+
+
+def _family(name: str) -> str:
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels) + '}'
+
+
+def _bucket_order(bound: str) -> float:
+    return float('inf') if bound == '+Inf' else float(bound)
+
+
+def render_metrics(samples: Dict[tuple, float]) -> str:
+    """
+    Format merged samples in the Prometheus text exposition format.
+
+    Histogram buckets are made cumulative and completed with a +Inf bucket.
+    """
+    families: Dict[str, List[Tuple[str, Labels, float]]] = defaultdict(list)
+    for (name, labels), value in samples.items():
+        families[_family(name)].append((name, labels, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, help_text = METRICS.get(family, ('untyped', ''))
+        if help_text:
+            lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+
+        series = families[family]
+        if kind == 'histogram':
+            buckets: Dict[Labels, List[Tuple[Labels, float]]] = defaultdict(list)
+            others = []
+            for name, labels, value in series:
+                if name.endswith('_bucket'):
+                    base = tuple(pair for pair in labels if pair[0] != 'le')
+                    buckets[base].append((labels, value))
+                else:
+                    others.append((name, labels, value))
+            for base in sorted(buckets):
+                # Every configured bound is listed, including those never hit
+                counts = {repr(bound): 0.0 for bound in DEFAULT_BUCKETS}
+                counts['+Inf'] = 0.0
+                for labels, value in buckets[base]:
+                    bound = dict(labels)['le']
+                    counts[bound] = counts.get(bound, 0.0) + value
+                cumulative = 0.0
+                for bound in sorted(counts, key=_bucket_order):
+                    cumulative += counts[bound]
+                    lines.append(f'{family}_bucket{_format_labels(base + (("le", bound),))} {cumulative:g}')
+            series = others
+
+        for name, labels, value in sorted(series):
+            lines.append(f'{name}{_format_labels(labels)} {value:g}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.
+
+    Requests must send ``Authorization: Bearer <METRICS_TOKEN>``; without a
+    configured token the endpoint refuses every request, since the samples
+    include database names and per-operation traffic.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return HttpResponse('Metrics are disabled: METRICS_TOKEN is not set\n', status=403,
+                            content_type='text/plain')
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+
+    collect_snapshots(force=True)
+    directory = metrics_dir()
+    samples = _merge_files(directory) if os.path.isdir(directory) else {}
+    try:
+        samples.update(_connection_samples())
+    except Exception:
+        # Metrics must stay available while the database is not
+        pass
+    return HttpResponse(render_metrics(samples), content_type=CONTENT_TYPE)
+
+
+_operation_ids: Dict[tuple, str] = {}
+
+
+def _declared_operation_id(schema) -> Optional[str]:
+    """operation_id given to @extend_schema, read from the schema class it generated."""
+    schema_class = schema if isinstance(schema, type) else type(schema)
+    for klass in schema_class.__mro__:
+        method = klass.__dict__.get('get_operation_id')
+        code = getattr(method, '__code__', None)
+        if code is not None and 'operation_id' in code.co_freevars:
+            value = method.__closure__[code.co_freevars.index('operation_id')].cell_contents
+            if value:
+                return value
+    return None
+
+
+def request_operation_id(request) -> str:
+    """
+    The view's operation_id, falling back to the URL name.
+
+    Unresolved paths share one label so scanners cannot blow up the label set.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    key = (match.func, request.method)
+    operation = _operation_ids.get(key)
+    if operation is None:
+        view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+        handler = getattr(view_class, request.method.lower(), None)
+        schema = getattr(handler, 'kwargs', {}).get('schema') or getattr(view_class, 'schema', None)
+        operation = (schema is not None and _declared_operation_id(schema)) or match.view_name or match.route
+        _operation_ids[key] = operation
+    return operation
+
+
+class MetricsMiddleware:
+    """
+    Record request count, latency and DB usage per operation.
+
+    Must come before QueryInstrumentationMiddleware, whose request.query_stats it reads.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        gauge_inc('api_requests_in_flight')
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            gauge_inc('api_requests_in_flight', amount=-1.0)
+        elapsed = time.perf_counter() - start
+
+        operation = request_operation_id(request)
+        counter_inc('api_requests_total', (
+            ('operation', operation), ('method', request.method), ('status', str(response.status_code)),
+        ))
+        histogram_observe('api_request_duration_seconds', (('operation', operation),), elapsed)
+
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            for alias, alias_stats in stats.aliases.items():
+                if alias_stats.count:
+                    counter_inc('api_db_queries_total', (('alias', alias),), alias_stats.count)
+                    counter_inc('api_db_seconds_total', (('alias', alias),), alias_stats.seconds)
+
+        collect_snapshots()
+        return response
+
+
+def _cache_samples() -> Iterable[Tuple[str, Labels, float]]:
+    for name, stats in cache_stats().items():
+        yield 'api_cache_entries', (('cache', name),), stats['size']
+        yield 'api_cache_requests', (('cache', name), ('result', 'hit')), stats['hits']
+        yield 'api_cache_requests', (('cache', name), ('result', 'miss')), stats['misses']
+
+
+register_collector(_cache_samples)
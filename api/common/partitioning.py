@@ -0,0 +1,427 @@
+"""
+Monthly range partitioning for the time-series tables of dvdrental_sample.
+
+``payment`` is partitioned on ``payment_date`` and ``rental`` on ``rental_date``.
+Partitions are named ``<table>_yYYYYmMM`` and cover one calendar month each; a
+``<table>_default`` partition catches rows outside the created range.
+
+Trade-offs of the partitioned layout:
+
+- The primary key becomes (id, partition key), so ``rental_id`` alone is no
+  longer unique at the database level and foreign keys *referencing* a
+  partitioned ``rental`` (payment.rental_id) are dropped. Their ON DELETE
+  action (SET NULL for payment.rental_id) is kept by an AFTER DELETE trigger
+  named after the constraint; inserts and updates of the referencing column
+  are no longer checked by the database, which the services already do.
+- Unique indexes that do not contain the partition key cannot be recreated.
+- Creating a month whose rows already landed in the default partition moves
+  them into the new partition in the same transaction.
+
+Selectors should always pass date bounds on the partition key where they have
+them, so the planner can prune partitions.
+"""
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from api.common.db import get_dvdrental_connection
+from api.common.exceptions import BusinessLogicError
+
+PARTITIONED_TABLES: Dict[str, str] = {
+    'payment': 'payment_date',
+    'rental': 'rental_date',
+}
+
+# Set for the transaction while rows move out of a default partition, so the
+# ON DELETE triggers replacing dropped foreign keys ignore those deletes
+_MOVING_ROWS_SETTING = 'api.partition_moving_rows'
+
+# pg_constraint.confdeltype -> statement run for a deleted referenced row
+_ON_DELETE_ACTIONS = {
+    'n': 'UPDATE {referencing} SET {set_null} WHERE {match};',
+    'd': 'UPDATE {referencing} SET {set_default} WHERE {match};',
+    'c': 'DELETE FROM {referencing} WHERE {match};',
+}
+
+
+def _partition_key(table: str) -> str:
+    try:
+        return PARTITIONED_TABLES[table]
+    except KeyError:
+        raise BusinessLogicError(f"Table '{table}' does not support partitioning.")
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def _is_partitioned(cursor, table: str) -> bool:
+    cursor.execute(
+        "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = 'public' AND c.relname = %s",
+        [table]
+    )
+    row = cursor.fetchone()
+    if not row:
+        raise BusinessLogicError(f"Table '{table}' does not exist.")
+    return row[0] == 'p'
+
+
+def _create_month_partition(cursor, table: str, month: date) -> bool:
+    """
+    Create the partition for month if it is missing. Returns True if created.
+
+    Postgres refuses a new partition while the default partition holds rows
+    for its range, so those rows are moved through a temporary table; callers
+    run this inside a transaction.
+    """
+    name = _partition_name(table, month)
+    cursor.execute("SELECT to_regclass(%s)", [f"public.{name}"])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    key = _partition_key(table)
+    bounds = [month, _add_months(month, 1)]
+    default = f"{table}_default"
+    moving = None
+    cursor.execute("SELECT to_regclass(%s)", [f"public.{default}"])
+    if cursor.fetchone()[0] is not None:
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE "{key}" >= %s AND "{key}" < %s)', bounds)
+        if cursor.fetchone()[0]:
+            moving = f"{name}_moving"
+            cursor.execute("SELECT set_config(%s, 'on', true)", [_MOVING_ROWS_SETTING])
+            cursor.execute(f'CREATE TEMPORARY TABLE "{moving}" (LIKE "{table}") ON COMMIT DROP')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{default}" WHERE "{key}" >= %s AND "{key}" < %s RETURNING *) '
+                f'INSERT INTO "{moving}" SELECT * FROM moved',
+                bounds
+            )
+
+    cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)', bounds)
+
+    if moving:
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{moving}"')
+        cursor.execute(f'DROP TABLE "{moving}"')
+        cursor.execute("SELECT set_config(%s, 'off', true)", [_MOVING_ROWS_SETTING])
+    return True
+
+
+def _quoted(columns: List[str]) -> List[str]:
+    return [f'"{column}"' for column in columns]
+
+
+def _replace_on_delete(cursor, table: str, referencing_table: str, constraint: str, action: str,
+                       columns: List[str], referenced_columns: List[str]) -> None:
+    """
+    Emulate the ON DELETE action of a dropped foreign key referencing table with a row trigger.
+
+    A cross-partition UPDATE is a DELETE plus an INSERT, so the action only
+    runs when no row with the referenced key is left.
+    """
+    match = ' AND '.join(f'{c} = OLD.{r}' for c, r in zip(_quoted(columns), _quoted(referenced_columns)))
+    remaining = ' AND '.join(f'{r} = OLD.{r}' for r in _quoted(referenced_columns))
+    if action in _ON_DELETE_ACTIONS:
+        statement = _ON_DELETE_ACTIONS[action].format(
+            referencing=referencing_table,
+            set_null=', '.join(f'{c} = NULL' for c in _quoted(columns)),
+            set_default=', '.join(f'{c} = DEFAULT' for c in _quoted(columns)),
+            match=match,
+        )
+    else:
+        # NO ACTION / RESTRICT
+        statement = (
+            f"IF EXISTS (SELECT 1 FROM {referencing_table} WHERE {match}) THEN "
+            f"RAISE EXCEPTION USING ERRCODE = 'foreign_key_violation', "
+            f"MESSAGE = 'delete on {table} violates {constraint} of {referencing_table}'; END IF;"
+        )
+    function = f"{constraint}_on_delete"
+    cursor.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION "{function}"() RETURNS trigger LANGUAGE plpgsql AS $body$
+        BEGIN
+            IF current_setting('{_MOVING_ROWS_SETTING}', true) IS DISTINCT FROM 'on'
+               AND NOT EXISTS (SELECT 1 FROM "{table}" WHERE {remaining}) THEN
+                {statement}
+            END IF;
+            RETURN NULL;
+        END
+        $body$
+        """
+    )
+    cursor.execute(f'CREATE TRIGGER "{constraint}" AFTER DELETE ON "{table}" FOR EACH ROW EXECUTE FUNCTION "{function}"()')
+
+
+def partitions_list(*, table: str) -> List[Tuple[str, Optional[date]]]:
+    """
+    List the partitions of a partitioned table.
+
+    Args:
+        table: Partitioned table name
+
+    Returns:
+        List of (partition name, month) ordered by month; month is None for the default partition
+    """
+    _partition_key(table)
+    conn = get_dvdrental_connection()
+    pattern = re.compile(rf"^{table}_y(\d{{4}})m(\d{{2}})$")
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [f"public.{table}"]
+        )
+        partitions = []
+        for (name,) in cursor.fetchall():
+            match = pattern.match(name)
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1) if match else None))
+
+    return sorted(partitions, key=lambda p: (p[1] is not None, p[1] or date.min))
+
+
+@transaction.atomic(using='dvdrental_sample')
+def partition_table_convert(*, table: str, months_ahead: int = 3) -> Dict:
+    """
+    Convert a plain table into a monthly range-partitioned table in place.
+
+    Copies all rows, then recreates indexes, foreign keys, triggers and
+    dependent views on the new parent. Foreign keys referencing the table are
+    dropped and their ON DELETE action replaced by a trigger. Runs in one
+    transaction holding an ACCESS EXCLUSIVE lock on the table; take a backup first.
+
+    Args:
+        table: 'payment' or 'rental'
+        months_ahead: Number of future months to create partitions for
+
+    Returns:
+        Dictionary with the number of partitions created and rows copied
+
+    Raises:
+        BusinessLogicError: If the table is unknown or already partitioned
+    """
+    key = _partition_key(table)
+    old = f"{table}_unpartitioned"
+    conn = get_dvdrental_connection()
+
+    with conn.cursor() as cursor:
+        if _is_partitioned(cursor, table):
+            raise BusinessLogicError(f"Table '{table}' is already partitioned.")
+
+        cursor.execute(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE')
+
+        # Capture everything that does not survive CREATE TABLE ... (LIKE ...)
+        cursor.execute(
+            "SELECT a.attname FROM pg_index i JOIN pg_attribute a "
+            "ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+            "WHERE i.indrelid = %s::regclass AND i.indisprimary",
+            [table]
+        )
+        pk_columns = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            "SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisunique, "
+            "ARRAY(SELECT attname FROM pg_attribute WHERE attrelid = i.indrelid AND attnum = ANY(i.indkey)) "
+            "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = %s::regclass AND NOT i.indisprimary",
+            [table]
+        )
+        indexes = cursor.fetchall()
+
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        own_foreign_keys = cursor.fetchall()
+
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname, confdeltype, "
+            "ARRAY(SELECT a.attname::text FROM unnest(conkey) WITH ORDINALITY k(attnum, n) "
+            "      JOIN pg_attribute a ON a.attrelid = conrelid AND a.attnum = k.attnum ORDER BY k.n), "
+            "ARRAY(SELECT a.attname::text FROM unnest(confkey) WITH ORDINALITY k(attnum, n) "
+            "      JOIN pg_attribute a ON a.attrelid = confrelid AND a.attnum = k.attnum ORDER BY k.n) "
+            "FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        referencing_foreign_keys = cursor.fetchall()
+
+        cursor.execute(
+            "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal",
+            [table]
+        )
+        triggers = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            "SELECT DISTINCT v.oid::regclass::text, pg_get_viewdef(v.oid) "
+            "FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid JOIN pg_class v ON v.oid = r.ev_class "
+            "WHERE d.refobjid = %s::regclass AND v.relkind = 'v'",
+            [table]
+        )
+        views = cursor.fetchall()
+
+        cursor.execute(
+            "SELECT a.attname, pg_get_serial_sequence(%s, a.attname) FROM pg_attribute a "
+            "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped "
+            "AND pg_get_serial_sequence(%s, a.attname) IS NOT NULL",
+            [table, table, table]
+        )
+        sequences = cursor.fetchall()
+
+        cursor.execute(f'SELECT MIN("{key}")::date FROM "{table}"')
+        first_month = _month_start(cursor.fetchone()[0] or date.today())
+
+        # Swap in the partitioned parent
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+        cursor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) '
+            f'PARTITION BY RANGE ("{key}")'
+        )
+        primary_key = [column for column in pk_columns if column != key] + [key]
+        primary_key_columns = ', '.join(f'"{column}"' for column in primary_key)
+        cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY ({primary_key_columns})')
+        for column, sequence in sequences:
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}"."{column}"')
+
+        last_month = _add_months(_month_start(date.today()), months_ahead)
+        month = first_month
+        created = 0
+        while month <= last_month:
+            created += _create_month_partition(cursor, table, month)
+            month = _add_months(month, 1)
+        cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+        copied = cursor.rowcount
+
+        # Re-point dependents, then drop the old heap
+        for view_name, definition in views:
+            cursor.execute(f'CREATE OR REPLACE VIEW {view_name} AS {definition}')
+        for referencing_table, constraint, *_ in referencing_foreign_keys:
+            cursor.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT "{constraint}"')
+        cursor.execute(f'DROP TABLE "{old}"')
+
+        skipped_indexes = []
+        for name, definition, is_unique, columns in indexes:
+            if is_unique and key not in columns:
+                skipped_indexes.append(name)
+                continue
+            cursor.execute(definition)
+        for name, definition in own_foreign_keys:
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        for definition in triggers:
+            cursor.execute(definition)
+        for referencing_table, constraint, action, columns, referenced_columns in referencing_foreign_keys:
+            _replace_on_delete(cursor, table, referencing_table, constraint, action, columns, referenced_columns)
+
+        cursor.execute(f'ANALYZE "{table}"')
+
+    return {
+        'table': table,
+        'partitions_created': created,
+        'rows_copied': copied,
+        'dropped_foreign_keys': [f"{t}.{c}" for t, c, *_ in referencing_foreign_keys],
+        'skipped_indexes': skipped_indexes,
+    }
+
+
+def table_is_partitioned(*, table: str) -> bool:
+    """Whether table has been converted to the partitioned layout."""
+    _partition_key(table)
+    with get_dvdrental_connection().cursor() as cursor:
+        return _is_partitioned(cursor, table)
+
+
+def partitions_create_range(*, table: str, start: date, end: date) -> List[str]:
+    """
+    Ensure monthly partitions exist for every month from start up to end.
+
+    Args:
+        table: Partitioned table name
+        start: First day to cover
+        end: Last day to cover (inclusive)
+
+    Returns:
+        Names of the partitions that were created
+
+    Raises:
+        BusinessLogicError: If the table is not partitioned
+    """
+    _partition_key(table)
+    conn = get_dvdrental_connection()
+    created = []
+
+    with transaction.atomic(using='dvdrental_sample'), conn.cursor() as cursor:
+        if not _is_partitioned(cursor, table):
+            raise BusinessLogicError(f"Table '{table}' is not partitioned. Run manage_partitions --convert first.")
+
+        month = _month_start(start)
+        while month <= end:
+            if _create_month_partition(cursor, table, month):
+                created.append(_partition_name(table, month))
+            month = _add_months(month, 1)
+
+    return created
+
+
+def partitions_create_ahead(*, table: str, months_ahead: int = 3) -> List[str]:
+    """
+    Ensure partitions exist from the current month up to months_ahead.
+
+    Args:
+        table: Partitioned table name
+        months_ahead: Number of future months to cover
+
+    Returns:
+        Names of the partitions that were created
+
+    Raises:
+        BusinessLogicError: If the table is not partitioned
+    """
+    month = _month_start(date.today())
+    return partitions_create_range(table=table, start=month, end=_add_months(month, months_ahead))
+
+
+def partitions_detach_before(*, table: str, before: date, archive_schema: Optional[str] = None) -> List[str]:
+    """
+    Detach monthly partitions whose whole range lies before a date.
+
+    Detached partitions become standalone tables (optionally moved to an
+    archive schema) that can be dumped or dropped independently.
+
+    Args:
+        table: Partitioned table name
+        before: Partitions ending on or before this date are detached
+        archive_schema: Optional schema to move detached partitions into
+
+    Returns:
+        Names of the detached partitions
+    """
+    if archive_schema is not None and not re.match(r'^[a-z_][a-z0-9_]*$', archive_schema):
+        raise BusinessLogicError("Archive schema must be a lowercase SQL identifier.")
+
+    partitions = [
+        name for name, month in partitions_list(table=table)
+        if month is not None and _add_months(month, 1) <= before
+    ]
+    conn = get_dvdrental_connection()
+
+    with transaction.atomic(using='dvdrental_sample'), conn.cursor() as cursor:
+        if archive_schema:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"')
+        for name in partitions:
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+            if archive_schema:
+                cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{archive_schema}"')
+
+    return partitions
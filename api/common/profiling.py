@@ -0,0 +1,258 @@
+"""
+Request profiling.
+
+On demand: an admin obtains a short-lived signed token from
+/api/monitoring/profile-token/ and sends it in the ``X-Profile`` header (or the
+``_profile`` query parameter) of the request to profile. Instead of the normal
+response, ProfilingMiddleware returns the profile as a download:
+
+* ``sample`` (default): a wall-clock stack sampler, returned as collapsed
+  stacks (``.folded``; one ``frame;frame;frame count`` line per stack) for
+  flamegraph.pl or speedscope. Cheap enough for real traffic and includes time
+  spent waiting on the database.
+* ``cprofile``: deterministic cProfile, returned as a pstats ``.prof`` file for
+  snakeviz or ``python -m pstats``. Call counts are exact, timings inflated.
+
+The mode is chosen with ``X-Profile-Mode`` / ``_profile_mode``; the original
+status code is returned in ``X-Profile-Status``.
+
+Background: a ``PROFILE_SAMPLE_RATE`` fraction of all requests runs under the
+stack sampler and the stacks are aggregated per operation into a bounded
+store, readable through /api/monitoring/profiles/. With ``PROFILE_DIR`` set
+every worker writes its store to its own file there, so the endpoint sees all
+workers.
+"""
+import cProfile
+import glob
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.http import HttpResponse
+
+from api.common.metrics import request_operation_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_MODE_HEADER = 'HTTP_X_PROFILE_MODE'
+PROFILE_PARAM = '_profile'
+PROFILE_MODE_PARAM = '_profile_mode'
+SAMPLE = 'sample'
+CPROFILE = 'cprofile'
+MODES = (SAMPLE, CPROFILE)
+
+FILE_PATTERN = 'profiles.{pid}.json'
+OTHER_STACK = '[other]'
+_TOKEN_SALT = 'api.common.profiling'
+
+
+def profile_token_create(*, user_id: int) -> str:
+    """Sign a profiling token for an admin; valid for PROFILE_TOKEN_MAX_AGE seconds."""
+    return signing.dumps({'user_id': user_id}, salt=_TOKEN_SALT)
+
+
+def profile_token_verify(token: str) -> Optional[int]:
+    """Return the user id a token was issued to, or None if it is invalid or expired."""
+    try:
+        payload = signing.loads(token, salt=_TOKEN_SALT, max_age=getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 300))
+    except signing.BadSignature:
+        return None
+    return payload.get('user_id')
+
+
+def _frame_label(frame) -> str:
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}:{frame.f_code.co_name}'.replace(';', ':').replace(' ', '_')
+
+
+def collapse_stack(frame) -> str:
+    """Collapsed-stack representation (root first) of frame and its callers."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def format_folded(stacks: Dict[str, int]) -> str:
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+
+class StackSampler:
+    """Sample the stack of one thread every ``interval`` seconds from a helper thread."""
+
+    def __init__(self, *, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def __enter__(self) -> 'StackSampler':
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class StackStore:
+    """
+    Stacks aggregated per operation, bounded in operations (least recently
+    sampled evicted) and in distinct stacks per operation (overflow counted
+    under ``[other]``).
+    """
+
+    def __init__(self, *, max_operations: int, max_stacks: int):
+        self.max_operations = max_operations
+        self.max_stacks = max_stacks
+        self._data: 'OrderedDict[str, Counter]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, operation: str, stacks: Dict[str, int]) -> None:
+        with self._lock:
+            aggregated = self._data.get(operation)
+            if aggregated is None:
+                aggregated = self._data[operation] = Counter()
+            self._data.move_to_end(operation)
+            for stack, count in stacks.items():
+                if stack in aggregated or len(aggregated) < self.max_stacks:
+                    aggregated[stack] += count
+                else:
+                    aggregated[OTHER_STACK] += count
+            while len(self._data) > self.max_operations:
+                self._data.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {operation: dict(stacks) for operation, stacks in self._data.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_store = StackStore(
+    max_operations=getattr(settings, 'PROFILE_STORE_MAX_OPERATIONS', 200),
+    max_stacks=getattr(settings, 'PROFILE_STORE_MAX_STACKS', 500),
+)
+# cProfile installs a per-thread profile hook; keep to one at a time per process
+_cprofile_lock = threading.Lock()
+
+
+def _write_store() -> None:
+    directory = getattr(settings, 'PROFILE_DIR', '')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.profiles.')
+    with os.fdopen(fd, 'w', encoding='utf-8') as target:
+        json.dump(_store.snapshot(), target)
+    os.replace(tmp_path, os.path.join(directory, FILE_PATTERN.format(pid=os.getpid())))
+
+
+def profile_store_snapshot() -> Dict[str, Dict[str, int]]:
+    """
+    Aggregated background-sampled stacks per operation, merged over all worker
+    files when PROFILE_DIR is set, otherwise this process's store.
+    """
+    directory = getattr(settings, 'PROFILE_DIR', '')
+    if not directory:
+        return _store.snapshot()
+
+    merged: Dict[str, Counter] = {}
+    for path in glob.glob(os.path.join(directory, FILE_PATTERN.format(pid='*'))):
+        try:
+            with open(path, encoding='utf-8') as source:
+                data = json.load(source)
+        except (OSError, ValueError):
+            continue
+        for operation, stacks in data.items():
+            merged.setdefault(operation, Counter()).update(stacks)
+    return {operation: dict(stacks) for operation, stacks in merged.items()}
+
+
+def _sample_interval() -> float:
+    return getattr(settings, 'PROFILE_SAMPLE_INTERVAL_MS', 1) / 1000
+
+
+class ProfilingMiddleware:
+    """Profile single requests on demand and a random sample of all requests; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+        if token:
+            user_id = profile_token_verify(token)
+            if user_id is not None:
+                return self._profile(request, user_id)
+            logger.warning("Ignoring invalid or expired profiling token for %s", request.path)
+
+        rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+        if rate > 0 and random.random() < rate:
+            with StackSampler(interval=_sample_interval()) as sampler:
+                response = self.get_response(request)
+            _store.add(request_operation_id(request), sampler.stacks)
+            try:
+                _write_store()
+            except OSError:
+                logger.exception("Failed to write profile store")
+            return response
+
+        return self.get_response(request)
+
+    def _profile(self, request, user_id: int) -> HttpResponse:
+        mode = request.META.get(PROFILE_MODE_HEADER) or request.GET.get(PROFILE_MODE_PARAM) or SAMPLE
+        if mode not in MODES:
+            mode = SAMPLE
+
+        if mode == CPROFILE and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            finally:
+                _cprofile_lock.release()
+            content = marshal.dumps(pstats.Stats(profiler).stats)
+            content_type, extension = 'application/octet-stream', 'prof'
+        else:
+            mode = SAMPLE
+            with StackSampler(interval=_sample_interval()) as sampler:
+                response = self.get_response(request)
+            content = format_folded(sampler.stacks)
+            content_type, extension = 'text/plain; charset=utf-8', 'folded'
+
+        operation = request_operation_id(request)
+        logger.info("Profiled %s %s (%s) for user %s", request.method, request.path, mode, user_id)
+
+        profile = HttpResponse(content, content_type=content_type)
+        profile['Content-Disposition'] = f'attachment; filename="{operation}-{int(time.time())}.{extension}"'
+        profile['X-Profile-Status'] = str(response.status_code)
+        profile['X-Profile-Mode'] = mode
+        return profile
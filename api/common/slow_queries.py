@@ -0,0 +1,245 @@
+"""
+Slow-query log for the dvdrental_sample database.
+
+A recorder is added to every dvdrental_sample connection when it is created
+(see install()). Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are recorded
+with their fingerprint (SQL with literals and parameters replaced by ``?``),
+parameters, duration and the selector/service function that ran them. Records
+go to an in-process ring buffer and, when ``SLOW_QUERY_DIR`` is set, to a
+per-process rotating JSON-lines file that /api/monitoring/slow-queries/ reads
+back to rank fingerprints across all workers.
+
+A sample of slow SELECTs (``SLOW_QUERY_EXPLAIN_SAMPLE_RATE``, at most once per
+fingerprint every ``SLOW_QUERY_EXPLAIN_INTERVAL`` seconds) is re-run with
+``EXPLAIN (ANALYZE, BUFFERS)`` on a separate connection in a background
+thread, so the request that hit the slow query does not wait for it. Other
+statements are never explained: EXPLAIN ANALYZE executes the statement.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from api.common.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ALIAS = 'dvdrental_sample'
+FILE_PATTERN = 'slow_queries.{pid}.jsonl'
+_PARAMS_LOG_LENGTH = 500
+_CALLER_MODULE = re.compile(r'^api\.\w+\.(selectors|services)$')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Normalize a statement so that executions differing only in values compare equal.
+
+    Literals and placeholders become ``?``, value lists ``(?, ?, ...)`` collapse
+    to ``(?+)`` and whitespace is squeezed.
+    """
+    normalized = _STRING_LITERAL.sub('?', sql)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _VALUE_LIST.sub('(?+)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+def fingerprint_id(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()[:16]
+
+
+def _caller() -> Optional[str]:
+    """Name of the innermost api.<domain>.selectors/services function on the stack."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if _CALLER_MODULE.match(module):
+            return f"{module.split('.')[1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    """Ring buffer plus optional rotating file of slow-statement records."""
+
+    def __init__(self, *, size: int):
+        self.records: deque = deque(maxlen=size)
+        self._handler: Optional[RotatingFileHandler] = None
+        self._handler_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _file_handler(self) -> Optional[RotatingFileHandler]:
+        directory = getattr(settings, 'SLOW_QUERY_DIR', '')
+        if not directory:
+            return None
+        pid = os.getpid()
+        if self._handler_pid != pid:
+            os.makedirs(directory, exist_ok=True)
+            self._handler = RotatingFileHandler(
+                os.path.join(directory, FILE_PATTERN.format(pid=pid)),
+                maxBytes=getattr(settings, 'SLOW_QUERY_FILE_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=getattr(settings, 'SLOW_QUERY_FILE_BACKUPS', 3),
+                encoding='utf-8',
+            )
+            self._handler.setFormatter(logging.Formatter('%(message)s'))
+            self._handler_pid = pid
+        return self._handler
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.records.append(record)
+        with self._lock:
+            handler = self._file_handler()
+        if handler is not None:
+            handler.emit(logging.makeLogRecord({'msg': json.dumps(record, default=str), 'levelno': logging.INFO}))
+
+
+_log = SlowQueryLog(size=getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 500))
+
+# Fingerprints explained recently, so a hot slow query is explained once per interval
+_explained = TTLCache(maxsize=1024, ttl=getattr(settings, 'SLOW_QUERY_EXPLAIN_INTERVAL', 600))
+_explain_queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=16)
+_explain_worker: Optional[threading.Thread] = None
+_explain_lock = threading.Lock()
+
+
+def _explainable(sql: str) -> bool:
+    head = sql.lstrip().lower()
+    if not head.startswith(('select', 'with')):
+        return False
+    # Data-modifying CTEs and locking reads must not be re-executed
+    return not re.search(r'\b(insert|update|delete)\b|\bfor\s+(update|share)\b', head)
+
+
+def _explain(record: Dict[str, Any]) -> None:
+    """Run EXPLAIN (ANALYZE, BUFFERS) for a record on a connection of its own."""
+    connection = connections.create_connection(ALIAS)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SET statement_timeout = %s', [getattr(settings, 'SLOW_QUERY_EXPLAIN_TIMEOUT_MS', 5000)])
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) ' + record['sql'], record['_params'])
+            record['explain'] = '\n'.join(row[0] for row in cursor.fetchall())
+    except Exception as e:
+        record['explain_error'] = str(e)
+    finally:
+        connection.close()
+
+
+def _explain_loop() -> None:
+    while True:
+        record = _explain_queue.get()
+        _explain(record)
+        record.pop('_params', None)
+        _log.add(record)
+
+
+def _submit_explain(record: Dict[str, Any]) -> bool:
+    """Queue a record for EXPLAIN; False if the queue is full."""
+    global _explain_worker
+    with _explain_lock:
+        if _explain_worker is None or not _explain_worker.is_alive():
+            _explain_worker = threading.Thread(target=_explain_loop, name='slow-query-explain', daemon=True)
+            _explain_worker.start()
+    try:
+        _explain_queue.put_nowait(record)
+    except queue.Full:
+        return False
+    return True
+
+
+def _record(sql: str, params, seconds: float) -> None:
+    normalized = fingerprint(sql)
+    record = {
+        'at': time.time(),
+        'fingerprint': fingerprint_id(normalized),
+        'sql': sql,
+        'normalized_sql': normalized,
+        'params': repr(params)[:_PARAMS_LOG_LENGTH] if params is not None else None,
+        'duration_ms': round(seconds * 1000, 2),
+        'caller': _caller(),
+        'pid': os.getpid(),
+    }
+
+    sample_rate = getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1)
+    if (
+        sample_rate > 0
+        and random.random() < sample_rate
+        and _explainable(sql)
+        and _explained.get(record['fingerprint']) is None
+    ):
+        _explained.set(record['fingerprint'], True)
+        # Written to the log by the explain thread once the plan is attached
+        if _submit_explain({**record, '_params': params}):
+            return
+
+    _log.add(record)
+
+
+def slow_query_recorder(execute, sql, params, many, context):
+    """Execute wrapper recording statements over SLOW_QUERY_THRESHOLD_MS."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - start
+        if seconds * 1000 >= getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200) and not many:
+            try:
+                _record(sql, params, seconds)
+            except Exception:
+                logger.exception("Failed to record slow query")
+
+
+def _install_recorder(sender, connection, **kwargs) -> None:
+    # Fires on every (re)connect of the same wrapper; install once. Inserted at
+    # the front so execute_wrapper() context managers, which pop the last
+    # wrapper, keep working when the connection opens inside one.
+    if connection.alias == ALIAS and slow_query_recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_recorder)
+
+
+def install() -> None:
+    """Attach the recorder to dvdrental_sample connections (called from ApiConfig.ready)."""
+    if getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200) > 0:
+        connection_created.connect(_install_recorder, dispatch_uid='slow_query_recorder')
+
+
+def slow_query_records() -> List[Dict[str, Any]]:
+    """
+    All recorded slow statements: the files of every worker if SLOW_QUERY_DIR
+    is set, otherwise this process's ring buffer.
+    """
+    directory = getattr(settings, 'SLOW_QUERY_DIR', '')
+    if not directory:
+        return list(_log.records)
+
+    records = []
+    for path in glob.glob(os.path.join(directory, FILE_PATTERN.format(pid='*') + '*')):
+        try:
+            with open(path, encoding='utf-8') as source:
+                for line in source:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return records
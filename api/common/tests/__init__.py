@@ -0,0 +1,3 @@
+"""
+Common utilities tests package.
+"""
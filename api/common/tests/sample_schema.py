@@ -0,0 +1,111 @@
+"""
+Minimal dvdrental sample tables for tests running against the dvdrental_sample alias.
+
+The test database Django creates for that alias is empty; tests create only
+the columns the code under test touches, then apply the API's own DDL.
+"""
+import json
+
+from django.test.utils import CaptureQueriesContext
+
+from api.common.db import get_dvdrental_connection
+from api.common.dvdrental_schema import apply_dvdrental_ddl
+
+SAMPLE_TABLES = [
+    "CREATE TABLE IF NOT EXISTS customer (customer_id serial PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS staff (staff_id serial PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS film (film_id serial PRIMARY KEY, rental_rate numeric(4,2) NOT NULL DEFAULT 4.99)",
+    "CREATE TABLE IF NOT EXISTS inventory (inventory_id serial PRIMARY KEY, film_id integer NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS payment (
+        payment_id serial PRIMARY KEY,
+        customer_id integer NOT NULL,
+        staff_id integer NOT NULL,
+        rental_id integer,
+        amount numeric(5,2) NOT NULL,
+        payment_date timestamp NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rental (
+        rental_id serial PRIMARY KEY,
+        rental_date timestamp NOT NULL,
+        inventory_id integer NOT NULL,
+        customer_id integer NOT NULL,
+        return_date timestamp,
+        staff_id integer NOT NULL,
+        last_update timestamp NOT NULL DEFAULT NOW()
+    )
+    """,
+]
+
+
+def create_sample_tables(*, rows: int = 0) -> None:
+    """
+    Create the sample tables plus API-owned objects, optionally with date-ordered rows.
+
+    Args:
+        rows: Number of payments and rentals to generate, one per 10 minutes from 2020-01-01
+    """
+    conn = get_dvdrental_connection()
+
+    with conn.cursor() as cursor:
+        for statement in SAMPLE_TABLES:
+            cursor.execute(statement)
+        cursor.execute("INSERT INTO customer SELECT g FROM generate_series(1, 599) AS g ON CONFLICT DO NOTHING")
+        cursor.execute("INSERT INTO staff SELECT g FROM generate_series(1, 2) AS g ON CONFLICT DO NOTHING")
+        cursor.execute(
+            "INSERT INTO film (film_id, rental_rate) SELECT g, (g % 3) * 2 + 0.99 FROM generate_series(1, 1000) AS g "
+            "ON CONFLICT DO NOTHING"
+        )
+        cursor.execute(
+            "INSERT INTO inventory (inventory_id, film_id) SELECT g, g % 1000 + 1 FROM generate_series(1, 4581) AS g "
+            "ON CONFLICT DO NOTHING"
+        )
+        if rows:
+            cursor.execute(
+                """
+                INSERT INTO rental (rental_date, inventory_id, customer_id, return_date, staff_id)
+                SELECT TIMESTAMP '2020-01-01' + g * INTERVAL '10 minutes', g %% 4500 + 1, g %% 599 + 1,
+                       TIMESTAMP '2020-01-03' + g * INTERVAL '10 minutes', g %% 2 + 1
+                FROM generate_series(1, %s) AS g
+                """,
+                [rows]
+            )
+            cursor.execute(
+                """
+                INSERT INTO payment (customer_id, staff_id, rental_id, amount, payment_date)
+                SELECT g %% 599 + 1, g %% 2 + 1, g, (g %% 10) + 0.99, TIMESTAMP '2020-01-01' + g * INTERVAL '10 minutes'
+                FROM generate_series(1, %s) AS g
+                """,
+                [rows]
+            )
+            cursor.execute("ANALYZE payment")
+            cursor.execute("ANALYZE rental")
+
+    apply_dvdrental_ddl()
+
+
+def explain_last_query(selector, **kwargs) -> str:
+    """
+    Run selector, then EXPLAIN the last SQL statement it executed with sequential scans disabled.
+
+    Disabling sequential scans makes the planner pick an index whenever the
+    predicate shape allows one, so the test checks index usability rather than
+    cost estimates on a small table.
+
+    Returns:
+        The plan as a JSON string
+    """
+    conn = get_dvdrental_connection()
+
+    with CaptureQueriesContext(conn) as captured:
+        selector(**kwargs)
+
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + captured.captured_queries[-1]['sql'])
+        plan = cursor.fetchone()[0]
+        cursor.execute("RESET enable_seqscan")
+
+    return plan if isinstance(plan, str) else json.dumps(plan)
@@ -0,0 +1,32 @@
+"""
+Common Bloom filter tests.
+"""
+from django.test import SimpleTestCase
+
+from api.common.bloom import BloomFilter
+
+
+class BloomFilterTestCase(SimpleTestCase):
+    """Test the Bloom filter"""
+
+    def test_added_items_are_always_found(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        bloom.update(items)
+
+        self.assertTrue(all(item in bloom for item in items))
+        self.assertFalse(bloom.is_saturated)
+
+    def test_false_positive_rate_is_near_target(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        bloom.update(f"jti-{i}" for i in range(1000))
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+
+        self.assertLess(false_positives / 10000, 0.03)
+
+    def test_saturation_is_reported(self):
+        bloom = BloomFilter(capacity=10)
+        bloom.update(str(i) for i in range(11))
+
+        self.assertTrue(bloom.is_saturated)
@@ -0,0 +1,55 @@
+"""
+Common cache utility tests.
+"""
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from api.common.cache import TTLCache
+
+
+class TTLCacheTestCase(SimpleTestCase):
+    """Test the in-process TTL cache"""
+
+    def test_get_returns_stored_value(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('missing'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        with patch('api.common.cache.time.monotonic', return_value=100.0):
+            cache.set('a', 1, ttl=10)
+        with patch('api.common.cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_per_entry_ttl_is_capped_by_cache_ttl(self):
+        cache = TTLCache(maxsize=2, ttl=5)
+        with patch('api.common.cache.time.monotonic', return_value=100.0):
+            cache.set('a', 1, ttl=3600)
+        with patch('api.common.cache.time.monotonic', return_value=106.0):
+            self.assertIsNone(cache.get('a'))
+
+    def test_evict_removes_matching_entries(self):
+        cache = TTLCache(maxsize=3, ttl=60)
+        cache.set('a', {'user_id': 1})
+        cache.set('b', {'user_id': 2})
+        cache.set('c', {'user_id': 1})
+
+        self.assertEqual(cache.evict(lambda value: value['user_id'] == 1), 2)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get('b'), {'user_id': 2})
@@ -0,0 +1,91 @@
+"""
+Common synthetic data generator tests.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from django.test import SimpleTestCase
+
+from api.common import datagen
+from api.common.datagen import day_cum_weights, generate_rental_chunk
+
+
+def make_plan(**overrides):
+    start = date(2008, 1, 1)
+    days = 366
+    plan = {
+        'seed': 7,
+        'rentals': 5000,
+        'chunk_size': 2000,
+        'rental_base': 16049,
+        'payment_base': 32098,
+        'days': days,
+        'day_strings': [(start + timedelta(days=offset)).isoformat() for offset in range(days + datagen._TAIL_DAYS)],
+        'day_cum_weights': day_cum_weights(start=start, days=days, peak_month=7, seasonality=0.25),
+        'late_rate': 0.2,
+        'late_fee': 1.0,
+        'payment_ratio': 0.95,
+        'inventory_ids': [1, 2, 3, 4],
+        'inventory_duration': [3, 3, 5, 7],
+        'inventory_rate': [0.99, 0.99, 2.99, 4.99],
+        'inventory_staff': [[1], [1], [2], [2]],
+        'inventory_cum_weights': list(accumulate([0.5, 0.5, 0.25, 1 / 16])),
+        'customer_ids': [1, 2, 3],
+        'customer_cum_weights': [1.0, 1.5, 5.0],
+    }
+    plan.update(overrides)
+    return plan
+
+
+def parse(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f')
+
+
+class DatagenTestCase(SimpleTestCase):
+    """Test rental/payment chunk generation"""
+
+    def test_chunks_are_reproducible_and_independent(self):
+        plan = make_plan()
+
+        self.assertEqual(generate_rental_chunk(plan, 1), generate_rental_chunk(plan, 1))
+        self.assertNotEqual(generate_rental_chunk(plan, 0)[0], generate_rental_chunk(plan, 1)[0])
+        self.assertNotEqual(generate_rental_chunk(make_plan(seed=8), 1), generate_rental_chunk(plan, 1))
+
+    def test_ids_follow_position_in_run(self):
+        plan = make_plan()
+
+        rentals = [line.split('\t') for chunk in range(3) for line in generate_rental_chunk(plan, chunk)[0]]
+
+        self.assertEqual([int(r[0]) for r in rentals], list(range(16050, 16050 + 5000)))
+
+    def test_rows_are_consistent(self):
+        rentals, payments = generate_rental_chunk(make_plan(), 0)
+        rentals = {int(r[0]): r for r in (line.rstrip('\n').split('\t') for line in rentals)}
+        payments = [line.rstrip('\n').split('\t') for line in payments]
+
+        self.assertGreater(len(payments), 0.8 * len(rentals))
+        for payment_id, customer_id, staff_id, rental_id, amount, paid_at in payments:
+            rental = rentals[int(rental_id)]
+            self.assertEqual(int(payment_id) - 32098, int(rental_id) - 16049)
+            self.assertEqual(customer_id, rental[3])
+            self.assertEqual(staff_id, rental[5])
+            self.assertNotEqual(rental[4], r'\N')
+            self.assertLessEqual(parse(rental[1]), parse(rental[4]))
+            self.assertLessEqual(parse(rental[4]), parse(paid_at))
+            self.assertGreaterEqual(float(amount), 0.99)
+
+    def test_popularity_and_activity_skew(self):
+        rentals = [line.split('\t') for line in generate_rental_chunk(make_plan(), 0)[0]]
+
+        by_inventory = Counter(r[2] for r in rentals)
+        by_customer = Counter(r[3] for r in rentals)
+        self.assertGreater(by_inventory['1'], 4 * by_inventory['4'])
+        self.assertGreater(by_customer['3'], 4 * by_customer['2'])
+
+    def test_seasonal_day_weights(self):
+        weights = day_cum_weights(start=date(2008, 1, 1), days=366, peak_month=7, seasonality=0.25)
+
+        january = weights[30]
+        july = weights[212] - weights[181]
+        self.assertGreater(july, 1.5 * january)
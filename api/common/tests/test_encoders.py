@@ -0,0 +1,110 @@
+"""
+Common compiled JSON encoder tests.
+"""
+import datetime
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from api.analytics.serializers import FilmProfitOutputSerializer
+from api.common.encoders import (
+    EncodedJSON,
+    EncodedJSONRenderer,
+    compile_encoder,
+    rows_to_json,
+    serialize_list,
+)
+from api.films.serializers import FilmDetailOutputSerializer
+from api.rentals.serializers import RentalListOutputSerializer
+
+FILM_COLUMNS = ('film_id', 'title', 'description', 'release_year', 'language_id', 'rental_duration',
+                'rental_rate', 'length', 'replacement_cost', 'rating', 'last_update')
+
+
+def film_row(i):
+    return (
+        i, f'Film é "{i}" ', None if i % 3 else 'A Boring Drama', 2006, 1, 3,
+        Decimal('4.99'), None, Decimal('20.995'), 'PG-13', datetime.datetime(2013, 5, 26, 14, 50, 58, 951000 * (i % 2)),
+    )
+
+
+def drf_json(serializer_class, rows):
+    return JSONRenderer().render(serializer_class(rows, many=True).data)
+
+
+class CompiledEncoderTestCase(SimpleTestCase):
+    """Test that compiled encoders render exactly what DRF renders"""
+
+    def setUp(self):
+        self.tuples = [film_row(i) for i in range(20)]
+        self.dicts = [dict(zip(FILM_COLUMNS, row)) for row in self.tuples]
+
+    def test_dict_rows_match_drf(self):
+        self.assertEqual(rows_to_json(FilmDetailOutputSerializer, self.dicts),
+                         drf_json(FilmDetailOutputSerializer, self.dicts))
+
+    def test_tuple_rows_match_drf(self):
+        self.assertEqual(rows_to_json(FilmDetailOutputSerializer, self.tuples, columns=FILM_COLUMNS),
+                         drf_json(FilmDetailOutputSerializer, self.dicts))
+
+    def test_empty_rows(self):
+        self.assertEqual(rows_to_json(FilmDetailOutputSerializer, []), b'[]')
+
+    def test_decimal_is_quantized_like_drf(self):
+        rows = [{'film_id': 1, 'title': 'x', 'year': 2006, 'total_revenue': value, 'rental_count': 1,
+                 'category_names': ['Drama']} for value in (Decimal('12.345'), Decimal('1E+1'), 7, 2.5)]
+        encoded = json.loads(rows_to_json(FilmProfitOutputSerializer, rows))
+        self.assertEqual([row['total_revenue'] for row in encoded], ['12.34', '10.00', '7.00', '2.50'])
+        self.assertEqual(rows_to_json(FilmProfitOutputSerializer, rows), drf_json(FilmProfitOutputSerializer, rows))
+
+    def test_aware_datetimes_and_other_timezones_match_drf(self):
+        rows = [{
+            'rental_id': 1, 'customer_id': 2,
+            'rental_date': datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+            'return_date': datetime.datetime(2020, 1, 3, 12, 0),
+        }]
+        self.assertIn(b'"2019-12-31T22:00:00Z"', rows_to_json(RentalListOutputSerializer, rows))
+        with timezone.override('Europe/Belgrade'):
+            self.assertEqual(rows_to_json(RentalListOutputSerializer, rows),
+                             drf_json(RentalListOutputSerializer, rows))
+
+    def test_encoder_is_cached(self):
+        self.assertIs(compile_encoder(FilmDetailOutputSerializer), compile_encoder(FilmDetailOutputSerializer))
+
+    def test_missing_column_is_rejected(self):
+        with self.assertRaises(ValueError):
+            compile_encoder(FilmDetailOutputSerializer, columns=('film_id', 'title'))
+
+    def test_nested_serializer_is_rejected(self):
+        class NestedSerializer(serializers.Serializer):
+            film = FilmDetailOutputSerializer()
+
+        with self.assertRaises(ValueError):
+            compile_encoder(NestedSerializer)
+
+
+class SerializeListTestCase(SimpleTestCase):
+    """Test the RESPONSE_MODE switch and the pass-through renderer"""
+
+    rows = [{'rental_id': 1, 'customer_id': 2, 'rental_date': datetime.datetime(2005, 5, 24, 22, 53, 30),
+             'return_date': None}]
+
+    def test_serializer_mode_returns_data(self):
+        data = serialize_list(RentalListOutputSerializer, self.rows)
+        self.assertEqual(data[0]['rental_date'], '2005-05-24T22:53:30Z')
+
+    @override_settings(RESPONSE_MODE='compiled')
+    def test_compiled_mode_renders_same_response(self):
+        page = {'count': 1, 'next': '/api/rentals/?page=2', 'previous': None,
+                'results': serialize_list(RentalListOutputSerializer, self.rows)}
+        self.assertIsInstance(page['results'], EncodedJSON)
+        expected = JSONRenderer().render({**page, 'results': RentalListOutputSerializer(self.rows, many=True).data})
+        self.assertEqual(EncodedJSONRenderer().render(page), expected)
+
+    def test_renderer_without_encoded_values(self):
+        data = {'detail': 'Not found.'}
+        self.assertEqual(EncodedJSONRenderer().render(data), JSONRenderer().render(data))
@@ -0,0 +1,77 @@
+"""
+Common SQL instrumentation tests.
+"""
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.common.instrumentation import QueryInstrumentationMiddleware, RequestQueryStats
+
+
+def fake_execute(sql, params, many, context):
+    return sql
+
+
+def run_queries(request, alias, statements):
+    wrapper = request.query_stats.wrapper(alias)
+    for sql in statements:
+        wrapper(fake_execute, sql, None, False, {})
+
+
+class RequestQueryStatsTestCase(SimpleTestCase):
+    """Test per-alias query accounting"""
+
+    def test_wrapper_counts_statements_per_alias(self):
+        stats = RequestQueryStats(['default', 'dvdrental_sample'])
+        wrapper = stats.wrapper('dvdrental_sample')
+
+        self.assertEqual(wrapper(fake_execute, 'SELECT 1', None, False, {}), 'SELECT 1')
+        wrapper(fake_execute, 'SELECT 2', None, False, {})
+
+        self.assertEqual(stats.aliases['dvdrental_sample'].count, 2)
+        self.assertEqual(stats.aliases['default'].count, 0)
+        self.assertEqual(stats.count, 2)
+        self.assertIn(stats.slowest().slowest_sql, ('SELECT 1', 'SELECT 2'))
+
+    def test_failed_statement_is_counted(self):
+        stats = RequestQueryStats(['default'])
+
+        def failing_execute(sql, params, many, context):
+            raise ValueError(sql)
+
+        with self.assertRaises(ValueError):
+            stats.wrapper('default')(failing_execute, 'SELECT 1', None, False, {})
+        self.assertEqual(stats.count, 1)
+
+    def test_server_timing_lists_used_aliases(self):
+        stats = RequestQueryStats(['default', 'dvdrental_sample'])
+        stats.aliases['default'].record('SELECT 1', 0.0025)
+
+        self.assertEqual(stats.server_timing(0.01), 'db-default;dur=2.5;desc="1 queries", total;dur=10.0')
+
+
+class QueryInstrumentationMiddlewareTestCase(SimpleTestCase):
+    """Test headers and budget logging of the middleware"""
+
+    def test_response_gets_server_timing_header(self):
+        def view(request):
+            run_queries(request, 'default', ['SELECT 1'])
+            return HttpResponse()
+
+        response = QueryInstrumentationMiddleware(view)(RequestFactory().get('/api/films/'))
+
+        self.assertIn('db-default;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(QUERY_BUDGET_COUNT=2)
+    def test_request_over_budget_logs_warning(self):
+        def view(request):
+            run_queries(request, 'dvdrental_sample', ['SELECT 1', 'SELECT 2', 'SELECT 3'])
+            return HttpResponse()
+
+        with self.assertLogs('api.instrumentation', level='WARNING') as logs:
+            QueryInstrumentationMiddleware(view)(RequestFactory().post('/api/rentals/'))
+
+        record = logs.records[0]
+        self.assertTrue(record.request_stats['over_budget'])
+        self.assertEqual(record.request_stats['queries'], 3)
+        self.assertEqual(record.request_stats['db']['dvdrental_sample']['queries'], 3)
@@ -0,0 +1,49 @@
+"""
+Common Postgres JSON rendering tests.
+"""
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from api.analytics.serializers import FilmProfitOutputSerializer
+from api.common.json_sql import json_object_sql, json_page_params, json_page_sql, json_row_sql
+from api.payments.serializers import PaymentListOutputSerializer
+
+
+class JsonSqlTestCase(SimpleTestCase):
+    """Test the SQL generated from output serializers"""
+
+    def test_object_keeps_field_order_and_formats(self):
+        sql = json_object_sql(PaymentListOutputSerializer)
+
+        self.assertTrue(sql.startswith("json_build_object('payment_id', payment_id, 'customer_id', customer_id, "))
+        self.assertIn("'amount', round(amount::numeric, 2)::text", sql)
+        self.assertIn("'payment_date', to_char(payment_date, 'YYYY-MM-DD\"T\"HH24:MI:SS')", sql)
+        self.assertTrue(sql.endswith("|| 'Z')"))
+
+    def test_list_field_is_passed_through(self):
+        self.assertIn("'category_names', category_names", json_object_sql(FilmProfitOutputSerializer))
+
+    def test_page_counts_and_orders_in_one_statement(self):
+        sql = json_page_sql(PaymentListOutputSerializer, columns='payment_id, amount', table='payment',
+                            where=' WHERE customer_id = %s', order_by='payment_date DESC')
+
+        self.assertTrue(sql.startswith('SELECT (SELECT COUNT(*) FROM payment WHERE customer_id = %s), '))
+        self.assertIn('ORDER BY payment_date DESC) FROM (SELECT payment_id, amount FROM payment', sql)
+        self.assertEqual(sql.count('%s'), 4)
+        self.assertEqual(json_page_params([42], limit=20, offset=40), (42, 42, 20, 40))
+
+    def test_row(self):
+        sql = json_row_sql(PaymentListOutputSerializer, columns='*', table='payment', where=' WHERE payment_id = %s')
+
+        self.assertTrue(sql.endswith('::text FROM (SELECT * FROM payment WHERE payment_id = %s) t'))
+
+    def test_unsupported_fields_are_rejected(self):
+        class MethodSerializer(serializers.Serializer):
+            label = serializers.SerializerMethodField()
+
+        class DottedSerializer(serializers.Serializer):
+            name = serializers.CharField(source='film.title')
+
+        for serializer_class in (MethodSerializer, DottedSerializer):
+            with self.subTest(serializer_class.__name__), self.assertRaises(ValueError):
+                json_object_sql(serializer_class)
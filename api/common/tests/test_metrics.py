@@ -0,0 +1,125 @@
+"""
+Common metrics store tests.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from api.common import metrics
+
+
+class MetricsTestCase(SimpleTestCase):
+    """Base class giving each test an empty metrics directory"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(METRICS_DIR=self.directory, METRICS_TOKEN='secret')
+        override.enable()
+        self.addCleanup(override.disable)
+        metrics._reset_store_after_fork()
+        self.addCleanup(metrics._reset_store_after_fork)
+
+    def scrape(self, **headers):
+        headers.setdefault('HTTP_AUTHORIZATION', 'Bearer secret')
+        return metrics.metrics_view(RequestFactory().get('/metrics', **headers))
+
+
+class MmapValuesTestCase(MetricsTestCase):
+    """Test the per-process memory-mapped store"""
+
+    def test_values_survive_reopening_and_growth(self):
+        path = os.path.join(self.directory, '1.db')
+        store = metrics.MmapValues(path)
+        store.inc(('c', 'hits', (('path', 'a'),)), 2.0)
+        store.set(('g', 'depth', ()), 7.0)
+        for i in range(5000):
+            store.inc(('c', 'filler', (('i', str(i)),)), 1.0)
+        store.inc(('c', 'hits', (('path', 'a'),)), 1.0)
+
+        reopened = metrics.MmapValues(path)
+        with open(path, 'rb') as source:
+            values = {key: value for key, value, _ in metrics._iter_entries(source.read())}
+
+        self.assertEqual(values[b'["c", "hits", [["path", "a"]]]'], 3.0)
+        self.assertEqual(values[b'["g", "depth", []]'], 7.0)
+        self.assertEqual(len(reopened._indexes), 5002)
+
+    def test_observe_survives_growth_between_keys(self):
+        store = metrics.MmapValues(os.path.join(self.directory, '1.db'))
+        # Leave room for the bucket entry only, so the sum entry grows the file
+        while len(store._map) - store._used > 64:
+            store.inc(('c', 'filler', (('i', str(len(store._indexes))),)), 1.0)
+        size = len(store._map)
+        keys = (('c', 'h_bucket', (('le', '0.1'),)), ('c', 'h_sum', ()), ('c', 'h_count', ()))
+
+        store.observe(keys, 0.05)
+        store.observe(keys, 0.05)
+
+        self.assertGreater(len(store._map), size)
+        self.assertEqual([store._values[store._indexes[key]] for key in keys], [2.0, 0.1, 2.0])
+
+
+class ExpositionTestCase(MetricsTestCase):
+    """Test merging and rendering"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.003, 0.2, 20):
+            metrics.histogram_observe('api_request_duration_seconds', (('operation', 'films_list'),), value)
+
+        body = self.scrape().content.decode()
+
+        self.assertIn('# TYPE api_request_duration_seconds histogram', body)
+        self.assertIn('api_request_duration_seconds_bucket{operation="films_list",le="0.005"} 1', body)
+        self.assertIn('api_request_duration_seconds_bucket{operation="films_list",le="0.25"} 2', body)
+        self.assertIn('api_request_duration_seconds_bucket{operation="films_list",le="+Inf"} 3', body)
+        self.assertIn('api_request_duration_seconds_count{operation="films_list"} 3', body)
+
+    def test_counters_of_exited_workers_are_kept_but_gauges_dropped(self):
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        store = metrics.MmapValues(os.path.join(self.directory, f'{exited.pid}.db'))
+        store.inc(('c', 'api_requests_total', (('operation', 'x'),)), 4.0)
+        store.inc(('g', 'api_requests_in_flight', ()), 1.0)
+        metrics.counter_inc('api_requests_total', (('operation', 'x'),))
+
+        body = self.scrape().content.decode()
+
+        self.assertIn('api_requests_total{operation="x"} 5', body)
+        self.assertNotIn('api_requests_in_flight 1', body)
+
+    def test_token_is_required(self):
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='').status_code, 401)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_endpoint_is_disabled_without_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+
+
+class MetricsMiddlewareTestCase(MetricsTestCase):
+    """Test per-operation request metrics"""
+
+    def test_operation_id_comes_from_extend_schema(self):
+        request = RequestFactory().post('/api/auth/login/')
+        request.resolver_match = resolve('/api/auth/login/')
+
+        self.assertEqual(metrics.request_operation_id(request), 'auth_login')
+
+    def test_request_is_counted_under_its_operation(self):
+        def view(request):
+            request.resolver_match = resolve('/api/auth/login/')
+            return HttpResponse(status=201)
+
+        metrics.MetricsMiddleware(view)(RequestFactory().post('/api/auth/login/'))
+        body = self.scrape().content.decode()
+
+        self.assertIn('api_requests_total{operation="auth_login",method="POST",status="201"} 1', body)
+        self.assertIn('api_request_duration_seconds_count{operation="auth_login"} 1', body)
+        self.assertIn('api_requests_in_flight 0', body)
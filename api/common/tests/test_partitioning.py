@@ -0,0 +1,108 @@
+"""
+Common monthly partitioning tests.
+"""
+from datetime import date, datetime
+
+from django.test import TestCase
+
+from api.common.db import get_dvdrental_connection
+from api.common.exceptions import BusinessLogicError
+from api.common.partitioning import (
+    partition_table_convert,
+    partitions_create_ahead,
+    partitions_create_range,
+    partitions_detach_before,
+    partitions_list,
+    table_is_partitioned,
+)
+from api.common.tests.sample_schema import create_sample_tables
+
+
+def fetch(sql, params=None):
+    with get_dvdrental_connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+class PartitioningTestCase(TestCase):
+    """Test conversion to monthly partitions and partition maintenance"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=500)
+        with get_dvdrental_connection().cursor() as cursor:
+            cursor.execute(
+                "ALTER TABLE payment ADD CONSTRAINT payment_rental_id_fkey "
+                "FOREIGN KEY (rental_id) REFERENCES rental (rental_id) ON DELETE SET NULL"
+            )
+
+    def test_convert_copies_rows_into_monthly_partitions(self):
+        """Test rows, indexes and the month range survive conversion"""
+        result = partition_table_convert(table='payment', months_ahead=1)
+
+        self.assertTrue(table_is_partitioned(table='payment'))
+        self.assertEqual(result['rows_copied'], 500)
+        self.assertEqual(result['skipped_indexes'], [])
+        names = [name for name, _ in partitions_list(table='payment')]
+        self.assertEqual(names[0], 'payment_default')
+        self.assertEqual(names[1], 'payment_y2020m01')
+        self.assertEqual(fetch("SELECT COUNT(*) FROM payment_y2020m01"), [(500,)])
+        self.assertEqual(fetch("SELECT COUNT(*) FROM pg_indexes WHERE tablename = 'payment_y2020m01' "
+                               "AND indexname LIKE '%%customer_id_payment_date%%'"), [(1,)])
+
+        with self.assertRaises(BusinessLogicError):
+            partition_table_convert(table='payment')
+
+    def test_converted_rental_keeps_payment_on_delete_set_null(self):
+        """Test the dropped payment -> rental key still nulls payment.rental_id on delete only"""
+        result = partition_table_convert(table='rental', months_ahead=0)
+
+        self.assertEqual(result['dropped_foreign_keys'], ['payment.payment_rental_id_fkey'])
+        with get_dvdrental_connection().cursor() as cursor:
+            cursor.execute("DELETE FROM rental WHERE rental_id = 5")
+            # Moving a rental to another month deletes and reinserts it across partitions
+            cursor.execute("UPDATE rental SET rental_date = '2021-06-01' WHERE rental_id = 6")
+
+        self.assertEqual(fetch("SELECT rental_id FROM payment WHERE payment_id IN (5, 6) ORDER BY payment_id"),
+                         [(None,), (6,)])
+
+    def test_create_range_moves_rows_out_of_default_partition(self):
+        """Test a month created after its rows reached the default partition takes them over"""
+        partition_table_convert(table='payment', months_ahead=0)
+        with get_dvdrental_connection().cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO payment (customer_id, staff_id, amount, payment_date) "
+                "VALUES (1, 1, 1.99, '2099-01-15'), (2, 1, 2.99, '2099-02-15')"
+            )
+
+        created = partitions_create_range(table='payment', start=date(2099, 1, 1), end=date(2099, 1, 31))
+
+        self.assertEqual(created, ['payment_y2099m01'])
+        self.assertEqual(fetch("SELECT tableoid::regclass::text, payment_date FROM payment "
+                               "WHERE payment_date >= '2099-01-01' ORDER BY payment_date"),
+                         [('payment_y2099m01', datetime(2099, 1, 15)), ('payment_default', datetime(2099, 2, 15))])
+
+    def test_create_ahead_is_idempotent(self):
+        """Test create-ahead adds only the missing months"""
+        partition_table_convert(table='payment', months_ahead=1)
+
+        created = partitions_create_ahead(table='payment', months_ahead=3)
+
+        self.assertEqual(len(created), 2)
+        self.assertEqual(partitions_create_ahead(table='payment', months_ahead=3), [])
+
+    def test_create_range_requires_partitioned_table(self):
+        with self.assertRaises(BusinessLogicError):
+            partitions_create_range(table='rental', start=date(2020, 1, 1), end=date(2020, 1, 31))
+
+    def test_detach_before_archives_old_months(self):
+        """Test old months leave the parent and keep their rows in the archive schema"""
+        partition_table_convert(table='payment', months_ahead=0)
+
+        detached = partitions_detach_before(table='payment', before=date(2020, 2, 1), archive_schema='archive')
+
+        self.assertEqual(detached, ['payment_y2020m01'])
+        self.assertEqual(fetch("SELECT COUNT(*) FROM payment"), [(0,)])
+        self.assertEqual(fetch("SELECT COUNT(*) FROM archive.payment_y2020m01"), [(500,)])
+        self.assertNotIn('payment_y2020m01', [name for name, _ in partitions_list(table='payment')])
@@ -0,0 +1,116 @@
+"""
+Common request profiling tests.
+"""
+import marshal
+import time
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.common import profiling
+from api.common.profiling import (
+    OTHER_STACK,
+    ProfilingMiddleware,
+    StackSampler,
+    StackStore,
+    profile_token_create,
+    profile_token_verify,
+)
+
+
+def slow_view(request):
+    deadline = time.perf_counter() + 0.02
+    while time.perf_counter() < deadline:
+        pass
+    return HttpResponse('ok', status=201)
+
+
+class ProfileTokenTestCase(SimpleTestCase):
+    """Test signed profiling tokens"""
+
+    def test_round_trip(self):
+        self.assertEqual(profile_token_verify(profile_token_create(user_id=7)), 7)
+
+    def test_tampered_token_is_rejected(self):
+        self.assertIsNone(profile_token_verify(profile_token_create(user_id=7) + 'x'))
+
+    @override_settings(PROFILE_TOKEN_MAX_AGE=-1)
+    def test_expired_token_is_rejected(self):
+        self.assertIsNone(profile_token_verify(profile_token_create(user_id=7)))
+
+
+class StackSamplerTestCase(SimpleTestCase):
+    """Test stack sampling and aggregation"""
+
+    def test_samples_running_function(self):
+        with StackSampler(interval=0.001) as sampler:
+            slow_view(None)
+
+        self.assertTrue(any(stack.endswith('test_profiling:slow_view') for stack in sampler.stacks))
+
+    def test_store_bounds_stacks_and_operations(self):
+        store = StackStore(max_operations=2, max_stacks=2)
+        store.add('films_list', {'a;b': 1, 'a;c': 2, 'a;d': 3})
+        store.add('films_list', {'a;b': 1})
+        store.add('films_detail', {'a': 1})
+        store.add('auth_login', {'a': 1})
+
+        snapshot = store.snapshot()
+        self.assertEqual(set(snapshot), {'films_detail', 'auth_login'})
+
+        store.add('films_list', {'a;b': 1, 'a;c': 2, 'a;d': 3})
+        self.assertEqual(store.snapshot()['films_list'], {'a;b': 1, 'a;c': 2, OTHER_STACK: 3})
+
+
+@override_settings(PROFILE_SAMPLE_RATE=0, PROFILE_DIR='')
+class ProfilingMiddlewareTestCase(SimpleTestCase):
+    """Test on-demand and background profiling"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = ProfilingMiddleware(slow_view)
+
+    def test_unprofiled_request_passes_through(self):
+        response = self.middleware(self.factory.get('/api/films/'))
+
+        self.assertEqual(response.content, b'ok')
+
+    def test_sample_mode_returns_collapsed_stacks(self):
+        request = self.factory.get('/api/films/', HTTP_X_PROFILE=profile_token_create(user_id=1))
+
+        response = self.middleware(request)
+
+        self.assertEqual(response['X-Profile-Status'], '201')
+        self.assertEqual(response['X-Profile-Mode'], 'sample')
+        self.assertIn('.folded"', response['Content-Disposition'])
+        line = response.content.decode().splitlines()[0]
+        stack, count = line.rsplit(' ', 1)
+        self.assertIn(';', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_cprofile_mode_returns_pstats(self):
+        request = self.factory.get('/api/films/', {
+            '_profile': profile_token_create(user_id=1),
+            '_profile_mode': 'cprofile',
+        })
+
+        response = self.middleware(request)
+
+        self.assertEqual(response['X-Profile-Mode'], 'cprofile')
+        stats = marshal.loads(response.content)
+        self.assertTrue(any(function == 'slow_view' for _, _, function in stats))
+
+    def test_invalid_token_is_ignored(self):
+        response = self.middleware(self.factory.get('/api/films/', HTTP_X_PROFILE='forged'))
+
+        self.assertEqual(response.content, b'ok')
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_background_sampling_aggregates_per_operation(self):
+        store = StackStore(max_operations=4, max_stacks=100)
+        with mock.patch.object(profiling, '_store', store):
+            response = self.middleware(self.factory.get('/api/films/'))
+
+        self.assertEqual(response.content, b'ok')
+        self.assertGreater(sum(store.snapshot()['unmatched'].values()), 0)
@@ -0,0 +1,125 @@
+"""
+Common slow-query log tests.
+"""
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api.common import slow_queries
+from api.common.slow_queries import SlowQueryLog, fingerprint, slow_query_recorder
+from api.monitoring.selectors import slow_query_top
+
+
+def fake_execute(sql, params, many, context):
+    return sql
+
+
+def selector_calling(module_name):
+    """Build a function that looks like it is defined in module_name."""
+    namespace = {'__name__': module_name, 'run': slow_query_recorder, 'execute': fake_execute}
+    exec(
+        "def payment_list(sql, params):\n"
+        "    return run(execute, sql, params, False, {})\n",
+        namespace,
+    )
+    return namespace['payment_list']
+
+
+class FingerprintTestCase(SimpleTestCase):
+    """Test statement normalization"""
+
+    def test_values_are_replaced(self):
+        self.assertEqual(
+            fingerprint("SELECT *  FROM payment\n WHERE customer_id = %s AND amount > 2.99 AND note = 'it''s'"),
+            'SELECT * FROM payment WHERE customer_id = ? AND amount > ? AND note = ?',
+        )
+
+    def test_value_lists_collapse(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM film WHERE film_id IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM film WHERE film_id IN (1, 2)'),
+        )
+
+    def test_identifiers_with_digits_are_kept(self):
+        self.assertIn('table2', fingerprint('SELECT * FROM table2'))
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0, SLOW_QUERY_DIR='')
+class SlowQueryRecorderTestCase(SimpleTestCase):
+    """Test recording of slow statements"""
+
+    def setUp(self):
+        patcher = mock.patch.object(slow_queries, '_log', SlowQueryLog(size=3))
+        self.log = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_records_caller_and_params(self):
+        payment_list = selector_calling('api.payments.selectors')
+
+        self.assertEqual(payment_list('SELECT * FROM payment WHERE payment_id = %s', [7]), 'SELECT * FROM payment WHERE payment_id = %s')
+
+        record, = self.log.records
+        self.assertEqual(record['caller'], 'payments.payment_list')
+        self.assertEqual(record['params'], '[7]')
+        self.assertEqual(record['normalized_sql'], 'SELECT * FROM payment WHERE payment_id = ?')
+
+    def test_caller_outside_selectors_is_none(self):
+        selector_calling('api.payments.apis')('SELECT 1', None)
+
+        self.assertIsNone(self.log.records[0]['caller'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=60000)
+    def test_fast_statements_are_ignored(self):
+        slow_query_recorder(fake_execute, 'SELECT 1', None, False, {})
+
+        self.assertEqual(len(self.log.records), 0)
+
+    def test_ring_buffer_is_bounded(self):
+        for film_id in range(5):
+            slow_query_recorder(fake_execute, f'SELECT {film_id}', None, False, {})
+
+        self.assertEqual([r['sql'] for r in self.log.records], ['SELECT 2', 'SELECT 3', 'SELECT 4'])
+
+    def test_only_reads_are_explained(self):
+        self.assertTrue(slow_queries._explainable('  WITH x AS (SELECT 1) SELECT * FROM x'))
+        self.assertFalse(slow_queries._explainable('UPDATE film SET title = %s'))
+        self.assertFalse(slow_queries._explainable('SELECT * FROM rental FOR UPDATE'))
+        self.assertFalse(slow_queries._explainable('WITH d AS (DELETE FROM rental RETURNING *) SELECT * FROM d'))
+
+    def test_sampled_record_waits_for_plan(self):
+        with override_settings(SLOW_QUERY_EXPLAIN_SAMPLE_RATE=1), \
+                mock.patch.object(slow_queries, '_submit_explain', return_value=True) as submit, \
+                mock.patch.object(slow_queries, '_explained', slow_queries.TTLCache(maxsize=8, ttl=60)):
+            slow_query_recorder(fake_execute, 'SELECT * FROM film WHERE film_id = %s', [1], False, {})
+            slow_query_recorder(fake_execute, 'SELECT * FROM film WHERE film_id = %s', [2], False, {})
+
+        # First occurrence goes to the explain thread, the repeat is logged directly
+        self.assertEqual(submit.call_count, 1)
+        self.assertEqual(submit.call_args.args[0]['_params'], [1])
+        self.assertEqual(len(self.log.records), 1)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0)
+class SlowQueryTopTestCase(SimpleTestCase):
+    """Test ranking of fingerprints across worker files"""
+
+    def test_top_fingerprints_by_total_time(self):
+        directory = tempfile.mkdtemp()
+        with override_settings(SLOW_QUERY_DIR=directory):
+            for pid in (101, 102):
+                log = SlowQueryLog(size=10)
+                with mock.patch.object(slow_queries, '_log', log), \
+                        mock.patch('api.common.slow_queries.os.getpid', return_value=pid), \
+                        mock.patch('api.common.slow_queries.time.perf_counter', side_effect=[0.0, 0.3, 0.0, 0.1]):
+                    slow_query_recorder(fake_execute, 'SELECT * FROM rental WHERE rental_id = 1', None, False, {})
+                    slow_query_recorder(fake_execute, 'SELECT * FROM film', None, False, {})
+                log._handler.close()
+
+            top = slow_query_top(limit=1)
+
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top[0]['normalized_sql'], 'SELECT * FROM rental WHERE rental_id = ?')
+        self.assertEqual(top[0]['calls'], 2)
+        self.assertEqual(top[0]['total_ms'], 600.0)
+        self.assertEqual(top[0]['mean_ms'], 300.0)
@@ -0,0 +1,109 @@
+"""
+Common rate limiting tests.
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from api.common.throttling import (
+    AccountThrottle, ClientIPThrottle, parse_rate, rate_limit_hit, rate_limits_reset
+)
+
+
+class LoginLikeApi(APIView):
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [ClientIPThrottle, AccountThrottle]
+    throttle_scope = 'test'
+    throttle_account_field = 'username'
+
+    def post(self, request):
+        return Response({'ok': True})
+
+
+class SlidingWindowTestCase(SimpleTestCase):
+    """Test the sliding-window counter"""
+
+    def setUp(self):
+        rate_limits_reset()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('5/min'), (5, 60))
+        self.assertEqual(parse_rate('100/hour'), (100, 3600))
+
+    def test_limit_is_enforced_within_window(self):
+        with patch('api.common.throttling.time.time', return_value=6000.0):
+            results = [rate_limit_hit('k', limit=3, window=60) for _ in range(4)]
+
+        self.assertEqual(results[:3], [None, None, None])
+        self.assertAlmostEqual(results[3], 60 + 60 * (1 - 3 / 4))
+
+    def test_previous_window_is_weighted_by_remaining_overlap(self):
+        with patch('api.common.throttling.time.time', return_value=6000.0):
+            for _ in range(4):
+                self.assertIsNone(rate_limit_hit('k', limit=4, window=60))
+
+        # Halfway through the next window, 4 previous hits count as 2
+        with patch('api.common.throttling.time.time', return_value=6090.0):
+            self.assertIsNone(rate_limit_hit('k', limit=4, window=60))
+            self.assertIsNone(rate_limit_hit('k', limit=4, window=60))
+            self.assertIsNotNone(rate_limit_hit('k', limit=4, window=60))
+
+
+@override_settings(RATE_LIMIT_STORE='local', RATE_LIMITS={'test_ip': '10/min', 'test_account': '2/min'})
+class ThrottleTestCase(SimpleTestCase):
+    """Test the DRF throttle classes"""
+
+    def setUp(self):
+        rate_limits_reset()
+        self.factory = APIRequestFactory()
+
+    def post(self, username, ip='10.0.0.1', **headers):
+        request = self.factory.post('/', {'username': username}, format='json', REMOTE_ADDR=ip, **headers)
+        return LoginLikeApi.as_view()(request)
+
+    def test_account_limit_returns_429_with_retry_after(self):
+        self.assertEqual(self.post('Alice').status_code, 200)
+        self.assertEqual(self.post('alice').status_code, 200)
+
+        response = self.post('ALICE', ip='10.0.0.2')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(self.post('bob').status_code, 200)
+
+    @override_settings(RATE_LIMITS={'test_ip': '2/min'})
+    def test_ip_limit_applies_across_accounts(self):
+        self.post('a')
+        self.post('b')
+
+        self.assertEqual(self.post('c').status_code, 429)
+        self.assertEqual(self.post('c', ip='10.0.0.9').status_code, 200)
+
+    @override_settings(RATE_LIMITS={'test_ip': '2/min'})
+    def test_spoofed_forwarded_for_does_not_reset_ip_limit(self):
+        self.post('a', HTTP_X_FORWARDED_FOR='1.1.1.1')
+        self.post('b', HTTP_X_FORWARDED_FOR='2.2.2.2')
+
+        self.assertEqual(self.post('c', HTTP_X_FORWARDED_FOR='3.3.3.3').status_code, 429)
+
+    @override_settings(RATE_LIMITS={'test_ip': '2/min'}, REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_behind_proxy_ip_is_taken_from_proxy_entry(self):
+        # The proxy (REMOTE_ADDR) appends the real client; earlier entries are client-supplied
+        self.post('a', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7')
+        self.post('b', HTTP_X_FORWARDED_FOR='2.2.2.2, 203.0.113.7')
+
+        self.assertEqual(self.post('c', HTTP_X_FORWARDED_FOR='3.3.3.3, 203.0.113.7').status_code, 429)
+        self.assertEqual(self.post('c', HTTP_X_FORWARDED_FOR='203.0.113.8').status_code, 200)
+
+    @override_settings(RATE_LIMIT_STORE='shared')
+    def test_shared_store_uses_cache(self):
+        with patch('api.common.throttling.SharedWindowStore.hit', return_value=(0, 3)) as hit:
+            response = self.post('carol')
+
+        self.assertEqual(response.status_code, 429)
+        hit.assert_called()
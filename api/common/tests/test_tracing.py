@@ -0,0 +1,170 @@
+"""
+Common request tracing tests.
+"""
+import json
+import tempfile
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework import serializers
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.common import tracing
+from api.common.tracing import (
+    TracingMiddleware,
+    Trace,
+    format_traceparent,
+    parse_traceparent,
+    span,
+    to_otlp,
+    traced,
+)
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+@traced
+def film_lookup(film_id):
+    fake_connection = mock.Mock(alias='dvdrental_sample')
+    return tracing._sql_span(lambda *args: film_id, 'SELECT * FROM film WHERE film_id = %s', [film_id], False,
+                             {'connection': fake_connection})
+
+
+class FilmOutputSerializer(serializers.Serializer):
+    film_id = serializers.IntegerField()
+
+
+class FilmApi(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        return Response(FilmOutputSerializer({'film_id': film_lookup(7)}).data)
+
+
+class TraceparentTestCase(SimpleTestCase):
+    """Test W3C traceparent parsing"""
+
+    def test_round_trip(self):
+        header = format_traceparent(TRACE_ID, PARENT_ID, True)
+
+        self.assertEqual(header, f'00-{TRACE_ID}-{PARENT_ID}-01')
+        self.assertEqual(parse_traceparent(header), (TRACE_ID, PARENT_ID, True))
+
+    def test_invalid_headers(self):
+        for header in (None, '', 'garbage', f'ff-{TRACE_ID}-{PARENT_ID}-01',
+                       f'00-{"0" * 32}-{PARENT_ID}-01', f'00-{TRACE_ID}-{PARENT_ID}'):
+            self.assertIsNone(parse_traceparent(header), header)
+
+    def test_unsampled_flag(self):
+        self.assertFalse(parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-00')[2])
+
+
+class TracedTestCase(SimpleTestCase):
+    """Test spans outside of a traced request"""
+
+    def test_noop_without_trace(self):
+        self.assertEqual(film_lookup(3), 3)
+        with span('outside') as current:
+            self.assertIsNone(current)
+
+    def test_span_name_from_module(self):
+        def film_list():
+            pass
+        film_list.__module__ = 'api.films.selectors'
+
+        self.assertEqual(tracing._span_name(film_list), 'films.film_list')
+        self.assertEqual(tracing._span_name(film_lookup.__wrapped__), 'film_lookup')
+
+
+@override_settings(TRACING_ENABLED=True, TRACING_SAMPLE_RATE=0, TRACING_DIR='')
+class TracingMiddlewareTestCase(SimpleTestCase):
+    """Test traces of whole requests"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        tracing._install_drf_spans()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = TracingMiddleware(FilmApi.as_view())
+        patcher = mock.patch.object(tracing._exporter, 'export')
+        self.export = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unsampled_request_is_not_exported(self):
+        response = self.middleware(self.factory.get('/api/films/7/'))
+
+        self.assertEqual(response.data, {'film_id': 7})
+        self.export.assert_not_called()
+        self.assertNotIn('traceparent', response)
+
+    def test_traceparent_continues_trace(self):
+        request = self.factory.get('/api/films/7/', HTTP_TRACEPARENT=f'00-{TRACE_ID}-{PARENT_ID}-01')
+
+        response = self.middleware(request)
+
+        trace, = self.export.call_args.args
+        spans = {recorded.name: recorded for recorded in trace.spans}
+        root = spans['GET unmatched']
+        self.assertEqual(trace.trace_id, TRACE_ID)
+        self.assertEqual(root.parent_id, PARENT_ID)
+        self.assertEqual(response['traceparent'], f'00-{TRACE_ID}-{root.span_id}-01')
+        self.assertEqual(spans['FilmApi.dispatch'].parent_id, root.span_id)
+        self.assertEqual(spans['FilmApi.check_permissions'].parent_id, spans['FilmApi.dispatch'].span_id)
+        self.assertIn('FilmApi.perform_authentication', spans)
+        self.assertIn('FilmOutputSerializer.data', spans)
+        lookup = spans['film_lookup']
+        sql = spans['SELECT dvdrental_sample']
+        self.assertEqual(sql.parent_id, lookup.span_id)
+        self.assertEqual(sql.kind, tracing.KIND_CLIENT)
+        self.assertEqual(sql.attributes['db.statement'], 'SELECT * FROM film WHERE film_id = %s')
+
+    def test_unsampled_traceparent_is_respected(self):
+        with override_settings(TRACING_SAMPLE_RATE=1):
+            self.middleware(self.factory.get('/api/films/7/', HTTP_TRACEPARENT=f'00-{TRACE_ID}-{PARENT_ID}-00'))
+
+        self.export.assert_not_called()
+
+    def test_failed_span_has_error_status(self):
+        trace = Trace(TRACE_ID)
+        root = tracing.Span(trace, None, 'GET films_list', tracing.KIND_SERVER, {'http.status_code': 200})
+        token = tracing._current_span.set(root)
+        try:
+            with self.assertRaises(ValueError):
+                with span('films.film_list', limit=10):
+                    raise ValueError('boom')
+        finally:
+            tracing._current_span.reset(token)
+
+        encoded = to_otlp(trace)['resourceSpans'][0]['scopeSpans'][0]['spans'][0]
+        self.assertEqual(encoded['parentSpanId'], root.span_id)
+        self.assertEqual(encoded['status'], {'code': tracing.STATUS_ERROR, 'message': 'ValueError: boom'})
+        self.assertEqual(encoded['attributes'], [{'key': 'limit', 'value': {'intValue': '10'}}])
+
+
+class TraceExporterTestCase(SimpleTestCase):
+    """Test the OTLP/JSON file sink"""
+
+    def test_writes_one_line_per_trace(self):
+        directory = tempfile.mkdtemp()
+        trace = Trace(TRACE_ID)
+        trace.spans.append(tracing.Span(trace, None, 'GET films_list', tracing.KIND_SERVER, {}))
+        exporter = tracing._TraceFileExporter()
+
+        with override_settings(TRACING_DIR=directory), mock.patch('api.common.tracing.os.getpid', return_value=42):
+            exporter.export(trace)
+            exporter.export(trace)
+        exporter._handler.close()
+
+        with open(f'{directory}/traces.42.jsonl', encoding='utf-8') as source:
+            lines = source.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        resource = json.loads(lines[0])['resourceSpans'][0]
+        self.assertEqual(resource['resource']['attributes'][0],
+                         {'key': 'service.name', 'value': {'stringValue': 'dvdrental-api'}})
+        self.assertEqual(resource['scopeSpans'][0]['spans'][0]['traceId'], TRACE_ID)
@@ -0,0 +1,240 @@
+"""
+Sliding-window rate limiting for unauthenticated, expensive endpoints.
+
+Counts are kept per fixed window and blended with the previous window
+(``previous * (1 - elapsed / window) + current``), which approximates a true
+sliding window with two counters per key instead of a timestamp log.
+
+Two stores are available (``RATE_LIMIT_STORE``):
+
+- ``local``: counters live in the worker process. Cheapest, but each gunicorn
+  worker enforces the limit on its own.
+- ``shared``: counters live in the Django cache named by ``RATE_LIMIT_CACHE``
+  (configure a shared backend such as Redis), so all workers agree. Keys
+  found over the limit are also remembered locally until they may pass again,
+  so a flood is rejected without touching the cache. The count is exact only
+  where the backend's ``incr()`` is atomic (Redis, Memcached); the database
+  cache reads and writes, so concurrent hits may be lost and the limit
+  enforced loosely.
+
+Client IPs come from DRF's ``get_ident``: REMOTE_ADDR, or the
+X-Forwarded-For entry added by the nearest of ``NUM_PROXIES`` trusted
+proxies, so clients cannot pick their own identifier.
+
+Throttles run in DRF's ``check_throttles``, before the view does any hashing
+or database work; rejections are DRF ``Throttled`` errors (429 + Retry-After).
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Parse a DRF-style rate such as '5/min' or '100/hour'.
+    
+    Returns:
+        Tuple of (number of requests, window in seconds)
+    """
+    try:
+        count, period = rate.split('/')
+        return int(count), _PERIODS[period.strip()[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f"Invalid rate '{rate}'. Use '<count>/<s|min|hour|day>'.")
+
+
+def _estimate(previous: int, current: int, elapsed: float, window: int) -> float:
+    return previous * (window - elapsed) / window + current
+
+
+def _retry_after(previous: int, current: int, elapsed: float, window: int, limit: int) -> float:
+    """Seconds until the blended count drops to the limit again (assuming no further hits)."""
+    if current < limit and previous:
+        return max(0.0, window * (1 - (limit - current) / previous) - elapsed)
+    # The current window alone is over the limit: wait for it to become the previous one
+    return (window - elapsed) + window * (1 - limit / current)
+
+
+class LocalWindowStore:
+    """In-process window counters, bounded to maxsize keys (least recently used evicted)."""
+    
+    def __init__(self, *, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._counters: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def hit(self, key: str, window_index: int) -> Tuple[int, int]:
+        """Count a hit in window_index; return (previous window count, current window count)."""
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] < window_index - 1:
+                entry = [window_index, 0, 0]
+            elif entry[0] == window_index - 1:
+                entry = [window_index, 0, entry[1]]
+            entry[1] += 1
+            self._counters[key] = entry
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.maxsize:
+                self._counters.popitem(last=False)
+            return entry[2], entry[1]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+class SharedWindowStore:
+    """Window counters in a Django cache shared by all worker processes."""
+    
+    def __init__(self, *, alias: str):
+        self.alias = alias
+    
+    def hit(self, key: str, window_index: int, window: int) -> Tuple[int, int]:
+        cache = caches[self.alias]
+        current_key = f"ratelimit:{key}:{window_index}"
+        # add() is a no-op if the counter exists; incr() is atomic in Redis and Memcached
+        # but a read plus a write in DatabaseCache, which may lose concurrent hits
+        cache.add(current_key, 0, timeout=2 * window)
+        current = cache.incr(current_key)
+        previous = cache.get(f"ratelimit:{key}:{window_index - 1}", 0)
+        return previous, current
+
+
+_local_store = LocalWindowStore(maxsize=getattr(settings, 'RATE_LIMIT_LOCAL_MAX_KEYS', 100000))
+# key -> monotonic time until which the key is known to be over its limit
+_blocked_until: 'OrderedDict[str, float]' = OrderedDict()
+_blocked_lock = threading.Lock()
+
+
+def _blocked_for(key: str) -> Optional[float]:
+    with _blocked_lock:
+        until = _blocked_until.get(key)
+        if until is None:
+            return None
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            del _blocked_until[key]
+            return None
+        return remaining
+
+
+def _block(key: str, seconds: float) -> None:
+    with _blocked_lock:
+        _blocked_until[key] = time.monotonic() + seconds
+        _blocked_until.move_to_end(key)
+        while len(_blocked_until) > _local_store.maxsize:
+            _blocked_until.popitem(last=False)
+
+
+def rate_limit_hit(key: str, *, limit: int, window: int) -> Optional[float]:
+    """
+    Count a request for key against limit per window.
+    
+    Args:
+        key: Counter key (scope and client/account identifier)
+        limit: Requests allowed per window
+        window: Window length in seconds
+        
+    Returns:
+        None if the request is allowed, otherwise seconds until it would be
+    """
+    blocked = _blocked_for(key)
+    if blocked is not None:
+        return blocked
+    
+    now = time.time()
+    window_index = int(now // window)
+    elapsed = now - window_index * window
+    
+    if getattr(settings, 'RATE_LIMIT_STORE', 'local') == 'shared':
+        try:
+            previous, current = SharedWindowStore(
+                alias=getattr(settings, 'RATE_LIMIT_CACHE', 'default')
+            ).hit(key, window_index, window)
+        except Exception:
+            # Fail open: an unavailable cache must not lock everybody out
+            logger.warning("Rate limit store unavailable; allowing request for %s", key, exc_info=True)
+            return None
+    else:
+        previous, current = _local_store.hit(key, window_index)
+    
+    if _estimate(previous, current, elapsed, window) <= limit:
+        return None
+    
+    wait = _retry_after(previous, current, elapsed, window, limit)
+    _block(key, wait)
+    return wait
+
+
+def rate_limits_reset() -> None:
+    """Forget all in-process counters and blocks (tests, or after changing limits)."""
+    _local_store.clear()
+    with _blocked_lock:
+        _blocked_until.clear()
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Base class; subclasses define the rate scope suffix and the identifier.
+    
+    The view names its scope with ``throttle_scope``; the rate is read from
+    ``RATE_LIMITS['<throttle_scope>_<scope_suffix>']``. Views or scopes
+    without a configured rate are not limited.
+    """
+    scope_suffix: str = ''
+    
+    def get_identifier(self, request, view) -> Optional[str]:
+        raise NotImplementedError('.get_identifier() must be overridden')
+    
+    def allow_request(self, request, view):
+        self._wait = None
+        scope = getattr(view, 'throttle_scope', None)
+        rate = getattr(settings, 'RATE_LIMITS', {}).get(f"{scope}_{self.scope_suffix}") if scope else None
+        if not rate:
+            return True
+        
+        identifier = self.get_identifier(request, view)
+        if not identifier:
+            return True
+        
+        limit, window = parse_rate(rate)
+        self._wait = rate_limit_hit(f"{scope}:{self.scope_suffix}:{identifier}", limit=limit, window=window)
+        return self._wait is None
+    
+    def wait(self):
+        return math.ceil(self._wait) if self._wait is not None else None
+
+
+class ClientIPThrottle(SlidingWindowThrottle):
+    """Limits requests per client IP address (see NUM_PROXIES)."""
+    scope_suffix = 'ip'
+    
+    def get_identifier(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountThrottle(SlidingWindowThrottle):
+    """
+    Limits requests per account identifier submitted in the request body.
+    
+    The view names the body field with ``throttle_account_field`` (e.g.
+    'username' or 'email'); values are compared case-insensitively.
+    """
+    scope_suffix = 'account'
+    
+    def get_identifier(self, request, view):
+        field = getattr(view, 'throttle_account_field', None)
+        value = request.data.get(field) if field and hasattr(request.data, 'get') else None
+        return str(value).strip().lower() if value else None
@@ -0,0 +1,395 @@
+"""
+Lightweight request tracing.
+
+TracingMiddleware starts a trace for a ``TRACING_SAMPLE_RATE`` fraction of
+requests, or continues the one in an incoming W3C ``traceparent`` header
+(whose sampled flag then decides). Within a traced request spans are
+recorded for:
+
+* every selector/service function decorated with ``@traced``,
+* DRF dispatch, authentication, permission and throttle checks and
+  serializer ``.data`` (hooks installed by install()),
+* every SQL statement, on all database aliases.
+
+Finished traces are exported as OTLP/JSON (one ExportTraceServiceRequest per
+line, as read by the OpenTelemetry collector's otlpjsonfile receiver) to a
+rotating per-worker file in ``TRACING_DIR``, or logged on the ``api.tracing``
+logger when no directory is set.
+
+With ``TRACING_ENABLED`` off, install() does nothing and the only remaining
+cost is one context-variable lookup per ``@traced`` call.
+"""
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from api.common.metrics import request_operation_id
+
+logger = logging.getLogger('api.tracing')
+
+# OTLP SpanKind
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+# OTLP StatusCode
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+TRACEPARENT_HEADER = 'HTTP_TRACEPARENT'
+FILE_PATTERN = 'traces.{pid}.jsonl'
+_SQL_ATTRIBUTE_LENGTH = 1000
+_TRACEPARENT = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+class Trace:
+    """The spans of one trace recorded in this process."""
+
+    __slots__ = ('trace_id', 'spans')
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List['Span'] = []
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'attributes', 'start_ns', 'end_ns', 'error')
+
+    def __init__(self, trace: Trace, parent_id: Optional[str], name: str, kind: int, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('api_tracing_span', default=None)
+
+
+def new_trace_id() -> str:
+    return f'{random.getrandbits(128) or 1:032x}'
+
+
+def new_span_id() -> str:
+    return f'{random.getrandbits(64) or 1:016x}'
+
+
+def current_span() -> Optional[Span]:
+    """The active span of the current request, or None when it is not traced."""
+    return _current_span.get()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse a W3C traceparent header.
+
+    Returns:
+        (trace_id, parent_span_id, sampled), or None if absent or invalid
+    """
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == 'ff' or trace_id == '0' * 32 or span_id == '0' * 16:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    return f'00-{trace_id}-{span_id}-{"01" if sampled else "00"}'
+
+
+class _SpanContext:
+    """Context manager recording a child of the active span."""
+
+    __slots__ = ('name', 'kind', 'attributes', 'span', 'token')
+
+    def __init__(self, name: str, kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is None:
+            self.span = None
+            return None
+        self.span = Span(parent.trace, parent.span_id, self.name, self.kind, self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        span = self.span
+        if span is not None:
+            span.end_ns = time.time_ns()
+            if exc is not None:
+                span.error = f'{exc_type.__name__}: {exc}'
+            _current_span.reset(self.token)
+            span.trace.spans.append(span)
+        return False
+
+
+class _NoopContext:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NOOP = _NoopContext()
+
+
+def span(name: str, *, kind: int = KIND_INTERNAL, **attributes):
+    """
+    Context manager for a span named name under the active span.
+
+    Yields the Span, or None (and records nothing) when the request is not traced.
+    """
+    if _current_span.get() is None:
+        return _NOOP
+    return _SpanContext(name, kind, attributes)
+
+
+def _span_name(func: Callable) -> str:
+    # api.films.selectors.film_list -> films.film_list
+    parts = func.__module__.split('.')
+    if len(parts) == 3 and parts[0] == 'api':
+        return f'{parts[1]}.{func.__name__}'
+    return func.__qualname__
+
+
+def traced(func: Optional[Callable] = None, *, name: Optional[str] = None):
+    """
+    Decorator recording a span for every call of a selector or service.
+
+    The span is named ``<domain>.<function>`` unless name is given. Usable as
+    ``@traced`` or ``@traced(name=...)``; put it above ``@transaction.atomic``
+    so the span includes the commit.
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+
+    span_name = name or _span_name(func)
+    attributes = {'code.namespace': func.__module__, 'code.function': func.__qualname__}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return func(*args, **kwargs)
+        with _SpanContext(span_name, KIND_INTERNAL, dict(attributes)):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """Encode a trace as an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for recorded in trace.spans:
+        encoded = {
+            'traceId': trace.trace_id,
+            'spanId': recorded.span_id,
+            'name': recorded.name,
+            'kind': recorded.kind,
+            'startTimeUnixNano': str(recorded.start_ns),
+            'endTimeUnixNano': str(recorded.end_ns),
+            'attributes': _otlp_attributes(recorded.attributes),
+            'status': {'code': STATUS_ERROR, 'message': recorded.error} if recorded.error else {'code': STATUS_UNSET},
+        }
+        if recorded.parent_id:
+            encoded['parentSpanId'] = recorded.parent_id
+        spans.append(encoded)
+
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({
+                'service.name': getattr(settings, 'TRACING_SERVICE_NAME', 'dvdrental-api'),
+                'process.pid': os.getpid(),
+            })},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+        }],
+    }
+
+
+class _TraceFileExporter:
+    """Append OTLP/JSON lines to this worker's rotating file in TRACING_DIR."""
+
+    def __init__(self):
+        self._handler: Optional[RotatingFileHandler] = None
+        self._handler_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _file_handler(self, directory: str) -> RotatingFileHandler:
+        pid = os.getpid()
+        if self._handler_pid != pid:
+            os.makedirs(directory, exist_ok=True)
+            self._handler = RotatingFileHandler(
+                os.path.join(directory, FILE_PATTERN.format(pid=pid)),
+                maxBytes=getattr(settings, 'TRACING_FILE_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=getattr(settings, 'TRACING_FILE_BACKUPS', 3),
+                encoding='utf-8',
+            )
+            self._handler.setFormatter(logging.Formatter('%(message)s'))
+            self._handler_pid = pid
+        return self._handler
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(to_otlp(trace), separators=(',', ':'))
+        directory = getattr(settings, 'TRACING_DIR', '')
+        if not directory:
+            logger.info(line)
+            return
+        with self._lock:
+            handler = self._file_handler(directory)
+        handler.emit(logging.makeLogRecord({'msg': line, 'levelno': logging.INFO}))
+
+
+_exporter = _TraceFileExporter()
+
+
+class TracingMiddleware:
+    """Start or continue a trace for sampled requests; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'TRACING_ENABLED', False):
+            return self.get_response(request)
+
+        parent = parse_traceparent(request.META.get(TRACEPARENT_HEADER))
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = new_trace_id(), None
+            sampled = random.random() < getattr(settings, 'TRACING_SAMPLE_RATE', 0.01)
+        if not sampled:
+            return self.get_response(request)
+
+        trace = Trace(trace_id)
+        root = Span(trace, parent_id, f'{request.method} {request.path}', KIND_SERVER, {
+            'http.method': request.method,
+            'http.target': request.path,
+        })
+        token = _current_span.set(root)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_span.reset(token)
+            root.end_ns = time.time_ns()
+
+        operation = request_operation_id(request)
+        root.name = f'{request.method} {operation}'
+        root.attributes['http.route'] = operation
+        root.attributes['http.status_code'] = response.status_code
+        if response.status_code >= 500:
+            root.error = f'HTTP {response.status_code}'
+        trace.spans.append(root)
+        try:
+            _exporter.export(trace)
+        except Exception:
+            logger.exception("Failed to export trace %s", trace_id)
+
+        response['traceparent'] = format_traceparent(trace_id, root.span_id, True)
+        return response
+
+
+def _sql_span(execute, sql, params, many, context):
+    """Execute wrapper recording a client span per statement."""
+    if _current_span.get() is None:
+        return execute(sql, params, many, context)
+    alias = context['connection'].alias
+    operation = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else 'SQL'
+    with _SpanContext(f'{operation} {alias}', KIND_CLIENT, {
+        'db.system': 'postgresql',
+        'db.name': alias,
+        'db.statement': sql[:_SQL_ATTRIBUTE_LENGTH],
+        'db.executemany': many or None,
+    }):
+        return execute(sql, params, many, context)
+
+
+def _install_sql_span(sender, connection, **kwargs) -> None:
+    # See slow_queries._install_recorder for why the wrapper is inserted at the front
+    if _sql_span not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _sql_span)
+
+
+def _class_name(obj) -> str:
+    return type(obj).__name__
+
+
+def _list_serializer_name(serializer) -> str:
+    return f'{type(serializer.child).__name__}[]'
+
+
+def _traced_method(method: Callable, suffix: str, label: Callable[[Any], str] = _class_name) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _current_span.get() is None:
+            return method(self, *args, **kwargs)
+        with _SpanContext(f'{label(self)}.{suffix}', KIND_INTERNAL, {}):
+            return method(self, *args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def _install_drf_spans() -> None:
+    from rest_framework import serializers
+    from rest_framework.views import APIView
+
+    if getattr(APIView.dispatch, '__traced__', False):
+        return
+
+    for method_name in ('dispatch', 'perform_authentication', 'check_permissions',
+                        'check_object_permissions', 'check_throttles'):
+        setattr(APIView, method_name, _traced_method(getattr(APIView, method_name), method_name))
+
+    serializers.Serializer.data = property(_traced_method(serializers.Serializer.data.fget, 'data'))
+    serializers.ListSerializer.data = property(
+        _traced_method(serializers.ListSerializer.data.fget, 'data', _list_serializer_name))
+
+
+def install() -> None:
+    """Install the DRF and SQL span hooks if TRACING_ENABLED (called from ApiConfig.ready)."""
+    if not getattr(settings, 'TRACING_ENABLED', False):
+        return
+    _install_drf_spans()
+    connection_created.connect(_install_sql_span, dispatch_uid='tracing_sql_span')
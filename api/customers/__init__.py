@@ -0,0 +1,4 @@
+"""
+Customers domain.
+"""
+
@@ -0,0 +1,37 @@
+"""
+Customer domain APIs.
+"""
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
+
+from api.permissions import IsStaffOrAdmin
+from api.customers.selectors import customer_summary_get
+from api.customers.serializers import CustomerSummaryOutputSerializer
+
+
+class CustomerSummaryApi(APIView):
+    """Get a customer's balance and rental/payment history summary"""
+    permission_classes = [IsStaffOrAdmin]
+    
+    @extend_schema(
+        operation_id='customers_summary',
+        summary='Get customer summary',
+        description='Get rental count, open rentals, lifetime spend and outstanding balance (rental charges minus payments, excluding late fees) of a customer. Staff/admin only.',
+        responses={
+            200: CustomerSummaryOutputSerializer,
+            404: {'description': 'Customer not found'}
+        },
+        tags=['Customers']
+    )
+    def get(self, request, customer_id):
+        """Get customer summary"""
+        summary = customer_summary_get(customer_id=customer_id)
+        serializer = CustomerSummaryOutputSerializer(summary)
+        return Response(
+            {
+                'summary': serializer.data
+            },
+            status=status.HTTP_200_OK
+        )
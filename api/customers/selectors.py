@@ -0,0 +1,99 @@
+"""
+Customer domain selectors using raw SQL queries.
+"""
+from typing import Dict
+
+from api.common.db import get_dvdrental_connection
+from api.common.exceptions import NotFoundError
+from api.common.tracing import traced
+
+
+SUMMARY_COLUMNS = ('rental_count', 'open_rental_count', 'rental_charges', 'payment_count', 'lifetime_spend')
+
+
+@traced
+def customer_summary_aggregate_query(*, filtered: bool) -> str:
+    """
+    Build the query computing customer_summary rows from rental and payment.
+    
+    Rental charges are the film rental rates of all rentals; late fees are
+    time-dependent and therefore not part of the maintained summary.
+    
+    Args:
+        filtered: Restrict to the customer IDs passed as the %(customer_ids)s parameter
+        
+    Returns:
+        SQL selecting customer_id followed by SUMMARY_COLUMNS
+    """
+    condition = "WHERE {alias}.customer_id = ANY(%(customer_ids)s)" if filtered else ""
+    
+    return f"""
+        SELECT c.customer_id,
+               COALESCE(r.rental_count, 0),
+               COALESCE(r.open_rental_count, 0),
+               COALESCE(r.rental_charges, 0),
+               COALESCE(p.payment_count, 0),
+               COALESCE(p.lifetime_spend, 0)
+        FROM customer c
+        LEFT JOIN (
+            SELECT r.customer_id,
+                   COUNT(*) AS rental_count,
+                   COUNT(*) FILTER (WHERE r.return_date IS NULL) AS open_rental_count,
+                   SUM(f.rental_rate) AS rental_charges
+            FROM rental r
+            LEFT JOIN inventory i ON i.inventory_id = r.inventory_id
+            LEFT JOIN film f ON f.film_id = i.film_id
+            {condition.format(alias='r')}
+            GROUP BY r.customer_id
+        ) r ON r.customer_id = c.customer_id
+        LEFT JOIN (
+            SELECT p.customer_id, COUNT(*) AS payment_count, SUM(p.amount) AS lifetime_spend
+            FROM payment p
+            {condition.format(alias='p')}
+            GROUP BY p.customer_id
+        ) p ON p.customer_id = c.customer_id
+        {condition.format(alias='c')}
+    """
+
+
+@traced
+def customer_summary_get(*, customer_id: int) -> Dict:
+    """
+    Get the balance and history summary of a customer.
+    
+    Reads the maintained customer_summary row; customers without one (before
+    the first rebuild) are aggregated on the fly.
+    
+    Args:
+        customer_id: Customer ID
+        
+    Returns:
+        Summary dictionary including balance (rental charges minus payments)
+        
+    Raises:
+        NotFoundError: If customer not found
+    """
+    conn = get_dvdrental_connection()
+    
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT customer_id, {', '.join(SUMMARY_COLUMNS)}, rental_charges - lifetime_spend AS balance, updated_at "
+            "FROM customer_summary WHERE customer_id = %s",
+            [customer_id]
+        )
+        row = cursor.fetchone()
+        
+        if row:
+            columns = [col[0] for col in cursor.description]
+            return dict(zip(columns, row))
+        
+        cursor.execute(customer_summary_aggregate_query(filtered=True), {'customer_ids': [customer_id]})
+        row = cursor.fetchone()
+        
+        if not row:
+            raise NotFoundError(f"Customer with id {customer_id} not found.")
+        
+        summary = dict(zip(('customer_id', *SUMMARY_COLUMNS), row))
+        summary['balance'] = summary['rental_charges'] - summary['lifetime_spend']
+        summary['updated_at'] = None
+        return summary
@@ -0,0 +1,16 @@
+"""
+Customer domain serializers.
+"""
+from rest_framework import serializers
+
+
+class CustomerSummaryOutputSerializer(serializers.Serializer):
+    """Serializer for customer balance and history summary"""
+    customer_id = serializers.IntegerField()
+    rental_count = serializers.IntegerField()
+    open_rental_count = serializers.IntegerField()
+    payment_count = serializers.IntegerField()
+    rental_charges = serializers.DecimalField(max_digits=10, decimal_places=2)
+    lifetime_spend = serializers.DecimalField(max_digits=10, decimal_places=2)
+    balance = serializers.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = serializers.DateTimeField(allow_null=True)
@@ -0,0 +1,159 @@
+"""
+Customer domain services.
+
+customer_summary holds per-customer counters that rental and payment services
+adjust in the same transaction as their own writes, so reading a summary is a
+single primary-key lookup. ``customer_summary_rebuild`` recomputes rows from
+scratch (initial load, after bulk loads or manual fixes).
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+
+from api.common.db import get_dvdrental_connection
+from api.common.tracing import traced
+from api.customers.selectors import SUMMARY_COLUMNS, customer_summary_aggregate_query
+
+
+def _summary_insert_query(*, filtered: bool, on_conflict: str) -> str:
+    return (
+        f"INSERT INTO customer_summary (customer_id, {', '.join(SUMMARY_COLUMNS)}) "
+        f"{customer_summary_aggregate_query(filtered=filtered)} "
+        f"ON CONFLICT (customer_id) {on_conflict}"
+    )
+
+
+def _summary_apply_delta(cursor, customer_id: int, delta: Dict[str, object]) -> None:
+    """
+    Add delta to a customer's summary row, seeding the row if it does not exist yet.
+    
+    The seed is aggregated after the caller's write, so it already includes
+    the change and the delta is not applied on top of it.
+    """
+    assignments = ', '.join(f"{column} = {column} + %s" for column in SUMMARY_COLUMNS)
+    update_query = f"UPDATE customer_summary SET {assignments}, updated_at = NOW() WHERE customer_id = %s"
+    update_params = [delta.get(column, 0) for column in SUMMARY_COLUMNS] + [customer_id]
+    
+    cursor.execute(update_query, update_params)
+    if cursor.rowcount:
+        return
+    
+    cursor.execute(_summary_insert_query(filtered=True, on_conflict='DO NOTHING'), {'customer_ids': [customer_id]})
+    if cursor.rowcount:
+        return
+    
+    # A concurrent transaction seeded the row first; it is visible now
+    cursor.execute(update_query, update_params)
+
+
+def _summary_apply_deltas(cursor, deltas: Dict[int, Dict[str, object]]) -> None:
+    for customer_id in sorted(deltas):
+        if any(deltas[customer_id].values()):
+            _summary_apply_delta(cursor, customer_id, deltas[customer_id])
+
+
+@traced
+def customer_summary_record_rental(*, old: Optional[Dict], new: Optional[Dict]) -> None:
+    """
+    Apply a rental write to the customer summaries.
+    
+    Must run inside the transaction that performed the write.
+    
+    Args:
+        old: Rental row before the write (None for a create)
+        new: Rental row after the write (None for a delete)
+    """
+    conn = get_dvdrental_connection()
+    deltas = defaultdict(lambda: defaultdict(int))
+    rows = [(row, sign) for row, sign in ((old, -1), (new, 1)) if row is not None]
+    
+    with conn.cursor() as cursor:
+        # Charges cancel out unless the customer or the inventory item changed
+        charges_changed = not (
+            old and new
+            and old['customer_id'] == new['customer_id']
+            and old['inventory_id'] == new['inventory_id']
+        )
+        rates = {}
+        if charges_changed:
+            cursor.execute(
+                "SELECT i.inventory_id, f.rental_rate FROM inventory i JOIN film f ON f.film_id = i.film_id "
+                "WHERE i.inventory_id = ANY(%s)",
+                [[row['inventory_id'] for row, _ in rows]]
+            )
+            rates = dict(cursor.fetchall())
+        
+        for row, sign in rows:
+            delta = deltas[row['customer_id']]
+            delta['rental_count'] += sign
+            if row['return_date'] is None:
+                delta['open_rental_count'] += sign
+            if charges_changed:
+                delta['rental_charges'] += sign * rates.get(row['inventory_id'], Decimal('0'))
+        
+        _summary_apply_deltas(cursor, deltas)
+
+
+@traced
+def customer_summary_record_payment(*, old: Optional[Dict], new: Optional[Dict]) -> None:
+    """
+    Apply a payment write to the customer summaries.
+    
+    Must run inside the transaction that performed the write.
+    
+    Args:
+        old: Payment row before the write (None for a create)
+        new: Payment row after the write (None for a delete)
+    """
+    conn = get_dvdrental_connection()
+    deltas = defaultdict(lambda: defaultdict(int))
+    
+    for row, sign in ((old, -1), (new, 1)):
+        if row is None:
+            continue
+        delta = deltas[row['customer_id']]
+        delta['payment_count'] += sign
+        delta['lifetime_spend'] += sign * Decimal(row['amount'])
+    
+    with conn.cursor() as cursor:
+        _summary_apply_deltas(cursor, deltas)
+
+
+@traced
+@transaction.atomic(using='dvdrental_sample')
+def customer_summary_rebuild(*, customer_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute customer summaries from the rental and payment tables.
+    
+    Holds an EXCLUSIVE lock on customer_summary for the duration, so
+    concurrent rental/payment writes wait instead of losing their deltas.
+    
+    Args:
+        customer_ids: Customers to rebuild; all customers if None
+        
+    Returns:
+        Number of summary rows written
+    """
+    conn = get_dvdrental_connection()
+    filtered = customer_ids is not None
+    on_conflict = 'DO UPDATE SET ' + ', '.join(
+        f"{column} = EXCLUDED.{column}" for column in SUMMARY_COLUMNS
+    ) + ', updated_at = NOW()'
+    
+    with conn.cursor() as cursor:
+        cursor.execute("LOCK TABLE customer_summary IN EXCLUSIVE MODE")
+        cursor.execute(
+            _summary_insert_query(filtered=filtered, on_conflict=on_conflict),
+            {'customer_ids': sorted(set(customer_ids))} if filtered else None
+        )
+        written = cursor.rowcount
+        
+        if not filtered:
+            cursor.execute(
+                "DELETE FROM customer_summary s WHERE NOT EXISTS "
+                "(SELECT 1 FROM customer c WHERE c.customer_id = s.customer_id)"
+            )
+    
+    return written
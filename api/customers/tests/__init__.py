@@ -0,0 +1,3 @@
+"""
+Customers domain tests package.
+"""
@@ -0,0 +1,67 @@
+"""
+Customer domain service tests.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+
+from api.common.tests.sample_schema import create_sample_tables
+from api.customers.selectors import customer_summary_get
+from api.customers.services import customer_summary_rebuild
+from api.payments.services import payment_create, payment_delete, payment_update
+from api.rentals.services import rental_create, rental_delete, rental_update
+
+
+class CustomerSummaryTestCase(TestCase):
+    """Test incremental maintenance of customer_summary"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=2000)
+        customer_summary_rebuild()
+
+    def assertSummaryMatchesRebuild(self, customer_id):
+        incremental = customer_summary_get(customer_id=customer_id)
+        customer_summary_rebuild(customer_ids=[customer_id])
+        rebuilt = customer_summary_get(customer_id=customer_id)
+
+        for field in ('rental_count', 'open_rental_count', 'rental_charges', 'payment_count', 'lifetime_spend', 'balance'):
+            self.assertEqual(incremental[field], rebuilt[field], field)
+
+    def test_rental_writes_update_summary(self):
+        """Test rental create, return, reassignment and delete keep counters exact"""
+        before = customer_summary_get(customer_id=7)
+
+        rental = rental_create(inventory_id=4581, customer_id=7, staff_id=1, rental_date=datetime(2021, 1, 1))
+        after_create = customer_summary_get(customer_id=7)
+        self.assertEqual(after_create['rental_count'], before['rental_count'] + 1)
+        self.assertEqual(after_create['open_rental_count'], before['open_rental_count'] + 1)
+        self.assertSummaryMatchesRebuild(7)
+
+        rental_update(rental_id=rental['rental_id'], return_date=datetime(2021, 1, 3))
+        self.assertSummaryMatchesRebuild(7)
+
+        rental_update(rental_id=rental['rental_id'], customer_id=8, inventory_id=4580)
+        self.assertSummaryMatchesRebuild(7)
+        self.assertSummaryMatchesRebuild(8)
+
+        rental_delete(rental_id=rental['rental_id'])
+        self.assertSummaryMatchesRebuild(8)
+
+    def test_payment_writes_update_summary(self):
+        """Test payment create, update and delete adjust spend and balance"""
+        before = customer_summary_get(customer_id=9)
+
+        payment = payment_create(customer_id=9, staff_id=1, amount=Decimal('3.50'))
+        after_create = customer_summary_get(customer_id=9)
+        self.assertEqual(after_create['lifetime_spend'], before['lifetime_spend'] + Decimal('3.50'))
+        self.assertEqual(after_create['balance'], before['balance'] - Decimal('3.50'))
+
+        payment_update(payment_id=payment['payment_id'], amount=Decimal('5.00'), customer_id=10)
+        self.assertSummaryMatchesRebuild(9)
+        self.assertSummaryMatchesRebuild(10)
+
+        payment_delete(payment_id=payment['payment_id'])
+        self.assertSummaryMatchesRebuild(10)
@@ -0,0 +1,9 @@
+"""
+Customer domain URLs.
+"""
+from django.urls import path
+from api.customers.apis import CustomerSummaryApi
+
+urlpatterns = [
+    path('<int:customer_id>/summary/', CustomerSummaryApi.as_view(), name='customer-summary'),
+]
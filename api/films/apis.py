@@ -9,8 +9,14 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from api.permissions import IsAuthenticatedReadOnly
+from api.common.encoders import DATABASE, EncodedJSON, response_mode, serialize_list
 from api.films.services import film_create, film_update, film_delete
-from api.films.selectors import film_list, film_get_by_id
+from api.films.selectors import (
+    film_list,
+    film_get_by_id,
+    film_list_json,
+    film_get_by_id_json,
+)
 from api.films.serializers import (
     FilmListOutputSerializer,
     FilmDetailOutputSerializer,
@@ -55,21 +61,24 @@ class FilmListApi(APIView):
         
         offset = (page - 1) * page_size
         
-        films, total_count = film_list(
-            search=search,
-            limit=page_size,
-            offset=offset
-        )
-        
-        # Serialize response
-        serializer = FilmListOutputSerializer(films, many=True)
+        filters = {
+            'search': search,
+            'limit': page_size,
+            'offset': offset,
+        }
+        if response_mode() == DATABASE:
+            results, total_count = film_list_json(serializer_class=FilmListOutputSerializer, **filters)
+            results = EncodedJSON(results)
+        else:
+            films, total_count = film_list(**filters)
+            results = serialize_list(FilmListOutputSerializer, films)
         
         # Build paginated response
         response_data = {
             'count': total_count,
             'next': None,
             'previous': None,
-            'results': serializer.data
+            'results': results
         }
         
         if offset + page_size < total_count:
@@ -128,11 +137,15 @@ class FilmDetailApi(APIView):
     )
     def get(self, request, film_id):
         """Get film details"""
-        film = film_get_by_id(film_id=film_id)
-        serializer = FilmDetailOutputSerializer(film)
+        if response_mode() == DATABASE:
+            film = EncodedJSON(
+                film_get_by_id_json(film_id=film_id, serializer_class=FilmDetailOutputSerializer)
+            )
+        else:
+            film = FilmDetailOutputSerializer(film_get_by_id(film_id=film_id)).data
         return Response(
             {
-                'film': serializer.data
+                'film': film
             },
             status=status.HTTP_200_OK
         )
@@ -5,8 +5,27 @@ from typing import List, Dict, Optional, Tuple
 from django.db import connection
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import NotFoundError
+from api.common.json_sql import json_page_params, json_page_sql, json_row_sql
+from api.common.tracing import traced
 
+FILM_COLUMNS = "film_id, title, description, release_year, language_id, rental_duration, rental_rate, length, replacement_cost, rating, last_update"
 
+
+def _film_list_where(search: Optional[str]) -> Tuple[str, List]:
+    """WHERE clause and parameters of the film list filters."""
+    params = []
+    conditions = []
+    
+    if search:
+        conditions.append("(title ILIKE %s OR description ILIKE %s)")
+        search_pattern = f"%{search}%"
+        params.extend([search_pattern, search_pattern])
+    
+    where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where_clause, params
+
+
+@traced
 def film_list(
     *,
     search: Optional[str] = None,
@@ -28,21 +47,9 @@ def film_list(
     
     with conn.cursor() as cursor:
         # Build query with optional search
-        base_query = "SELECT film_id, title, description, release_year, language_id, rental_duration, rental_rate, length, replacement_cost, rating, last_update FROM film"
-        count_query = "SELECT COUNT(*) FROM film"
-        
-        params = []
-        conditions = []
-        
-        if search:
-            conditions.append("(title ILIKE %s OR description ILIKE %s)")
-            search_pattern = f"%{search}%"
-            params.extend([search_pattern, search_pattern])
-        
-        if conditions:
-            where_clause = " WHERE " + " AND ".join(conditions)
-            base_query += where_clause
-            count_query += where_clause
+        where_clause, params = _film_list_where(search)
+        base_query = f"SELECT {FILM_COLUMNS} FROM film{where_clause}"
+        count_query = f"SELECT COUNT(*) FROM film{where_clause}"
         
         # Get total count
         cursor.execute(count_query, params)
@@ -59,6 +66,7 @@ def film_list(
         return films, total_count
 
 
+@traced
 def film_get_by_id(*, film_id: int) -> Dict:
     """
     Get a single film by ID.
@@ -75,10 +83,7 @@ def film_get_by_id(*, film_id: int) -> Dict:
     conn = get_dvdrental_connection()
     
     with conn.cursor() as cursor:
-        cursor.execute(
-            "SELECT film_id, title, description, release_year, language_id, rental_duration, rental_rate, length, replacement_cost, rating, last_update FROM film WHERE film_id = %s",
-            [film_id]
-        )
+        cursor.execute(f"SELECT {FILM_COLUMNS} FROM film WHERE film_id = %s", [film_id])
         
         columns = [col[0] for col in cursor.description]
         row = cursor.fetchone()
@@ -89,6 +94,70 @@ def film_get_by_id(*, film_id: int) -> Dict:
         return dict(zip(columns, row))
 
 
+@traced
+def film_list_json(
+    *,
+    serializer_class,
+    search: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Tuple[bytes, int]:
+    """
+    List films like film_list, rendered as a JSON array by Postgres.
+    
+    Args:
+        serializer_class: Output serializer each film is rendered as
+        search: Optional search term for title or description
+        limit: Number of records to return
+        offset: Number of records to skip
+        
+    Returns:
+        Tuple of (JSON array bytes, total count)
+    """
+    conn = get_dvdrental_connection()
+    
+    with conn.cursor() as cursor:
+        where_clause, params = _film_list_where(search)
+        cursor.execute(
+            json_page_sql(serializer_class, columns=FILM_COLUMNS, table='film', where=where_clause, order_by='title'),
+            json_page_params(params, limit=limit, offset=offset)
+        )
+        total_count, results = cursor.fetchone()
+        
+        return results.encode(), total_count
+
+
+@traced
+def film_get_by_id_json(*, film_id: int, serializer_class) -> bytes:
+    """
+    Get a single film rendered as a JSON object by Postgres.
+    
+    Args:
+        film_id: Film ID to retrieve
+        serializer_class: Output serializer the film is rendered as
+        
+    Returns:
+        JSON object bytes
+        
+    Raises:
+        NotFoundError: If film not found
+    """
+    conn = get_dvdrental_connection()
+    
+    with conn.cursor() as cursor:
+        cursor.execute(
+            json_row_sql(serializer_class, columns=FILM_COLUMNS, table='film', where=' WHERE film_id = %s'),
+            [film_id]
+        )
+        row = cursor.fetchone()
+        
+        if not row:
+            raise NotFoundError(f"Film with id {film_id} not found.")
+        
+        return row[0].encode()
+
+
+@traced
 def film_exists(*, film_id: int) -> bool:
     """
     Check if a film exists.
@@ -106,6 +175,7 @@ def film_exists(*, film_id: int) -> bool:
         return cursor.fetchone() is not None
 
 
+@traced
 def film_get_special_features(*, film_id: int) -> List[str]:
     """
     Get special features for a film (stored as PostgreSQL array).
@@ -5,9 +5,11 @@ from typing import Dict
 from django.db import transaction
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import NotFoundError, BusinessLogicError
+from api.common.tracing import traced
 from api.films.selectors import film_exists, film_get_by_id
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def film_create(**film_data) -> Dict:
     """
@@ -74,6 +76,7 @@ def film_create(**film_data) -> Dict:
         return dict(zip(columns, row))
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def film_update(*, film_id: int, **film_data) -> Dict:
     """
@@ -143,6 +146,7 @@ def film_update(*, film_id: int, **film_data) -> Dict:
         return dict(zip(columns, row))
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def film_delete(*, film_id: int) -> None:
     """
@@ -0,0 +1,44 @@
+"""
+Bulk-load payments from a CSV or NDJSON file.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.common.exceptions import BusinessLogicError
+from api.payments.services import INGEST_FORMATS, payment_bulk_ingest, payment_ingest_write_rejects
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load payments via COPY into a staging table with set-based validation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or NDJSON file')
+        parser.add_argument('--format', choices=INGEST_FORMATS, help='Input format (default: from file extension)')
+        parser.add_argument('--errors', help='Write rejected rows to this CSV file')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, do not insert')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('ndjson' if path.lower().endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        started = time.monotonic()
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as source:
+                result = payment_bulk_ingest(source=source, file_format=file_format, dry_run=options['dry_run'])
+        except (OSError, BusinessLogicError) as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        if options['errors'] and result['rejects']:
+            with open(options['errors'], 'w', encoding='utf-8', newline='') as destination:
+                payment_ingest_write_rejects(rejects=result['rejects'], destination=destination)
+            self.stdout.write(f"Rejected rows written to {options['errors']}")
+
+        if options['dry_run']:
+            verb, count = 'Validated', result['total'] - result['rejected']
+        else:
+            verb, count = 'Inserted', result['inserted']
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} of {result['total']} payments ({result['rejected']} rejected) in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,74 @@
+"""
+Manage monthly range partitions of payment and rental.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.common.exceptions import BusinessLogicError
+from api.common.partitioning import (
+    PARTITIONED_TABLES,
+    partition_table_convert,
+    partitions_create_ahead,
+    partitions_detach_before,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create future monthly partitions for payment/rental (default action), convert the tables '
+        'to the partitioned layout once with --convert, and optionally detach/archive old partitions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table', action='append', choices=sorted(PARTITIONED_TABLES),
+            help='Table to manage (repeatable, default: all)'
+        )
+        parser.add_argument('--ahead', type=int, default=3, help='Months ahead to create partitions for (default 3)')
+        parser.add_argument('--convert', action='store_true', help='One-time conversion of plain tables to partitioned')
+        parser.add_argument('--detach-before', help='Detach partitions that end on or before YYYY-MM')
+        parser.add_argument('--archive-schema', help='Move detached partitions into this schema')
+
+    def handle(self, *args, **options):
+        tables = options['table'] or sorted(PARTITIONED_TABLES)
+        # payment references rental, so it is converted first
+        tables = sorted(tables, key=lambda t: t != 'payment')
+
+        detach_before = None
+        if options['detach_before']:
+            try:
+                year, month = options['detach_before'].split('-')
+                detach_before = date(int(year), int(month), 1)
+            except ValueError:
+                raise CommandError('--detach-before must be in YYYY-MM format.')
+
+        try:
+            for table in tables:
+                if options['convert']:
+                    result = partition_table_convert(table=table, months_ahead=options['ahead'])
+                    self.stdout.write(
+                        f"{table}: converted, {result['rows_copied']} rows copied into "
+                        f"{result['partitions_created']} monthly partitions"
+                    )
+                    for constraint in result['dropped_foreign_keys']:
+                        self.stdout.write(self.style.WARNING(
+                            f"  dropped foreign key {constraint} (ON DELETE kept by a trigger; inserts no longer checked)"
+                        ))
+                    for index in result['skipped_indexes']:
+                        self.stdout.write(self.style.WARNING(f"  skipped unique index {index} (no partition key)"))
+                else:
+                    created = partitions_create_ahead(table=table, months_ahead=options['ahead'])
+                    self.stdout.write(f"{table}: created {len(created)} partitions {', '.join(created)}".rstrip())
+
+                if detach_before:
+                    detached = partitions_detach_before(
+                        table=table,
+                        before=detach_before,
+                        archive_schema=options['archive_schema']
+                    )
+                    self.stdout.write(f"{table}: detached {len(detached)} partitions {', '.join(detached)}".rstrip())
+        except BusinessLogicError as e:
+            raise CommandError(str(e.detail))
+
+        self.stdout.write(self.style.SUCCESS('Partition maintenance finished.'))
@@ -0,0 +1,14 @@
+"""
+Delete expired Idempotency-Key records.
+"""
+from django.core.management.base import BaseCommand
+
+from api.common.idempotency import idempotency_keys_purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys from the dvdrental_sample database.'
+
+    def handle(self, *args, **options):
+        deleted = idempotency_keys_purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys."))
@@ -0,0 +1,23 @@
+"""
+Recompute customer balance and history summaries.
+"""
+from django.core.management.base import BaseCommand
+
+from api.customers.services import customer_summary_rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the customer_summary table from rental and payment data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customer',
+            type=int,
+            action='append',
+            dest='customer_ids',
+            help='Only rebuild this customer (repeatable). Defaults to all customers.'
+        )
+
+    def handle(self, *args, **options):
+        written = customer_summary_rebuild(customer_ids=options['customer_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} customer summaries."))
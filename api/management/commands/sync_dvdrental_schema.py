@@ -0,0 +1,16 @@
+"""
+Apply the API's auxiliary tables and indexes to the dvdrental_sample database.
+"""
+from django.core.management.base import BaseCommand
+
+from api.common.dvdrental_schema import apply_dvdrental_ddl
+
+
+class Command(BaseCommand):
+    help = 'Create the tables and indexes the API needs in the dvdrental_sample database (idempotent).'
+
+    def handle(self, *args, **options):
+        applied = apply_dvdrental_ddl()
+        for name in applied:
+            self.stdout.write(f"  applied {name}")
+        self.stdout.write(self.style.SUCCESS(f"dvdrental_sample schema is up to date ({len(applied)} statements)."))
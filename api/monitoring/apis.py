@@ -0,0 +1,151 @@
+"""
+Monitoring domain APIs.
+"""
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
+
+from api.permissions import IsAdmin
+from api.common.profiling import (
+    PROFILE_MODE_PARAM,
+    PROFILE_PARAM,
+    format_folded,
+    profile_token_create,
+)
+from api.monitoring.selectors import (
+    profile_operation_list,
+    profile_operation_stacks,
+    slow_query_top,
+)
+from api.monitoring.serializers import (
+    ProfileOperationOutputSerializer,
+    ProfileTokenOutputSerializer,
+    SlowQueryOutputSerializer,
+)
+
+
+class SlowQueryListApi(APIView):
+    """List the slowest dvdrental query fingerprints"""
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(
+        operation_id='monitoring_slow_queries',
+        summary='List slow queries',
+        description='Returns dvdrental_sample statement fingerprints slower than SLOW_QUERY_THRESHOLD_MS, ranked by total time, with the calling selector and the latest captured EXPLAIN plan. Admin only.',
+        parameters=[
+            OpenApiParameter('limit', OpenApiTypes.INT, description='Maximum number of fingerprints (default 20, max 200)', required=False),
+        ],
+        responses={
+            200: SlowQueryOutputSerializer(many=True),
+            400: {'description': 'Validation error'},
+        },
+        tags=['Monitoring']
+    )
+    def get(self, request):
+        """List slow query fingerprints"""
+        limit_param = request.query_params.get('limit', '20')
+        
+        if not limit_param.isdigit():
+            return Response(
+                {
+                    'error': {
+                        'type': 'ValidationError',
+                        'message': 'Limit must be a valid integer.',
+                        'code': 'validation_error',
+                        'status_code': 400
+                    }
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = slow_query_top(limit=min(int(limit_param), 200))
+        serializer = SlowQueryOutputSerializer(results, many=True)
+        return Response(
+            {
+                'count': len(results),
+                'results': serializer.data
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class ProfileTokenApi(APIView):
+    """Issue a token for profiling single requests"""
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(
+        operation_id='monitoring_profile_token',
+        summary='Create a profiling token',
+        description=(
+            'Returns a short-lived signed token. A request sent with it in the X-Profile header '
+            f'(or the {PROFILE_PARAM} query parameter) is profiled and answered with the profile file '
+            'instead of its normal response: collapsed stacks for flame graphs by default, or a cProfile '
+            f'.prof file with X-Profile-Mode: cprofile (or {PROFILE_MODE_PARAM}=cprofile). Admin only.'
+        ),
+        request=None,
+        responses={
+            201: ProfileTokenOutputSerializer,
+        },
+        tags=['Monitoring']
+    )
+    def post(self, request):
+        """Create a profiling token"""
+        serializer = ProfileTokenOutputSerializer({
+            'token': profile_token_create(user_id=request.user.pk),
+            'header': 'X-Profile',
+            'query_parameter': PROFILE_PARAM,
+            'expires_in': settings.PROFILE_TOKEN_MAX_AGE,
+        })
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ProfileOperationListApi(APIView):
+    """List operations with background-sampled stacks"""
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(
+        operation_id='monitoring_profiles',
+        summary='List sampled operations',
+        description='Returns the operations sampled by background profiling (PROFILE_SAMPLE_RATE) with their sample counts. Admin only.',
+        responses={
+            200: ProfileOperationOutputSerializer(many=True),
+        },
+        tags=['Monitoring']
+    )
+    def get(self, request):
+        """List sampled operations"""
+        results = profile_operation_list()
+        serializer = ProfileOperationOutputSerializer(results, many=True)
+        return Response(
+            {
+                'count': len(results),
+                'results': serializer.data
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class ProfileOperationStacksApi(APIView):
+    """Download the aggregated stacks of one operation"""
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(
+        operation_id='monitoring_profiles_download',
+        summary='Download sampled stacks',
+        description='Returns the background-sampled stacks of an operation in collapsed-stack format (flamegraph.pl, speedscope). Admin only.',
+        responses={
+            (200, 'text/plain'): OpenApiTypes.STR,
+            404: {'description': 'No samples for the operation'},
+        },
+        tags=['Monitoring']
+    )
+    def get(self, request, operation):
+        """Download sampled stacks"""
+        stacks = profile_operation_stacks(operation=operation)
+        response = HttpResponse(format_folded(stacks), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{operation}.folded"'
+        return response
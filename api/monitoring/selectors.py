@@ -0,0 +1,85 @@
+"""
+Monitoring domain selectors.
+"""
+from typing import Dict, List
+
+from api.common.exceptions import NotFoundError
+from api.common.profiling import profile_store_snapshot
+from api.common.slow_queries import slow_query_records
+
+
+def slow_query_top(*, limit: int = 20) -> List[Dict]:
+    """
+    Rank slow-query fingerprints by total time spent in them.
+
+    Args:
+        limit: Maximum number of fingerprints to return
+
+    Returns:
+        List of per-fingerprint dictionaries, slowest total first. Each carries
+        the latest sample statement/parameters and the latest captured EXPLAIN plan.
+    """
+    groups: Dict[str, Dict] = {}
+
+    for record in sorted(slow_query_records(), key=lambda r: r.get('at', 0)):
+        group = groups.get(record['fingerprint'])
+        if group is None:
+            group = groups[record['fingerprint']] = {
+                'fingerprint': record['fingerprint'],
+                'normalized_sql': record['normalized_sql'],
+                'calls': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'callers': set(),
+                'explain': None,
+            }
+        group['calls'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['max_ms'] = max(group['max_ms'], record['duration_ms'])
+        if record.get('caller'):
+            group['callers'].add(record['caller'])
+        group['last_seen'] = record['at']
+        group['sample_sql'] = record['sql']
+        group['sample_params'] = record.get('params')
+        if record.get('explain'):
+            group['explain'] = record['explain']
+
+    top = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)[:limit]
+    for group in top:
+        group['total_ms'] = round(group['total_ms'], 2)
+        group['mean_ms'] = round(group['total_ms'] / group['calls'], 2)
+        group['callers'] = sorted(group['callers'])
+    return top
+
+
+def profile_operation_list() -> List[Dict]:
+    """
+    List operations with background-sampled stacks.
+
+    Returns:
+        List of dictionaries with operation, samples and distinct stacks, most samples first
+    """
+    operations = [
+        {'operation': operation, 'samples': sum(stacks.values()), 'stacks': len(stacks)}
+        for operation, stacks in profile_store_snapshot().items()
+    ]
+    return sorted(operations, key=lambda o: o['samples'], reverse=True)
+
+
+def profile_operation_stacks(*, operation: str) -> Dict[str, int]:
+    """
+    Get the aggregated stacks of one operation.
+
+    Args:
+        operation: Operation id (see profile_operation_list)
+
+    Returns:
+        Mapping of collapsed stack to sample count
+
+    Raises:
+        NotFoundError: If no stacks were sampled for the operation
+    """
+    stacks = profile_store_snapshot().get(operation)
+    if not stacks:
+        raise NotFoundError(f"No profile samples for operation {operation}.")
+    return stacks
@@ -0,0 +1,34 @@
+"""
+Monitoring domain serializers.
+"""
+from rest_framework import serializers
+
+
+class SlowQueryOutputSerializer(serializers.Serializer):
+    """Serializer for one slow-query fingerprint"""
+    fingerprint = serializers.CharField()
+    normalized_sql = serializers.CharField()
+    calls = serializers.IntegerField()
+    total_ms = serializers.FloatField()
+    mean_ms = serializers.FloatField()
+    max_ms = serializers.FloatField()
+    callers = serializers.ListField(child=serializers.CharField())
+    last_seen = serializers.FloatField(help_text='Unix timestamp of the latest occurrence')
+    sample_sql = serializers.CharField()
+    sample_params = serializers.CharField(allow_null=True)
+    explain = serializers.CharField(allow_null=True, help_text='Latest captured EXPLAIN (ANALYZE, BUFFERS) plan')
+
+
+class ProfileTokenOutputSerializer(serializers.Serializer):
+    """Serializer for a profiling token"""
+    token = serializers.CharField()
+    header = serializers.CharField(help_text='Request header to send the token in')
+    query_parameter = serializers.CharField(help_text='Alternative query parameter')
+    expires_in = serializers.IntegerField(help_text='Seconds until the token expires')
+
+
+class ProfileOperationOutputSerializer(serializers.Serializer):
+    """Serializer for an operation with background-sampled stacks"""
+    operation = serializers.CharField()
+    samples = serializers.IntegerField()
+    stacks = serializers.IntegerField()
@@ -0,0 +1,17 @@
+"""
+Monitoring domain URLs.
+"""
+from django.urls import path
+from api.monitoring.apis import (
+    ProfileOperationListApi,
+    ProfileOperationStacksApi,
+    ProfileTokenApi,
+    SlowQueryListApi,
+)
+
+urlpatterns = [
+    path('slow-queries/', SlowQueryListApi.as_view(), name='monitoring-slow-queries'),
+    path('profile-token/', ProfileTokenApi.as_view(), name='monitoring-profile-token'),
+    path('profiles/', ProfileOperationListApi.as_view(), name='monitoring-profiles'),
+    path('profiles/<str:operation>/', ProfileOperationStacksApi.as_view(), name='monitoring-profiles-download'),
+]
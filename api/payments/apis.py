@@ -1,21 +1,35 @@
 """
 Payment domain APIs.
 """
+import io
+from urllib.parse import quote
+
 from rest_framework import status
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
-from api.permissions import IsStaffOrAdmin
-from api.payments.services import payment_create, payment_update, payment_delete
-from api.payments.selectors import payment_list, payment_get_by_id
+from api.permissions import IsStaffOrAdmin, IsAdmin
+from api.common.encoders import DATABASE, EncodedJSON, response_mode, serialize_list
+from api.common.idempotency import idempotent_response, IDEMPOTENCY_HEADER
+from api.common.filters import parse_date_range
+from api.payments.services import payment_create, payment_update, payment_delete, payment_bulk_ingest
+from api.payments.selectors import (
+    payment_list,
+    payment_get_by_id,
+    payment_list_json,
+    payment_get_by_id_json,
+)
 from api.payments.serializers import (
     PaymentListOutputSerializer,
     PaymentDetailOutputSerializer,
     PaymentCreateInputSerializer,
     PaymentUpdateInputSerializer,
+    PaymentBulkIngestInputSerializer,
+    PaymentBulkIngestOutputSerializer,
 )
 
 
@@ -38,6 +52,8 @@ class PaymentListApi(APIView):
         parameters=[
             OpenApiParameter('customer_id', OpenApiTypes.INT, description='Filter by customer ID'),
             OpenApiParameter('staff_id', OpenApiTypes.INT, description='Filter by staff ID'),
+            OpenApiParameter('date_from', OpenApiTypes.STR, description='Only payments with payment_date on or after this ISO date/datetime'),
+            OpenApiParameter('date_to', OpenApiTypes.STR, description='Only payments with payment_date before this ISO datetime (a date includes the whole day)'),
             OpenApiParameter('page', OpenApiTypes.INT, description='Page number'),
             OpenApiParameter('page_size', OpenApiTypes.INT, description='Page size'),
         ],
@@ -52,25 +68,32 @@ class PaymentListApi(APIView):
         
         customer_id = request.query_params.get('customer_id')
         staff_id = request.query_params.get('staff_id')
+        date_from, date_to = parse_date_range(request.query_params)
         page_size = paginator.get_page_size(request)
         page = int(request.query_params.get('page', 1))
         
         offset = (page - 1) * page_size
         
-        payments, total_count = payment_list(
-            customer_id=int(customer_id) if customer_id else None,
-            staff_id=int(staff_id) if staff_id else None,
-            limit=page_size,
-            offset=offset
-        )
-        
-        serializer = PaymentListOutputSerializer(payments, many=True)
+        filters = {
+            'customer_id': int(customer_id) if customer_id else None,
+            'staff_id': int(staff_id) if staff_id else None,
+            'date_from': date_from,
+            'date_to': date_to,
+            'limit': page_size,
+            'offset': offset,
+        }
+        if response_mode() == DATABASE:
+            results, total_count = payment_list_json(serializer_class=PaymentListOutputSerializer, **filters)
+            results = EncodedJSON(results)
+        else:
+            payments, total_count = payment_list(**filters)
+            results = serialize_list(PaymentListOutputSerializer, payments)
         
         response_data = {
             'count': total_count,
             'next': None,
             'previous': None,
-            'results': serializer.data
+            'results': results
         }
         
         if offset + page_size < total_count:
@@ -79,6 +102,9 @@ class PaymentListApi(APIView):
                 query_params += f"&customer_id={customer_id}"
             if staff_id:
                 query_params += f"&staff_id={staff_id}"
+            for param in ('date_from', 'date_to'):
+                if request.query_params.get(param):
+                    query_params += f"&{param}={quote(request.query_params[param])}"
             response_data['next'] = f"{request.path}?{query_params}"
         
         if page > 1:
@@ -87,6 +113,9 @@ class PaymentListApi(APIView):
                 query_params += f"&customer_id={customer_id}"
             if staff_id:
                 query_params += f"&staff_id={staff_id}"
+            for param in ('date_from', 'date_to'):
+                if request.query_params.get(param):
+                    query_params += f"&{param}={quote(request.query_params[param])}"
             response_data['previous'] = f"{request.path}?{query_params}"
         
         return Response(response_data, status=status.HTTP_200_OK)
@@ -94,7 +123,16 @@ class PaymentListApi(APIView):
     @extend_schema(
         operation_id='payments_create',
         summary='Create a payment',
-        description='Create a new payment. Staff/admin only.',
+        description='Create a new payment. Staff/admin only. Send an Idempotency-Key header to make retries safe.',
+        parameters=[
+            OpenApiParameter(
+                IDEMPOTENCY_HEADER,
+                OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                required=False,
+                description='Client-generated key; repeated requests with the same key replay the first response'
+            ),
+        ],
         request=PaymentCreateInputSerializer,
         responses={
             201: PaymentDetailOutputSerializer,
@@ -107,15 +145,22 @@ class PaymentListApi(APIView):
         serializer = PaymentCreateInputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        payment = payment_create(**serializer.validated_data)
+        def create():
+            payment = payment_create(**serializer.validated_data)
+            output_serializer = PaymentDetailOutputSerializer(payment)
+            return (
+                {
+                    'message': 'Payment created successfully.',
+                    'payment': output_serializer.data
+                },
+                status.HTTP_201_CREATED
+            )
         
-        output_serializer = PaymentDetailOutputSerializer(payment)
-        return Response(
-            {
-                'message': 'Payment created successfully.',
-                'payment': output_serializer.data
-            },
-            status=status.HTTP_201_CREATED
+        return idempotent_response(
+            request,
+            scope='payments_create',
+            payload=serializer.validated_data,
+            handler=create
         )
 
 
@@ -135,11 +180,15 @@ class PaymentDetailApi(APIView):
     )
     def get(self, request, payment_id):
         """Get payment details"""
-        payment = payment_get_by_id(payment_id=payment_id)
-        serializer = PaymentDetailOutputSerializer(payment)
+        if response_mode() == DATABASE:
+            payment = EncodedJSON(
+                payment_get_by_id_json(payment_id=payment_id, serializer_class=PaymentDetailOutputSerializer)
+            )
+        else:
+            payment = PaymentDetailOutputSerializer(payment_get_by_id(payment_id=payment_id)).data
         return Response(
             {
-                'payment': serializer.data
+                'payment': payment
             },
             status=status.HTTP_200_OK
         )
@@ -192,3 +241,40 @@ class PaymentDetailApi(APIView):
             status=status.HTTP_200_OK
         )
 
+
+class PaymentBulkIngestApi(APIView):
+    """Bulk-load payments from an uploaded file"""
+    permission_classes = [IsAdmin]
+    parser_classes = [MultiPartParser]
+    
+    @extend_schema(
+        operation_id='payments_bulk_ingest',
+        summary='Bulk ingest payments',
+        description='Load a CSV or NDJSON file of payments in one batch. Rows with unknown customer/staff/rental references or a non-positive amount are returned as rejects. Admin only.',
+        request=PaymentBulkIngestInputSerializer,
+        responses={
+            200: PaymentBulkIngestOutputSerializer,
+            400: {'description': 'Validation error'}
+        },
+        tags=['Payments']
+    )
+    def post(self, request):
+        """Bulk ingest payments"""
+        serializer = PaymentBulkIngestInputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        upload = serializer.validated_data['file']
+        file_format = serializer.validated_data.get('format')
+        if not file_format:
+            file_format = 'ndjson' if upload.name.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+        
+        result = payment_bulk_ingest(
+            source=io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''),
+            file_format=file_format,
+            dry_run=serializer.validated_data['dry_run']
+        )
+        
+        return Response(
+            PaymentBulkIngestOutputSerializer(result).data,
+            status=status.HTTP_200_OK
+        )
@@ -38,3 +38,32 @@ class PaymentUpdateInputSerializer(serializers.Serializer):
     rental_id = serializers.IntegerField(allow_null=True, required=False)
     amount = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0.01, required=False)
 
+
+class PaymentBulkIngestInputSerializer(serializers.Serializer):
+    """Serializer for bulk payment ingest upload"""
+    file = serializers.FileField(help_text="CSV (with header) or NDJSON file of payments")
+    format = serializers.ChoiceField(
+        choices=['csv', 'ndjson'],
+        required=False,
+        help_text="File format; inferred from the file extension when omitted"
+    )
+    dry_run = serializers.BooleanField(default=False, help_text="Validate only, do not insert")
+
+
+class PaymentIngestRejectSerializer(serializers.Serializer):
+    """Serializer for a rejected ingest row"""
+    line = serializers.IntegerField()
+    error = serializers.CharField()
+    customer_id = serializers.CharField(allow_null=True)
+    staff_id = serializers.CharField(allow_null=True)
+    rental_id = serializers.CharField(allow_null=True)
+    amount = serializers.CharField(allow_null=True)
+    payment_date = serializers.CharField(allow_null=True)
+
+
+class PaymentBulkIngestOutputSerializer(serializers.Serializer):
+    """Serializer for bulk payment ingest response"""
+    total = serializers.IntegerField()
+    inserted = serializers.IntegerField()
+    rejected = serializers.IntegerField()
+    rejects = PaymentIngestRejectSerializer(many=True)
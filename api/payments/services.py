@@ -1,12 +1,18 @@
 """
 Payment domain services.
 """
-from typing import Dict, Optional
+import csv
+import io
+import json
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from django.db import transaction
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import NotFoundError, BusinessLogicError
+from api.common.tracing import traced
 from api.payments.selectors import payment_exists, payment_get_by_id
+from api.customers.services import customer_summary_rebuild, customer_summary_record_payment
 
 
 def _validate_foreign_keys(customer_id: Optional[int], staff_id: Optional[int], rental_id: Optional[int]) -> None:
@@ -40,6 +46,7 @@ def _validate_foreign_keys(customer_id: Optional[int], staff_id: Optional[int],
                 raise BusinessLogicError(f"Rental with id {rental_id} not found.")
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def payment_create(
     *,
@@ -84,10 +91,14 @@ def payment_create(
         
         columns = [col[0] for col in cursor.description]
         row = cursor.fetchone()
-        
-        return dict(zip(columns, row))
+        payment = dict(zip(columns, row))
+    
+    customer_summary_record_payment(old=None, new=payment)
+    
+    return payment
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def payment_update(
     *,
@@ -175,10 +186,14 @@ def payment_update(
         
         columns = [col[0] for col in cursor.description]
         row = cursor.fetchone()
-        
-        return dict(zip(columns, row))
+        payment = dict(zip(columns, row))
+    
+    customer_summary_record_payment(old=existing, new=payment)
+    
+    return payment
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def payment_delete(*, payment_id: int) -> None:
     """
@@ -196,5 +211,230 @@ def payment_delete(*, payment_id: int) -> None:
     conn = get_dvdrental_connection()
     
     with conn.cursor() as cursor:
-        cursor.execute("DELETE FROM payment WHERE payment_id = %s", [payment_id])
+        cursor.execute(
+            "DELETE FROM payment WHERE payment_id = %s RETURNING customer_id, amount",
+            [payment_id]
+        )
+        columns = [col[0] for col in cursor.description]
+        payment = dict(zip(columns, cursor.fetchone()))
+    
+    customer_summary_record_payment(old=payment, new=None)
+
+
+INGEST_COLUMNS = ('customer_id', 'staff_id', 'rental_id', 'amount', 'payment_date')
+INGEST_FORMATS = ('csv', 'ndjson')
+
+# payment.amount is NUMERIC(5,2); the id columns are integer (int4)
+_MAX_AMOUNT = Decimal('1000')
+_CENT = Decimal('0.01')
+_INT4_MIN, _INT4_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def _iter_ingest_records(source: TextIO, file_format: str) -> Iterable[Tuple[int, Dict]]:
+    """
+    Yield (line number, raw record) pairs from a CSV or NDJSON stream.
+    
+    CSV input must have a header row naming the INGEST_COLUMNS.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(source)
+        missing = {'customer_id', 'staff_id', 'amount'} - set(reader.fieldnames or [])
+        if missing:
+            raise BusinessLogicError(f"CSV header is missing required columns: {', '.join(sorted(missing))}.")
+        for record in reader:
+            yield reader.line_num, record
+    elif file_format == 'ndjson':
+        for line_no, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, {'_error': 'Invalid JSON.'}
+                continue
+            yield line_no, record if isinstance(record, dict) else {'_error': 'Expected a JSON object.'}
+    else:
+        raise BusinessLogicError(f"Unsupported format '{file_format}'. Use one of: {', '.join(INGEST_FORMATS)}.")
+
+
+def _parse_ingest_record(record: Dict) -> Tuple[Optional[List], Optional[str]]:
+    """
+    Coerce a raw record into staging column values.
+    
+    Only types are checked here; references and amount > 0 are validated
+    set-based in the database.
+    
+    Returns:
+        Tuple of (values, None) or (None, error message)
+    """
+    if '_error' in record:
+        return None, record['_error']
+    
+    values = []
+    for column in ('customer_id', 'staff_id', 'rental_id'):
+        raw = record.get(column)
+        if raw is None or str(raw).strip() == '':
+            if column != 'rental_id':
+                return None, f"{column} is required."
+            values.append(None)
+            continue
+        # Only integer strings and JSON integers; int() would truncate floats and accept booleans
+        if isinstance(raw, bool) or not isinstance(raw, (str, int)):
+            return None, f"{column} must be an integer."
+        try:
+            value = int(raw)
+        except ValueError:
+            return None, f"{column} must be an integer."
+        if not _INT4_MIN <= value <= _INT4_MAX:
+            return None, f"{column} is out of range."
+        values.append(value)
+    
+    try:
+        amount = Decimal(str(record.get('amount', '')).strip())
+    except InvalidOperation:
+        return None, "amount must be a decimal number."
+    if not amount.is_finite() or amount.quantize(_CENT) != amount or abs(amount) >= _MAX_AMOUNT:
+        return None, "amount must have at most 2 decimal places and be less than 1000."
+    values.append(amount)
+    
+    raw_date = record.get('payment_date')
+    if raw_date is None or str(raw_date).strip() == '':
+        values.append(None)
+    else:
+        try:
+            values.append(datetime.fromisoformat(str(raw_date).strip()))
+        except ValueError:
+            return None, "payment_date must be an ISO 8601 datetime."
+    
+    return values, None
+
+
+def _ingest_reject(line_no: int, record: Dict, error: str) -> Dict:
+    return {
+        'line': line_no,
+        'error': error,
+        **{column: record.get(column) for column in INGEST_COLUMNS},
+    }
+
+
+@traced
+def payment_bulk_ingest(*, source: TextIO, file_format: str = 'csv', dry_run: bool = False) -> Dict:
+    """
+    Bulk-load payments from a CSV or NDJSON stream.
+    
+    Rows are type-checked while streaming, loaded with COPY into a temporary
+    (never WAL-logged) staging table, validated with set-based joins against
+    customer/staff/rental and inserted with a single INSERT ... SELECT.
+    The whole batch runs in one transaction.
+    
+    Args:
+        source: Text stream with the payments
+        file_format: 'csv' (with header) or 'ndjson'
+        dry_run: Validate only; roll back instead of inserting
+        
+    Returns:
+        Dictionary with total, inserted and rejected counts and the rejected rows
+        
+    Raises:
+        BusinessLogicError: If the format is unsupported or the CSV header is invalid
+    """
+    rejects = []
+    records = {}
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    total = 0
+    
+    for line_no, record in _iter_ingest_records(source, file_format):
+        total += 1
+        values, error = _parse_ingest_record(record)
+        if error:
+            rejects.append(_ingest_reject(line_no, record, error))
+            continue
+        records[line_no] = record
+        writer.writerow([line_no, *('' if value is None else value for value in values)])
+    
+    buffer.seek(0)
+    inserted = 0
+    conn = get_dvdrental_connection()
+    
+    with transaction.atomic(using='dvdrental_sample'):
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE payment_ingest_staging (
+                    line_no integer PRIMARY KEY,
+                    customer_id integer NOT NULL,
+                    staff_id integer NOT NULL,
+                    rental_id integer,
+                    amount numeric(5,2) NOT NULL,
+                    payment_date timestamp,
+                    error text
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert(
+                "COPY payment_ingest_staging (line_no, customer_id, staff_id, rental_id, amount, payment_date) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            cursor.execute("ANALYZE payment_ingest_staging")
+            
+            cursor.execute("""
+                UPDATE payment_ingest_staging s
+                SET error = v.error
+                FROM (
+                    SELECT s.line_no,
+                           CASE
+                               WHEN s.amount <= 0 THEN 'Payment amount must be greater than 0.'
+                               WHEN c.customer_id IS NULL THEN 'Customer with id ' || s.customer_id || ' not found.'
+                               WHEN st.staff_id IS NULL THEN 'Staff with id ' || s.staff_id || ' not found.'
+                               WHEN s.rental_id IS NOT NULL AND r.rental_id IS NULL THEN 'Rental with id ' || s.rental_id || ' not found.'
+                           END AS error
+                    FROM payment_ingest_staging s
+                    LEFT JOIN customer c ON c.customer_id = s.customer_id
+                    LEFT JOIN staff st ON st.staff_id = s.staff_id
+                    LEFT JOIN rental r ON r.rental_id = s.rental_id
+                ) v
+                WHERE v.line_no = s.line_no AND v.error IS NOT NULL
+            """)
+            
+            cursor.execute("SELECT line_no, error FROM payment_ingest_staging WHERE error IS NOT NULL")
+            for line_no, error in cursor.fetchall():
+                rejects.append(_ingest_reject(line_no, records[line_no], error))
+            
+            if not dry_run:
+                cursor.execute("""
+                    INSERT INTO payment (customer_id, staff_id, rental_id, amount, payment_date)
+                    SELECT customer_id, staff_id, rental_id, amount, COALESCE(payment_date, NOW())
+                    FROM payment_ingest_staging
+                    WHERE error IS NULL
+                    ORDER BY line_no
+                """)
+                inserted = cursor.rowcount
+                
+                cursor.execute("SELECT DISTINCT customer_id FROM payment_ingest_staging WHERE error IS NULL")
+                customer_ids = [row[0] for row in cursor.fetchall()]
+                if customer_ids:
+                    customer_summary_rebuild(customer_ids=customer_ids)
+            else:
+                transaction.set_rollback(True, using='dvdrental_sample')
+    
+    rejects.sort(key=lambda reject: reject['line'])
+    return {
+        'total': total,
+        'inserted': inserted,
+        'rejected': len(rejects),
+        'rejects': rejects,
+    }
+
 
+@traced
+def payment_ingest_write_rejects(*, rejects: List[Dict], destination: TextIO) -> None:
+    """
+    Write rejected ingest rows as CSV (line, error, original columns).
+    
+    Args:
+        rejects: Rejected rows as returned by payment_bulk_ingest
+        destination: Text stream to write to
+    """
+    writer = csv.DictWriter(destination, fieldnames=['line', 'error', *INGEST_COLUMNS])
+    writer.writeheader()
+    writer.writerows(rejects)
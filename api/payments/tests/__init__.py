@@ -0,0 +1,3 @@
+"""
+Payments domain tests package.
+"""
@@ -0,0 +1,200 @@
+"""
+Payments domain API tests.
+"""
+import threading
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from api.authentication.tests.factories import AdminUserFactory, UserFactory
+from api.common.db import get_dvdrental_connection
+from api.common.idempotency import REPLAYED_HEADER, _front_cache
+from api.common.tests.sample_schema import create_sample_tables
+from api.payments.services import payment_create, payment_delete
+
+
+class PaymentBulkIngestApiTestCase(APITestCase):
+    """Test the bulk ingest upload API"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=100)
+
+    def setUp(self):
+        self.url = reverse('payment-bulk-ingest')
+
+    def upload(self, name, content, **data):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content), **data}, format='multipart')
+
+    def test_bulk_ingest_returns_counts_and_rejects(self):
+        """Test an admin upload inserts valid rows and lists the rejected ones"""
+        self.client.force_authenticate(user=AdminUserFactory())
+        content = b'customer_id,staff_id,rental_id,amount,payment_date\n1,1,5,2.99,\n1,1,999999,2.99,\n1,1,,1e3,\n'
+
+        response = self.upload('payments.csv', content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['total'], response.data['inserted'], response.data['rejected']), (3, 1, 2))
+        self.assertEqual([(reject['line'], reject['error']) for reject in response.data['rejects']], [
+            (3, 'Rental with id 999999 not found.'),
+            (4, 'amount must have at most 2 decimal places and be less than 1000.'),
+        ])
+
+    def test_bulk_ingest_format_from_extension_and_dry_run(self):
+        """Test .ndjson uploads are parsed as NDJSON and dry_run inserts nothing"""
+        self.client.force_authenticate(user=AdminUserFactory())
+
+        response = self.upload('payments.ndjson', b'{"customer_id": 1, "staff_id": 1, "amount": "4.99"}\n',
+                               dry_run=True)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['total'], response.data['inserted'], response.data['rejected']), (1, 0, 0))
+
+    def test_bulk_ingest_with_invalid_header_returns_error(self):
+        """Test a CSV header without the required columns is a 400"""
+        self.client.force_authenticate(user=AdminUserFactory())
+
+        response = self.upload('payments.csv', b'customer_id,amount\n1,4.99\n')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_ingest_requires_admin(self):
+        """Test non-admin users are refused"""
+        self.client.force_authenticate(user=UserFactory())
+
+        response = self.upload('payments.csv', b'customer_id,staff_id,amount\n1,1,4.99\n')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PaymentCreateIdempotencyTestCase(APITestCase):
+    """Test Idempotency-Key handling of payment creation"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables()
+
+    def setUp(self):
+        _front_cache.clear()
+        self.url = reverse('payment-list')
+        self.user = AdminUserFactory()
+        self.client.force_authenticate(user=self.user)
+
+    def create(self, key, amount='4.99'):
+        return self.client.post(self.url, {'customer_id': 3, 'staff_id': 1, 'amount': amount}, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response_without_running_service(self):
+        """Test a repeated key returns the first response and creates one payment"""
+        with patch('api.payments.apis.payment_create', wraps=payment_create) as service:
+            first = self.create('pay-1')
+            _front_cache.clear()  # also replay from the table, not just the process cache
+            second = self.create('pay-1')
+            third = self.create('pay-1')
+
+        self.assertEqual(service.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn(REPLAYED_HEADER, first)
+        for replay in (second, third):
+            self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(replay[REPLAYED_HEADER], 'true')
+            self.assertEqual(replay.data['payment']['payment_id'], first.data['payment']['payment_id'])
+
+    def test_same_key_with_different_payload_is_rejected(self):
+        """Test key reuse with another body is a 422, from the cache and from the table"""
+        self.create('pay-2')
+
+        self.assertEqual(self.create('pay-2', amount='5.99').status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        _front_cache.clear()
+        self.assertEqual(self.create('pay-2', amount='5.99').status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_keys_are_scoped_by_user(self):
+        """Test another user's request with the same key runs on its own"""
+        first = self.create('pay-3')
+        self.client.force_authenticate(user=AdminUserFactory())
+
+        other = self.create('pay-3', amount='5.99')
+
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn(REPLAYED_HEADER, other)
+        self.assertNotEqual(other.data['payment']['payment_id'], first.data['payment']['payment_id'])
+
+    def test_expired_key_is_reclaimed(self):
+        """Test a key past its expiry executes again, even with a new payload"""
+        first = self.create('pay-4')
+        with get_dvdrental_connection().cursor() as cursor:
+            cursor.execute("UPDATE api_idempotency_key SET expires_at = NOW() - INTERVAL '1 second'")
+        _front_cache.clear()
+
+        again = self.create('pay-4', amount='5.99')
+
+        self.assertEqual(again.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn(REPLAYED_HEADER, again)
+        self.assertNotEqual(again.data['payment']['payment_id'], first.data['payment']['payment_id'])
+        self.assertEqual(self.create('pay-4', amount='5.99')[REPLAYED_HEADER], 'true')
+
+
+class PaymentCreateIdempotencyConcurrencyTestCase(TransactionTestCase):
+    """Test concurrent duplicates wait for the first execution"""
+    databases = {'default', 'dvdrental_sample'}
+
+    def setUp(self):
+        create_sample_tables()
+        _front_cache.clear()
+        self.user = AdminUserFactory()
+        self.created = []
+
+    def tearDown(self):
+        for payment_id in self.created:
+            payment_delete(payment_id=payment_id)
+        with get_dvdrental_connection().cursor() as cursor:
+            cursor.execute("DELETE FROM api_idempotency_key")
+
+    def test_concurrent_duplicate_waits_and_replays(self):
+        """Test the duplicate blocks on the key until the first request commits, then replays it"""
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_create(**kwargs):
+            calls.append(kwargs)
+            started.set()
+            release.wait(10)
+            return payment_create(**kwargs)
+
+        responses = {}
+
+        def post(name):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                responses[name] = client.post(reverse('payment-list'), {'customer_id': 3, 'staff_id': 1, 'amount': '4.99'},
+                                              format='json', HTTP_IDEMPOTENCY_KEY='pay-concurrent')
+            finally:
+                connections.close_all()
+
+        with patch('api.payments.apis.payment_create', side_effect=slow_create):
+            first = threading.Thread(target=post, args=('first',))
+            first.start()
+            self.assertTrue(started.wait(10))
+            duplicate = threading.Thread(target=post, args=('duplicate',))
+            duplicate.start()
+            duplicate.join(0.5)
+            blocked = duplicate.is_alive()
+
+            release.set()
+            first.join(10)
+            duplicate.join(10)
+
+        self.created.append(responses['first'].data['payment']['payment_id'])
+        self.assertTrue(blocked)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(responses['duplicate'].status_code, status.HTTP_201_CREATED)
+        self.assertEqual(responses['duplicate'][REPLAYED_HEADER], 'true')
+        self.assertEqual(responses['duplicate'].data['payment']['payment_id'], self.created[0])
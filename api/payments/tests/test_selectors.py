@@ -0,0 +1,86 @@
+"""
+Payments domain selector tests.
+"""
+import json
+from datetime import datetime
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.common.tests.sample_schema import create_sample_tables, explain_last_query
+from api.payments.selectors import payment_get_by_id, payment_get_by_id_json, payment_list, payment_list_json
+from api.payments.serializers import PaymentDetailOutputSerializer, PaymentListOutputSerializer
+
+
+class PaymentListDateRangeTestCase(TestCase):
+    """Test payment_list date-range filtering and its index usage"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=20000)
+
+    def test_payment_list_filters_by_half_open_date_range(self):
+        """Test date_from is inclusive and date_to exclusive"""
+        payments, total_count = payment_list(
+            date_from=datetime(2020, 1, 2),
+            date_to=datetime(2020, 1, 3),
+            limit=1000
+        )
+
+        self.assertEqual(total_count, 144)
+        self.assertTrue(all(datetime(2020, 1, 2) <= p['payment_date'] < datetime(2020, 1, 3) for p in payments))
+        self.assertEqual(payments[0]['payment_date'], datetime(2020, 1, 2, 23, 50))
+
+    def test_payment_list_date_range_uses_brin_index(self):
+        """Test the date-range query can be answered from the BRIN index"""
+        plan = explain_last_query(
+            payment_list,
+            date_from=datetime(2020, 2, 1),
+            date_to=datetime(2020, 2, 8)
+        )
+
+        self.assertIn('payment_payment_date_brin_idx', plan)
+
+    def test_payment_list_customer_history_uses_composite_index(self):
+        """Test customer history with a date bound uses (customer_id, payment_date)"""
+        plan = explain_last_query(
+            payment_list,
+            customer_id=42,
+            date_from=datetime(2020, 2, 1)
+        )
+
+        self.assertIn('payment_customer_id_payment_date_idx', plan)
+
+
+class PaymentJsonSelectorTestCase(TestCase):
+    """Test the Postgres-rendered JSON matches the serializers' output"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=2000)
+
+    def test_payment_list_json_matches_serializer(self):
+        """Test the page and count equal payment_list rendered by PaymentListOutputSerializer"""
+        filters = {'customer_id': 42, 'date_from': datetime(2020, 1, 1), 'limit': 50, 'offset': 1}
+        payments, total_count = payment_list(**filters)
+        results, json_count = payment_list_json(serializer_class=PaymentListOutputSerializer, **filters)
+
+        self.assertEqual(json_count, total_count)
+        expected = JSONRenderer().render(PaymentListOutputSerializer(payments, many=True).data)
+        self.assertEqual(json.loads(results), json.loads(expected))
+
+    def test_payment_list_json_empty_page(self):
+        """Test a page past the end is an empty array"""
+        results, total_count = payment_list_json(serializer_class=PaymentListOutputSerializer, offset=10 ** 6)
+
+        self.assertEqual(json.loads(results), [])
+        self.assertGreater(total_count, 0)
+
+    def test_payment_get_by_id_json_matches_serializer(self):
+        """Test a single payment equals PaymentDetailOutputSerializer output"""
+        payment = payment_get_by_id(payment_id=1)
+        encoded = payment_get_by_id_json(payment_id=1, serializer_class=PaymentDetailOutputSerializer)
+
+        self.assertEqual(json.loads(encoded), json.loads(JSONRenderer().render(PaymentDetailOutputSerializer(payment).data)))
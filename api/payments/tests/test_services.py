@@ -0,0 +1,172 @@
+"""
+Payments domain service tests.
+"""
+import csv
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from api.common.db import get_dvdrental_connection
+from api.common.tests.sample_schema import create_sample_tables
+from api.payments.services import payment_bulk_ingest, payment_ingest_write_rejects
+
+HEADER = 'customer_id,staff_id,rental_id,amount,payment_date\n'
+
+
+def payment_count() -> int:
+    with get_dvdrental_connection().cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM payment")
+        return cursor.fetchone()[0]
+
+
+class PaymentBulkIngestTestCase(TestCase):
+    """Test COPY-based payment ingest and its rejects"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=100)
+
+    def ingest(self, text, file_format='csv', **kwargs):
+        return payment_bulk_ingest(source=io.StringIO(text), file_format=file_format, **kwargs)
+
+    def errors(self, result):
+        return {reject['line']: reject['error'] for reject in result['rejects']}
+
+    def test_valid_rows_are_inserted(self):
+        """Test valid CSV rows are inserted, with and without rental and date"""
+        before = payment_count()
+
+        result = self.ingest(HEADER + '1,1,5,2.99,2021-03-01T10:00:00\n2,2,,0.99,\n')
+
+        self.assertEqual((result['total'], result['inserted'], result['rejected']), (2, 2, 0))
+        self.assertEqual(payment_count(), before + 2)
+
+    def test_references_and_amount_are_rejected_set_based(self):
+        """Test each database-side reject reason is reported against its line"""
+        result = self.ingest(HEADER + '1,1,5,2.99,\n9999,1,5,2.99,\n1,99,5,2.99,\n1,1,999999,2.99,\n1,1,5,0,\n1,1,5,-1.00,\n')
+
+        self.assertEqual(result['inserted'], 1)
+        self.assertEqual(self.errors(result), {
+            3: 'Customer with id 9999 not found.',
+            4: 'Staff with id 99 not found.',
+            5: 'Rental with id 999999 not found.',
+            6: 'Payment amount must be greater than 0.',
+            7: 'Payment amount must be greater than 0.',
+        })
+
+    def test_malformed_csv_values_are_rejected_while_parsing(self):
+        """Test non-integer, out-of-range and malformed values never reach COPY"""
+        result = self.ingest(
+            HEADER + ',1,,1.00,\n1.5,1,,1.00,\n3000000000,1,,1.00,\n1,1,,1.005,\n1,1,,abc,\n1,1,,1.00,yesterday\n'
+        )
+
+        self.assertEqual(result['inserted'], 0)
+        self.assertEqual(self.errors(result), {
+            2: 'customer_id is required.',
+            3: 'customer_id must be an integer.',
+            4: 'customer_id is out of range.',
+            5: 'amount must have at most 2 decimal places and be less than 1000.',
+            6: 'amount must be a decimal number.',
+            7: 'payment_date must be an ISO 8601 datetime.',
+        })
+
+    def test_ndjson_rejects_floats_booleans_and_bad_lines(self):
+        """Test JSON numbers must be integers and booleans are not ids"""
+        lines = [
+            '{"customer_id": 1, "staff_id": 1, "amount": "1.00"}',
+            '{"customer_id": 1.9, "staff_id": 1, "amount": "1.00"}',
+            '{"customer_id": 1, "staff_id": true, "amount": "1.00"}',
+            '{"customer_id": 1, "staff_id": 1, "rental_id": -2147483649, "amount": "1.00"}',
+            'not json',
+            '[1, 2]',
+        ]
+
+        result = self.ingest('\n'.join(lines) + '\n', file_format='ndjson')
+
+        self.assertEqual(result['inserted'], 1)
+        self.assertEqual(self.errors(result), {
+            2: 'customer_id must be an integer.',
+            3: 'staff_id must be an integer.',
+            4: 'rental_id is out of range.',
+            5: 'Invalid JSON.',
+            6: 'Expected a JSON object.',
+        })
+
+    def test_dry_run_inserts_nothing(self):
+        """Test dry_run validates the batch and rolls it back"""
+        before = payment_count()
+
+        result = self.ingest(HEADER + '1,1,5,2.99,\n9999,1,,2.99,\n', dry_run=True)
+
+        self.assertEqual((result['total'], result['inserted'], result['rejected']), (2, 0, 1))
+        self.assertEqual(payment_count(), before)
+
+    def test_rejects_are_written_as_csv(self):
+        """Test the reject file has the line, error and original columns"""
+        result = self.ingest(HEADER + '9999,1,,2.99,\nx,1,,2.99,\n')
+        destination = io.StringIO()
+
+        payment_ingest_write_rejects(rejects=result['rejects'], destination=destination)
+
+        rows = list(csv.DictReader(io.StringIO(destination.getvalue())))
+        self.assertEqual([(row['line'], row['customer_id'], row['error']) for row in rows], [
+            ('2', '9999', 'Customer with id 9999 not found.'),
+            ('3', 'x', 'customer_id must be an integer.'),
+        ])
+
+
+class IngestPaymentsCommandTestCase(TestCase):
+    """Test the ingest_payments management command"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=100)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(text)
+        return path
+
+    def test_command_inserts_and_writes_rejects(self):
+        """Test the format is taken from the extension and rejects go to --errors"""
+        path = self.write('payments.ndjson', '{"customer_id": 1, "staff_id": 1, "amount": "4.99"}\n'
+                                             '{"customer_id": 1, "staff_id": 1, "amount": "0"}\n')
+        errors = os.path.join(self.directory, 'rejects.csv')
+        before = payment_count()
+        out = io.StringIO()
+
+        call_command('ingest_payments', path, errors=errors, stdout=out)
+
+        self.assertEqual(payment_count(), before + 1)
+        self.assertIn('Inserted 1 of 2 payments (1 rejected)', out.getvalue())
+        with open(errors, encoding='utf-8') as source:
+            self.assertIn('Payment amount must be greater than 0.', source.read())
+
+    def test_command_dry_run(self):
+        """Test --dry-run reports validated rows without inserting"""
+        path = self.write('payments.csv', HEADER + '1,1,,4.99,\n')
+        before = payment_count()
+        out = io.StringIO()
+
+        call_command('ingest_payments', path, dry_run=True, stdout=out)
+
+        self.assertEqual(payment_count(), before)
+        self.assertIn('Validated 1 of 1 payments (0 rejected)', out.getvalue())
+
+    def test_command_reports_invalid_header(self):
+        """Test a CSV without the required columns is a command error"""
+        path = self.write('payments.csv', 'customer_id,amount\n1,4.99\n')
+
+        with self.assertRaisesMessage(CommandError, 'CSV header is missing required columns: staff_id.'):
+            call_command('ingest_payments', path, stdout=io.StringIO())
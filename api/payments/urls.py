@@ -2,10 +2,11 @@
 Payment domain URLs.
 """
 from django.urls import path
-from api.payments.apis import PaymentListApi, PaymentDetailApi
+from api.payments.apis import PaymentListApi, PaymentDetailApi, PaymentBulkIngestApi
 
 urlpatterns = [
     path('', PaymentListApi.as_view(), name='payment-list'),
     path('<int:payment_id>/', PaymentDetailApi.as_view(), name='payment-detail'),
+    path('bulk-ingest/', PaymentBulkIngestApi.as_view(), name='payment-bulk-ingest'),
 ]
 
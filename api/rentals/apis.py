@@ -1,6 +1,8 @@
 """
 Rental domain APIs.
 """
+from urllib.parse import quote
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -9,8 +11,16 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from api.permissions import IsStaffOrAdmin
+from api.common.encoders import DATABASE, EncodedJSON, response_mode, serialize_list
+from api.common.idempotency import idempotent_response, IDEMPOTENCY_HEADER
+from api.common.filters import parse_date_range
 from api.rentals.services import rental_create, rental_update, rental_delete
-from api.rentals.selectors import rental_list, rental_get_by_id
+from api.rentals.selectors import (
+    rental_list,
+    rental_get_by_id,
+    rental_list_json,
+    rental_get_by_id_json,
+)
 from api.rentals.serializers import (
     RentalListOutputSerializer,
     RentalDetailOutputSerializer,
@@ -38,6 +48,8 @@ class RentalListApi(APIView):
         parameters=[
             OpenApiParameter('customer_id', OpenApiTypes.INT, description='Filter by customer ID'),
             OpenApiParameter('staff_id', OpenApiTypes.INT, description='Filter by staff ID'),
+            OpenApiParameter('date_from', OpenApiTypes.STR, description='Only rentals with rental_date on or after this ISO date/datetime'),
+            OpenApiParameter('date_to', OpenApiTypes.STR, description='Only rentals with rental_date before this ISO datetime (a date includes the whole day)'),
             OpenApiParameter('page', OpenApiTypes.INT, description='Page number'),
             OpenApiParameter('page_size', OpenApiTypes.INT, description='Page size'),
         ],
@@ -52,25 +64,32 @@ class RentalListApi(APIView):
         
         customer_id = request.query_params.get('customer_id')
         staff_id = request.query_params.get('staff_id')
+        date_from, date_to = parse_date_range(request.query_params)
         page_size = paginator.get_page_size(request)
         page = int(request.query_params.get('page', 1))
         
         offset = (page - 1) * page_size
         
-        rentals, total_count = rental_list(
-            customer_id=int(customer_id) if customer_id else None,
-            staff_id=int(staff_id) if staff_id else None,
-            limit=page_size,
-            offset=offset
-        )
-        
-        serializer = RentalListOutputSerializer(rentals, many=True)
+        filters = {
+            'customer_id': int(customer_id) if customer_id else None,
+            'staff_id': int(staff_id) if staff_id else None,
+            'date_from': date_from,
+            'date_to': date_to,
+            'limit': page_size,
+            'offset': offset,
+        }
+        if response_mode() == DATABASE:
+            results, total_count = rental_list_json(serializer_class=RentalListOutputSerializer, **filters)
+            results = EncodedJSON(results)
+        else:
+            rentals, total_count = rental_list(**filters)
+            results = serialize_list(RentalListOutputSerializer, rentals)
         
         response_data = {
             'count': total_count,
             'next': None,
             'previous': None,
-            'results': serializer.data
+            'results': results
         }
         
         if offset + page_size < total_count:
@@ -79,6 +98,9 @@ class RentalListApi(APIView):
                 query_params += f"&customer_id={customer_id}"
             if staff_id:
                 query_params += f"&staff_id={staff_id}"
+            for param in ('date_from', 'date_to'):
+                if request.query_params.get(param):
+                    query_params += f"&{param}={quote(request.query_params[param])}"
             response_data['next'] = f"{request.path}?{query_params}"
         
         if page > 1:
@@ -87,6 +109,9 @@ class RentalListApi(APIView):
                 query_params += f"&customer_id={customer_id}"
             if staff_id:
                 query_params += f"&staff_id={staff_id}"
+            for param in ('date_from', 'date_to'):
+                if request.query_params.get(param):
+                    query_params += f"&{param}={quote(request.query_params[param])}"
             response_data['previous'] = f"{request.path}?{query_params}"
         
         return Response(response_data, status=status.HTTP_200_OK)
@@ -94,7 +119,16 @@ class RentalListApi(APIView):
     @extend_schema(
         operation_id='rentals_create',
         summary='Create a rental',
-        description='Create a new rental. Staff/admin only.',
+        description='Create a new rental. Staff/admin only. Send an Idempotency-Key header to make retries safe.',
+        parameters=[
+            OpenApiParameter(
+                IDEMPOTENCY_HEADER,
+                OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                required=False,
+                description='Client-generated key; repeated requests with the same key replay the first response'
+            ),
+        ],
         request=RentalCreateInputSerializer,
         responses={
             201: RentalDetailOutputSerializer,
@@ -107,15 +141,22 @@ class RentalListApi(APIView):
         serializer = RentalCreateInputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        rental = rental_create(**serializer.validated_data)
+        def create():
+            rental = rental_create(**serializer.validated_data)
+            output_serializer = RentalDetailOutputSerializer(rental)
+            return (
+                {
+                    'message': 'Rental created successfully.',
+                    'rental': output_serializer.data
+                },
+                status.HTTP_201_CREATED
+            )
         
-        output_serializer = RentalDetailOutputSerializer(rental)
-        return Response(
-            {
-                'message': 'Rental created successfully.',
-                'rental': output_serializer.data
-            },
-            status=status.HTTP_201_CREATED
+        return idempotent_response(
+            request,
+            scope='rentals_create',
+            payload=serializer.validated_data,
+            handler=create
         )
 
 
@@ -135,11 +176,15 @@ class RentalDetailApi(APIView):
     )
     def get(self, request, rental_id):
         """Get rental details"""
-        rental = rental_get_by_id(rental_id=rental_id)
-        serializer = RentalDetailOutputSerializer(rental)
+        if response_mode() == DATABASE:
+            rental = EncodedJSON(
+                rental_get_by_id_json(rental_id=rental_id, serializer_class=RentalDetailOutputSerializer)
+            )
+        else:
+            rental = RentalDetailOutputSerializer(rental_get_by_id(rental_id=rental_id)).data
         return Response(
             {
-                'rental': serializer.data
+                'rental': rental
             },
             status=status.HTTP_200_OK
         )
@@ -2,14 +2,53 @@
 Rental domain selectors using raw SQL queries.
 """
 from typing import List, Dict, Optional, Tuple
+from datetime import datetime
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import NotFoundError
+from api.common.json_sql import json_page_params, json_page_sql, json_row_sql
+from api.common.tracing import traced
 
+RENTAL_COLUMNS = "rental_id, rental_date, inventory_id, customer_id, return_date, staff_id, last_update"
 
+
+def _rental_list_where(
+    customer_id: Optional[int],
+    staff_id: Optional[int],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime]
+) -> Tuple[str, List]:
+    """WHERE clause and parameters of the rental list filters."""
+    params = []
+    conditions = []
+    
+    if customer_id is not None:
+        conditions.append("customer_id = %s")
+        params.append(customer_id)
+    
+    if staff_id is not None:
+        conditions.append("staff_id = %s")
+        params.append(staff_id)
+    
+    # Range predicates on the partition key let the planner prune partitions
+    if date_from is not None:
+        conditions.append("rental_date >= %s")
+        params.append(date_from)
+    
+    if date_to is not None:
+        conditions.append("rental_date < %s")
+        params.append(date_to)
+    
+    where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where_clause, params
+
+
+@traced
 def rental_list(
     *,
     customer_id: Optional[int] = None,
     staff_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     limit: int = 20,
     offset: int = 0
 ) -> Tuple[List[Dict], int]:
@@ -19,6 +58,8 @@ def rental_list(
     Args:
         customer_id: Optional filter by customer ID
         staff_id: Optional filter by staff ID
+        date_from: Optional inclusive lower bound on rental_date
+        date_to: Optional exclusive upper bound on rental_date
         limit: Number of records to return
         offset: Number of records to skip
         
@@ -29,24 +70,9 @@ def rental_list(
     
     with conn.cursor() as cursor:
         # Build query with optional filters
-        base_query = "SELECT rental_id, rental_date, inventory_id, customer_id, return_date, staff_id, last_update FROM rental"
-        count_query = "SELECT COUNT(*) FROM rental"
-        
-        params = []
-        conditions = []
-        
-        if customer_id is not None:
-            conditions.append("customer_id = %s")
-            params.append(customer_id)
-        
-        if staff_id is not None:
-            conditions.append("staff_id = %s")
-            params.append(staff_id)
-        
-        if conditions:
-            where_clause = " WHERE " + " AND ".join(conditions)
-            base_query += where_clause
-            count_query += where_clause
+        where_clause, params = _rental_list_where(customer_id, staff_id, date_from, date_to)
+        base_query = f"SELECT {RENTAL_COLUMNS} FROM rental{where_clause}"
+        count_query = f"SELECT COUNT(*) FROM rental{where_clause}"
         
         # Get total count
         cursor.execute(count_query, params)
@@ -63,6 +89,7 @@ def rental_list(
         return rentals, total_count
 
 
+@traced
 def rental_get_by_id(*, rental_id: int) -> Dict:
     """
     Get a single rental by ID.
@@ -80,7 +107,7 @@ def rental_get_by_id(*, rental_id: int) -> Dict:
     
     with conn.cursor() as cursor:
         cursor.execute(
-            "SELECT rental_id, rental_date, inventory_id, customer_id, return_date, staff_id, last_update FROM rental WHERE rental_id = %s",
+            f"SELECT {RENTAL_COLUMNS} FROM rental WHERE rental_id = %s",
             [rental_id]
         )
         
@@ -93,6 +120,77 @@ def rental_get_by_id(*, rental_id: int) -> Dict:
         return dict(zip(columns, row))
 
 
+@traced
+def rental_list_json(
+    *,
+    serializer_class,
+    customer_id: Optional[int] = None,
+    staff_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Tuple[bytes, int]:
+    """
+    List rentals like rental_list, rendered as a JSON array by Postgres.
+    
+    Args:
+        serializer_class: Output serializer each rental is rendered as
+        customer_id: Optional filter by customer ID
+        staff_id: Optional filter by staff ID
+        date_from: Optional inclusive lower bound on rental_date
+        date_to: Optional exclusive upper bound on rental_date
+        limit: Number of records to return
+        offset: Number of records to skip
+        
+    Returns:
+        Tuple of (JSON array bytes, total count)
+    """
+    conn = get_dvdrental_connection()
+    
+    with conn.cursor() as cursor:
+        where_clause, params = _rental_list_where(customer_id, staff_id, date_from, date_to)
+        cursor.execute(
+            json_page_sql(serializer_class, columns=RENTAL_COLUMNS, table='rental', where=where_clause,
+                          order_by='rental_date DESC'),
+            json_page_params(params, limit=limit, offset=offset)
+        )
+        total_count, results = cursor.fetchone()
+        
+        return results.encode(), total_count
+
+
+@traced
+def rental_get_by_id_json(*, rental_id: int, serializer_class) -> bytes:
+    """
+    Get a single rental rendered as a JSON object by Postgres.
+    
+    Args:
+        rental_id: Rental ID to retrieve
+        serializer_class: Output serializer the rental is rendered as
+        
+    Returns:
+        JSON object bytes
+        
+    Raises:
+        NotFoundError: If rental not found
+    """
+    conn = get_dvdrental_connection()
+    
+    with conn.cursor() as cursor:
+        cursor.execute(
+            json_row_sql(serializer_class, columns=RENTAL_COLUMNS, table='rental', where=' WHERE rental_id = %s'),
+            [rental_id]
+        )
+        row = cursor.fetchone()
+        
+        if not row:
+            raise NotFoundError(f"Rental with id {rental_id} not found.")
+        
+        return row[0].encode()
+
+
+@traced
 def rental_exists(*, rental_id: int) -> bool:
     """
     Check if a rental exists.
@@ -6,7 +6,9 @@ from datetime import datetime
 from django.db import transaction
 from api.common.db import get_dvdrental_connection
 from api.common.exceptions import NotFoundError, BusinessLogicError
+from api.common.tracing import traced
 from api.rentals.selectors import rental_exists, rental_get_by_id
+from api.customers.services import customer_summary_record_rental
 
 
 def _validate_foreign_keys(customer_id: Optional[int], staff_id: Optional[int], inventory_id: Optional[int]) -> None:
@@ -40,6 +42,7 @@ def _validate_foreign_keys(customer_id: Optional[int], staff_id: Optional[int],
                 raise BusinessLogicError(f"Inventory with id {inventory_id} not found.")
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def rental_create(
     *,
@@ -91,10 +94,14 @@ def rental_create(
         
         columns = [col[0] for col in cursor.description]
         row = cursor.fetchone()
-        
-        return dict(zip(columns, row))
+        rental = dict(zip(columns, row))
+    
+    customer_summary_record_rental(old=None, new=rental)
+    
+    return rental
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def rental_update(
     *,
@@ -190,10 +197,14 @@ def rental_update(
         
         columns = [col[0] for col in cursor.description]
         row = cursor.fetchone()
-        
-        return dict(zip(columns, row))
+        rental = dict(zip(columns, row))
+    
+    customer_summary_record_rental(old=existing, new=rental)
+    
+    return rental
 
 
+@traced
 @transaction.atomic(using='dvdrental_sample')
 def rental_delete(*, rental_id: int) -> None:
     """
@@ -211,5 +222,12 @@ def rental_delete(*, rental_id: int) -> None:
     conn = get_dvdrental_connection()
     
     with conn.cursor() as cursor:
-        cursor.execute("DELETE FROM rental WHERE rental_id = %s", [rental_id])
+        cursor.execute(
+            "DELETE FROM rental WHERE rental_id = %s RETURNING customer_id, inventory_id, return_date",
+            [rental_id]
+        )
+        columns = [col[0] for col in cursor.description]
+        rental = dict(zip(columns, cursor.fetchone()))
+    
+    customer_summary_record_rental(old=rental, new=None)
 
@@ -0,0 +1,3 @@
+"""
+Rentals domain tests package.
+"""
@@ -0,0 +1,48 @@
+"""
+Rentals domain API tests.
+"""
+from unittest.mock import patch
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.authentication.tests.factories import AdminUserFactory
+from api.common.idempotency import REPLAYED_HEADER, _front_cache
+from api.common.tests.sample_schema import create_sample_tables
+from api.rentals.services import rental_create
+
+
+class RentalCreateIdempotencyTestCase(APITestCase):
+    """Test Idempotency-Key handling of rental creation"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables()
+
+    def setUp(self):
+        _front_cache.clear()
+        self.client.force_authenticate(user=AdminUserFactory())
+
+    def create(self, key, inventory_id=4581):
+        data = {'inventory_id': inventory_id, 'customer_id': 7, 'staff_id': 1}
+        return self.client.post(reverse('rental-list'), data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_instead_of_failing_on_rented_inventory(self):
+        """Test a retried create replays the rental rather than re-running rental_create"""
+        with patch('api.rentals.apis.rental_create', wraps=rental_create) as service:
+            first = self.create('rent-1')
+            _front_cache.clear()
+            retry = self.create('rent-1')
+
+        self.assertEqual(service.call_count, 1)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry[REPLAYED_HEADER], 'true')
+        self.assertEqual(retry.data['rental']['rental_id'], first.data['rental']['rental_id'])
+
+    def test_same_key_with_different_payload_is_rejected(self):
+        """Test key reuse for another inventory item is a 422"""
+        self.create('rent-2')
+
+        self.assertEqual(self.create('rent-2', inventory_id=4580).status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
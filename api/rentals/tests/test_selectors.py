@@ -0,0 +1,49 @@
+"""
+Rentals domain selector tests.
+"""
+from datetime import datetime
+
+from django.test import TestCase
+
+from api.common.tests.sample_schema import create_sample_tables, explain_last_query
+from api.rentals.selectors import rental_list
+
+
+class RentalListDateRangeTestCase(TestCase):
+    """Test rental_list date-range filtering and its index usage"""
+    databases = {'default', 'dvdrental_sample'}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_sample_tables(rows=20000)
+
+    def test_rental_list_filters_by_half_open_date_range(self):
+        """Test date_from is inclusive and date_to exclusive"""
+        rentals, total_count = rental_list(
+            date_from=datetime(2020, 1, 2),
+            date_to=datetime(2020, 1, 3),
+            limit=1000
+        )
+
+        self.assertEqual(total_count, 144)
+        self.assertTrue(all(datetime(2020, 1, 2) <= r['rental_date'] < datetime(2020, 1, 3) for r in rentals))
+
+    def test_rental_list_date_range_uses_brin_index(self):
+        """Test the date-range query can be answered from the BRIN index"""
+        plan = explain_last_query(
+            rental_list,
+            date_from=datetime(2020, 2, 1),
+            date_to=datetime(2020, 2, 8)
+        )
+
+        self.assertIn('rental_rental_date_brin_idx', plan)
+
+    def test_rental_list_customer_history_uses_composite_index(self):
+        """Test customer history with a date bound uses (customer_id, rental_date)"""
+        plan = explain_last_query(
+            rental_list,
+            customer_id=42,
+            date_from=datetime(2020, 2, 1)
+        )
+
+        self.assertIn('rental_customer_id_rental_date_idx', plan)
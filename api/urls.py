@@ -15,7 +15,9 @@ def api_root(request):
             'categories': '/api/categories/',
             'payments': '/api/payments/',
             'rentals': '/api/rentals/',
+            'customers': '/api/customers/',
             'analytics': '/api/analytics/',
+            'monitoring': '/api/monitoring/',
             'documentation': {
                 'swagger': '/api/docs/',
                 'redoc': '/api/redoc/',
@@ -37,8 +39,12 @@ urlpatterns = [
     path('categories/', include('api.categories.urls')),
     path('payments/', include('api.payments.urls')),
     path('rentals/', include('api.rentals.urls')),
+    path('customers/', include('api.customers.urls')),
     
     # Analytics domain
     path('analytics/', include('api.analytics.urls')),
+    
+    # Monitoring domain
+    path('monitoring/', include('api.monitoring.urls')),
 ]
 
@@ -0,0 +1,7 @@
+"""
+Microbenchmarks and load tests.
+
+Run a benchmark module from the project root, e.g.::
+
+    python -m benchmarks.bench_authentication
+"""
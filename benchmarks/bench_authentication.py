@@ -0,0 +1,47 @@
+"""
+Microbenchmark of JWT authenticate() with and without the verified-token cache.
+
+No database is needed: the per-user token state is pre-seeded, so only
+header parsing, signature verification, claim decoding and principal
+construction are measured.
+
+    python -m benchmarks.bench_authentication [--number N] [--repeat R]
+"""
+from benchmarks.harness import argument_parser, measure, report, setup_django
+
+
+def main():
+    args = argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    setup_django()
+
+    from rest_framework.test import APIRequestFactory
+
+    from api.authentication import authentication
+    from api.authentication.models import CustomUser
+    from api.authentication.tokens import UserRefreshToken
+
+    user = CustomUser(id=1, username='bench', role='staff', is_active=True, token_version=0)
+    authentication._token_state_cache.set(user.id, (user.token_version, user.is_active))
+    access = str(UserRefreshToken.for_user(user).access_token)
+    request = APIRequestFactory().get('/api/films/', HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    uncached = authentication.StatelessJWTAuthentication()
+    cached = authentication.CachedJWTAuthentication()
+
+    def cold_cache():
+        authentication._verified_token_cache.clear()
+        cached.authenticate(request)
+
+    results = [
+        measure('stateless (verify every request)', lambda: uncached.authenticate(request),
+                number=args.number, repeat=args.repeat),
+        measure('cached (hit)', lambda: cached.authenticate(request),
+                number=args.number, repeat=args.repeat),
+        measure('cached (miss)', cold_cache,
+                number=args.number, repeat=args.repeat),
+    ]
+    print(report(results, baseline='stateless (verify every request)'))
+
+
+if __name__ == '__main__':
+    main()
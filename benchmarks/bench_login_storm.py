@@ -0,0 +1,95 @@
+"""
+Latency of a non-auth endpoint while the server is hit by a login storm.
+
+Runs against a live server (e.g. ``docker compose up``). First probes the
+endpoint alone to get a baseline, then probes it again while
+``--concurrency`` clients log in as fast as they can, and prints probe
+latency percentiles for both phases plus login throughput and rejections.
+
+    python -m benchmarks.bench_login_storm --username alice --password 'S3cret!pass' \\
+        [--base-url http://localhost:8000] [--probe-path /api/] [--concurrency 32] [--duration 20]
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from benchmarks.harness import latency_percentiles
+
+
+def _request(url: str, data: bytes = None) -> int:
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, TimeoutError):
+        return 0
+
+
+def probe(url: str, stop: threading.Event, interval: float) -> List[float]:
+    """Request url every interval seconds until stop is set; return latencies."""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        _request(url)
+        latencies.append(time.perf_counter() - start)
+        stop.wait(interval)
+    return latencies
+
+
+def login_storm(url: str, body: bytes, stop: threading.Event, statuses: Counter, lock: threading.Lock) -> None:
+    while not stop.is_set():
+        status = _request(url, body)
+        with lock:
+            statuses[status] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--probe-path', default='/api/', help='Non-auth endpoint to measure')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent login clients')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per phase')
+    parser.add_argument('--probe-interval', type=float, default=0.05)
+    args = parser.parse_args()
+
+    probe_url = args.base_url.rstrip('/') + args.probe_path
+    login_url = args.base_url.rstrip('/') + '/api/auth/login/'
+    body = json.dumps({'username': args.username, 'password': args.password}).encode()
+
+    # Baseline: probe alone
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(probe, probe_url, stop, args.probe_interval)
+        time.sleep(args.duration)
+        stop.set()
+        baseline = future.result()
+
+    # Storm: probe while concurrency clients log in
+    stop = threading.Event()
+    statuses, lock = Counter(), threading.Lock()
+    with ThreadPoolExecutor(max_workers=args.concurrency + 1) as executor:
+        future = executor.submit(probe, probe_url, stop, args.probe_interval)
+        for _ in range(args.concurrency):
+            executor.submit(login_storm, login_url, body, stop, statuses, lock)
+        time.sleep(args.duration)
+        stop.set()
+        during_storm = future.result()
+
+    print(f"probe {args.probe_path} alone:        {latency_percentiles(baseline)}")
+    print(f"probe {args.probe_path} during storm: {latency_percentiles(during_storm)}")
+    print(f"logins/s: {statuses[200] / args.duration:.1f}  statuses: {dict(statuses)}")
+
+
+if __name__ == '__main__':
+    main()
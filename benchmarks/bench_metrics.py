@@ -0,0 +1,46 @@
+"""
+Microbenchmark of recording metric samples in the shared mmap store.
+
+Samples go to a throwaway METRICS_DIR. The lock-only row is the floor: the cost
+of the process-local lock every sample takes.
+
+    python -m benchmarks.bench_metrics [--number N] [--repeat R]
+"""
+import tempfile
+import threading
+
+from benchmarks.harness import argument_parser, measure, report, setup_django
+
+
+def main():
+    args = argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    setup_django()
+
+    from django.conf import settings
+
+    from api.common import metrics
+
+    settings.METRICS_DIR = tempfile.mkdtemp(prefix='bench_metrics_')
+    labels = (('operation', 'films_list'), ('method', 'GET'), ('status', '200'))
+    histogram_labels = (('operation', 'films_list'),)
+    lock = threading.Lock()
+
+    def lock_only():
+        with lock:
+            pass
+
+    results = [
+        measure('lock only', lock_only, number=args.number, repeat=args.repeat),
+        measure('counter_inc', lambda: metrics.counter_inc('api_requests_total', labels),
+                number=args.number, repeat=args.repeat),
+        measure('gauge_inc', lambda: metrics.gauge_inc('api_requests_in_flight'),
+                number=args.number, repeat=args.repeat),
+        measure('histogram_observe', lambda: metrics.histogram_observe(
+                    'api_request_duration_seconds', histogram_labels, 0.03),
+                number=args.number, repeat=args.repeat),
+    ]
+    print(report(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Microbenchmarks of the row mapping and serialization hot paths, no database needed.
+
+Every list endpoint turns cursor rows into dicts in its selector
+(``dict(zip(columns, row))``) and then into JSON with a DRF output serializer
+and the JSON renderer. Each path is measured over synthetic rows shaped like
+the selectors' output (same columns, Decimal money, naive timestamps) for
+several row counts, and reported per call with the peak memory one call
+allocates (tracemalloc).
+
+Groups:
+
+* ``map``: cursor tuples -> list of dicts;
+* ``serialize``: list of dicts -> primitives (``Serializer(many=True).data``);
+* ``render``: list of dicts -> JSON bytes (serializer plus renderer), or
+  cursor tuples -> JSON bytes for variants that skip the mapping.
+
+The first variant of every group is the baseline the others are compared to.
+Alternatives are added to ``VARIANTS``; before timing, each one's output is
+checked against the baseline (as JSON where the types differ).
+
+    python -m benchmarks.bench_serialization [--rows 20,100,1000,10000] \\
+        [--group map] [--dataset films] [--number ROWS] [--repeat R] [--output run.json]
+
+``--number`` is rows per batch here: a batch makes ``number // rows`` calls.
+"""
+import datetime
+import itertools
+import json
+import sys
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from benchmarks.harness import argument_parser, measure, measure_allocations, report, setup_django
+
+GROUPS = ('map', 'serialize', 'render')
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    columns: Tuple[str, ...]
+    serializer: str  # dotted path, imported after setup_django
+    make_row: Callable[[int], tuple]
+
+
+@dataclass(frozen=True)
+class Variant:
+    name: str
+    group: str
+    # Called once per (dataset, rows) with (dataset, serializer class); returns the timed callable's body
+    build: Callable
+    # Whether the output must equal the baseline's (false for floors that skip work)
+    checked: bool = True
+    # Whether it consumes the cursor tuples instead of the selector dicts
+    tuples: bool = False
+
+
+_EPOCH = datetime.datetime(2005, 5, 24, 22, 53, 30)
+_RATINGS = ('G', 'PG', 'PG-13', 'R', 'NC-17')
+_RATES = (Decimal('0.99'), Decimal('2.99'), Decimal('4.99'))
+
+
+def _film_row(i: int) -> tuple:
+    return (
+        i + 1, f'FILM TITLE {i}', f'A Fateful Reflection of a Moose And a Husband who must Overcome {i}',
+        2006, 1, 3 + i % 5, _RATES[i % 3], 46 + i % 140, Decimal('9.99') + i % 20, _RATINGS[i % 5],
+        datetime.datetime(2013, 5, 26, 14, 50, 58, 951000),
+    )
+
+
+def _payment_row(i: int) -> tuple:
+    return (
+        17503 + i, 1 + i % 599, 1 + i % 2, 1 + i * 3, Decimal('0.99') + i % 11,
+        _EPOCH + datetime.timedelta(seconds=977 * i, microseconds=(i * 996) % 1000000),
+    )
+
+
+def _rental_row(i: int) -> tuple:
+    rental_date = _EPOCH + datetime.timedelta(seconds=613 * i)
+    return_date = None if i % 90 == 0 else rental_date + datetime.timedelta(days=1 + i % 9, seconds=3 * i)
+    return (1 + i, rental_date, 1 + i % 4581, 1 + i % 599, return_date, 1 + i % 2,
+            datetime.datetime(2006, 2, 16, 2, 30, 53))
+
+
+# Columns as the selectors select them; the serializers pick their subset
+DATASETS = (
+    Dataset('films', ('film_id', 'title', 'description', 'release_year', 'language_id', 'rental_duration',
+                      'rental_rate', 'length', 'replacement_cost', 'rating', 'last_update'),
+            'api.films.serializers.FilmDetailOutputSerializer', _film_row),
+    Dataset('payments', ('payment_id', 'customer_id', 'staff_id', 'rental_id', 'amount', 'payment_date'),
+            'api.payments.serializers.PaymentListOutputSerializer', _payment_row),
+    Dataset('rentals', ('rental_id', 'rental_date', 'inventory_id', 'customer_id', 'return_date', 'staff_id',
+                        'last_update'),
+            'api.rentals.serializers.RentalListOutputSerializer', _rental_row),
+)
+
+
+def _format_datetime(value: datetime.datetime) -> str:
+    """DRF DateTimeField output for a naive UTC value (USE_TZ, TIME_ZONE = 'UTC')."""
+    return value.isoformat() + 'Z'
+
+
+def _field_formatters(serializer_class) -> List[Tuple[str, Callable]]:
+    """(field name, formatter) pairs reproducing to_representation for the field types the selectors return."""
+    from rest_framework import serializers
+
+    formatters = []
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, serializers.DecimalField):
+            quantum = Decimal(1).scaleb(-field.decimal_places)
+            formatter = (lambda q: lambda value: str(value.quantize(q)))(quantum)
+        elif isinstance(field, serializers.DateTimeField):
+            formatter = _format_datetime
+        elif isinstance(field, serializers.IntegerField):
+            formatter = int
+        else:
+            formatter = str
+        formatters.append((name, formatter))
+    return formatters
+
+
+def _handwritten_data(dataset: Dataset, serializer_class) -> Callable[[List[dict]], list]:
+    formatters = _field_formatters(serializer_class)
+
+    def data(rows):
+        return [
+            {name: None if row[name] is None else formatter(row[name]) for name, formatter in formatters}
+            for row in rows
+        ]
+    return data
+
+
+def _drf_data(dataset: Dataset, serializer_class) -> Callable[[List[dict]], list]:
+    return lambda rows: serializer_class(rows, many=True).data
+
+
+def _drf_render(dataset: Dataset, serializer_class) -> Callable[[List[dict]], bytes]:
+    from rest_framework.renderers import JSONRenderer
+
+    renderer = JSONRenderer()
+    return lambda rows: renderer.render(serializer_class(rows, many=True).data)
+
+
+def _handwritten_render(dataset: Dataset, serializer_class) -> Callable[[List[dict]], bytes]:
+    data = _handwritten_data(dataset, serializer_class)
+    # Same separators and escaping as JSONRenderer's compact output
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return lambda rows: encoder.encode(data(rows)).encode()
+
+
+def _compiled(dataset: Dataset, serializer_class) -> Callable[[List[dict]], bytes]:
+    from api.common.encoders import rows_to_json
+
+    return lambda rows: rows_to_json(serializer_class, rows)
+
+
+def _compiled_tuples(dataset: Dataset, serializer_class) -> Callable[[List[tuple]], bytes]:
+    from api.common.encoders import rows_to_json
+
+    return lambda rows: rows_to_json(serializer_class, rows, columns=dataset.columns)
+
+
+def _dict_zip(dataset: Dataset, serializer_class) -> Callable[[List[tuple]], List[dict]]:
+    columns = dataset.columns
+    return lambda rows: [dict(zip(columns, row)) for row in rows]
+
+
+def _map_dict_zip(dataset: Dataset, serializer_class) -> Callable[[List[tuple]], List[dict]]:
+    columns = dataset.columns
+    return lambda rows: list(map(dict, map(zip, itertools.repeat(columns), rows)))
+
+
+def _tuples(dataset: Dataset, serializer_class) -> Callable[[List[tuple]], List[tuple]]:
+    return list
+
+
+VARIANTS: List[Variant] = [
+    Variant('dict(zip) comprehension', 'map', _dict_zip),
+    Variant('map(dict, map(zip))', 'map', _map_dict_zip),
+    Variant('tuples (floor)', 'map', _tuples, checked=False),
+    Variant('DRF Serializer.data', 'serialize', _drf_data),
+    Variant('handwritten formatters', 'serialize', _handwritten_data),
+    Variant('DRF + JSONRenderer', 'render', _drf_render),
+    Variant('handwritten + json', 'render', _handwritten_render),
+    Variant('compiled encoder', 'render', _compiled),
+    Variant('compiled encoder (tuples)', 'render', _compiled_tuples, tuples=True),
+]
+
+
+def _comparable(output) -> str:
+    if isinstance(output, bytes):
+        output = json.loads(output)
+    return json.dumps(output, sort_keys=True, default=str)
+
+
+def run_group(group: str, dataset: Dataset, serializer_class, *, rows: int, number: int,
+              repeat: int) -> Tuple[list, Dict[str, Dict[str, float]]]:
+    """Check and time every variant of group on rows rows of dataset."""
+    tuples = [dataset.make_row(i) for i in range(rows)]
+    dicts = [dict(zip(dataset.columns, row)) for row in tuples]
+    variants = [v for v in VARIANTS if v.group == group]
+
+    calls = max(1, number // rows)
+    results, allocations, expected = [], {}, None
+    for variant in variants:
+        body = variant.build(dataset, serializer_class)
+        source = tuples if group == 'map' or variant.tuples else dicts
+        output = _comparable(body(source))
+        if expected is None:
+            expected = output
+        elif variant.checked and output != expected:
+            raise SystemExit(f"{variant.name} output differs from {variants[0].name} on {dataset.name}")
+
+        def fn(body=body, source=source):
+            return body(source)
+        results.append(measure(variant.name, fn, number=calls, repeat=repeat, warmup=max(1, calls // 10)))
+        allocations[variant.name] = measure_allocations(fn)
+    return results, allocations
+
+
+def _parse_rows(value: str) -> Sequence[int]:
+    return [int(part) for part in value.split(',') if part]
+
+
+def main():
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.set_defaults(number=20000)
+    parser.add_argument('--rows', type=_parse_rows, default=[20, 100, 1000, 10000],
+                        help='Comma-separated row counts (default 20,100,1000,10000)')
+    parser.add_argument('--group', action='append', choices=GROUPS, help='Group to run (repeatable, default: all)')
+    parser.add_argument('--dataset', action='append', choices=[d.name for d in DATASETS],
+                        help='Dataset to run (repeatable, default: all)')
+    parser.add_argument('--output', help='Also write the results as JSON here')
+    args = parser.parse_args()
+    setup_django()
+
+    from django.utils.module_loading import import_string
+
+    output = []
+    for dataset in DATASETS:
+        if args.dataset and dataset.name not in args.dataset:
+            continue
+        serializer_class = import_string(dataset.serializer)
+        for group in GROUPS:
+            if args.group and group not in args.group:
+                continue
+            for rows in args.rows:
+                results, allocations = run_group(group, dataset, serializer_class, rows=rows,
+                                                 number=args.number, repeat=args.repeat)
+                print(f"\n{group} / {dataset.name} / {rows} rows")
+                print(report(results, baseline=results[0].name, allocations=allocations))
+                sys.stdout.flush()
+                output.extend({
+                    'group': group, 'dataset': dataset.name, 'rows': rows, 'variant': r.name,
+                    'mean_us': round(r.mean_us, 2), 'best_us': round(r.best_us, 2),
+                    'per_row_ns': round(r.mean_us * 1000 / rows, 1), **allocations[r.name],
+                } for r in results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as target:
+            json.dump(output, target, indent=2)
+            target.write('\n')
+
+
+if __name__ == '__main__':
+    main()
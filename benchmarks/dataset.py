@@ -0,0 +1,219 @@
+"""
+Reproducible, scaled dvdrental dataset for load tests.
+
+Optionally starts the docker compose stack (``db`` restores dvdrental on first
+init, ``web`` serves the API), then multiplies the sample in place:
+
+* ``--film-scale F``: every film (with its categories, actors and inventory)
+  is copied F-1 times as ``<title> #<k>``. film_category, film_actor and
+  inventory hold film_id as smallint, so F is at most 32767 // films (32 for
+  the 1,000-film sample);
+* ``--rental-scale R``: every rental and its payments are copied R-1 times,
+  spread over the copied inventory and shifted by k milliseconds so the
+  copies stay in the original month (and monthly partition).
+
+Copies are derived from the original rows only, so a given pair of factors
+always produces the same data. Scaling first removes earlier copies (the
+original id ranges are kept in the ``benchmark_dataset`` table), then
+rebuilds customer_summary and runs ANALYZE. ``--reset`` alone restores the
+plain sample.
+
+    python -m benchmarks.dataset [--up] [--film-scale 10] [--rental-scale 100] [--reset]
+
+Connects with the project settings (DATABASE_HOST etc., default localhost:5432).
+"""
+import argparse
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from typing import Dict
+
+from benchmarks.harness import setup_django
+
+# (table, id column) of the rows that get copied, parents first
+SCALED_TABLES = (
+    ('film', 'film_id'),
+    ('inventory', 'inventory_id'),
+    ('rental', 'rental_id'),
+    ('payment', 'payment_id'),
+)
+MARKER_TABLE = 'benchmark_dataset'
+# film_id is smallint in film_category, film_actor and inventory
+SMALLINT_MAX = 32767
+
+
+def compose_up(*, base_url: str, timeout: float = 600) -> None:
+    """Start db and web with docker compose and wait until the API answers."""
+    subprocess.run(['docker', 'compose', 'up', '-d', '--build', 'db', 'web'], check=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(base_url.rstrip('/') + '/api/', timeout=5) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit(f"API at {base_url} did not come up within {timeout:.0f}s")
+        time.sleep(2)
+
+
+def _columns(cursor, table: str):
+    cursor.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+        """,
+        [table],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _copy(cursor, table: str, *, copies: int, where: str, overrides: Dict[str, str], params: Dict) -> int:
+    """INSERT copies-1 copies of the rows matching where, with overridden column expressions (k = copy number)."""
+    if copies <= 1:
+        return 0
+    columns = _columns(cursor, table)
+    select = ', '.join(overrides.get(column, f't.{column}') for column in columns)
+    cursor.execute(
+        f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {select}
+        FROM {table} t CROSS JOIN generate_series(1, %(copies)s - 1) AS k
+        WHERE {where}
+        """,
+        {**params, 'copies': copies},
+    )
+    return cursor.rowcount
+
+
+def _base_ids(cursor) -> Dict[str, int]:
+    """Highest id of every scaled table in the original sample, recorded on first use."""
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {MARKER_TABLE} (key text PRIMARY KEY, value bigint NOT NULL)")
+    cursor.execute(f"SELECT key, value FROM {MARKER_TABLE}")
+    base = dict(cursor.fetchall())
+    for table, id_column in SCALED_TABLES:
+        if table not in base:
+            cursor.execute(f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}")
+            base[table] = cursor.fetchone()[0]
+            cursor.execute(f"INSERT INTO {MARKER_TABLE} (key, value) VALUES (%s, %s)", [table, base[table]])
+    return base
+
+
+def dataset_reset(cursor, base: Dict[str, int]) -> None:
+    """Delete all copies, children first."""
+    cursor.execute("DELETE FROM payment WHERE payment_id > %s", [base['payment']])
+    cursor.execute("DELETE FROM rental WHERE rental_id > %s", [base['rental']])
+    cursor.execute("DELETE FROM inventory WHERE inventory_id > %s", [base['inventory']])
+    cursor.execute("DELETE FROM film_actor WHERE film_id > %s", [base['film']])
+    cursor.execute("DELETE FROM film_category WHERE film_id > %s", [base['film']])
+    cursor.execute("DELETE FROM film WHERE film_id > %s", [base['film']])
+
+
+def dataset_scale(cursor, base: Dict[str, int], *, film_scale: int, rental_scale: int) -> Dict[str, int]:
+    """
+    Copy films/inventory film_scale times and rentals/payments rental_scale times.
+
+    Raises:
+        ValueError: If the copied film ids would not fit in smallint
+    """
+    max_film_scale = SMALLINT_MAX // base['film'] if base['film'] else film_scale
+    if film_scale > max_film_scale:
+        raise ValueError(
+            f"--film-scale {film_scale} would create film ids up to {film_scale * base['film']:,}, over the "
+            f"smallint film_id of film_category, film_actor and inventory; use at most {max_film_scale}"
+        )
+    params = {
+        'film_max': base['film'],
+        'inventory_max': base['inventory'],
+        'rental_max': base['rental'],
+        'payment_max': base['payment'],
+        'film_scale': film_scale,
+    }
+    film_id = 't.film_id + k * %(film_max)s'
+    inserted = {
+        'film': _copy(cursor, 'film', copies=film_scale, where='t.film_id <= %(film_max)s', params=params, overrides={
+            'film_id': film_id,
+            'title': "t.title || ' #' || k",
+        }),
+        'film_category': _copy(cursor, 'film_category', copies=film_scale, where='t.film_id <= %(film_max)s',
+                               params=params, overrides={'film_id': film_id}),
+        'film_actor': _copy(cursor, 'film_actor', copies=film_scale, where='t.film_id <= %(film_max)s',
+                            params=params, overrides={'film_id': film_id}),
+        'inventory': _copy(cursor, 'inventory', copies=film_scale, where='t.inventory_id <= %(inventory_max)s',
+                           params=params, overrides={
+                               'inventory_id': 't.inventory_id + k * %(inventory_max)s',
+                               'film_id': film_id,
+                           }),
+    }
+    # k milliseconds keep copies inside the original second, hence month and partition
+    shift = "k * interval '1 millisecond'"
+    inserted['rental'] = _copy(cursor, 'rental', copies=rental_scale, where='t.rental_id <= %(rental_max)s',
+                               params=params, overrides={
+                                   'rental_id': 't.rental_id + k * %(rental_max)s',
+                                   'inventory_id': 't.inventory_id + (k %% %(film_scale)s) * %(inventory_max)s',
+                                   'rental_date': f't.rental_date + {shift}',
+                                   'return_date': f't.return_date + {shift}',
+                               })
+    inserted['payment'] = _copy(cursor, 'payment', copies=rental_scale, where='t.payment_id <= %(payment_max)s',
+                                params=params, overrides={
+                                    'payment_id': 't.payment_id + k * %(payment_max)s',
+                                    'rental_id': 't.rental_id + k * %(rental_max)s',
+                                    'payment_date': f't.payment_date + {shift}',
+                                })
+
+    for table, id_column in SCALED_TABLES:
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), (SELECT MAX({id_column}) FROM {table}))",
+            [table, id_column],
+        )
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--up', action='store_true', help='Start db and web with docker compose first')
+    parser.add_argument('--base-url', default='http://localhost:8000', help='API to wait for with --up')
+    parser.add_argument('--film-scale', type=int, default=1,
+                        help='Copies of every film and its inventory (1-32 for the 1,000-film sample; '
+                             'film_id is smallint in film_category, film_actor and inventory)')
+    parser.add_argument('--rental-scale', type=int, default=1, help='Copies of every rental and payment (1-1000)')
+    parser.add_argument('--reset', action='store_true', help='Only remove earlier copies')
+    args = parser.parse_args()
+    for name in ('film_scale', 'rental_scale'):
+        if not 1 <= getattr(args, name) <= 1000:
+            parser.error(f"--{name.replace('_', '-')} must be between 1 and 1000")
+
+    if args.up:
+        compose_up(base_url=args.base_url)
+
+    setup_django()
+    from django.db import transaction
+
+    from api.common.db import get_dvdrental_connection
+    from api.customers.services import customer_summary_rebuild
+
+    start = time.perf_counter()
+    try:
+        with transaction.atomic(using='dvdrental_sample'):
+            with get_dvdrental_connection().cursor() as cursor:
+                base = _base_ids(cursor)
+                dataset_reset(cursor, base)
+                inserted = {} if args.reset else dataset_scale(
+                    cursor, base, film_scale=args.film_scale, rental_scale=args.rental_scale)
+    except ValueError as e:
+        parser.error(str(e))
+    for table, rows in inserted.items():
+        print(f"  {table}: +{rows:,} rows")
+
+    summaries = customer_summary_rebuild()
+    with get_dvdrental_connection().cursor() as cursor:
+        for table in ('film', 'film_category', 'film_actor', 'inventory', 'rental', 'payment', 'customer_summary'):
+            cursor.execute(f"ANALYZE {table}")
+    print(f"rebuilt {summaries:,} customer summaries; done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Minimal benchmark harness.
+
+Each benchmark is a zero-argument callable timed in batches; results are
+reported per call. ``setup_django()`` must run before importing project code.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+
+def setup_django(settings_module: str = 'dvdrental_project.settings') -> None:
+    """Configure Django for standalone use."""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+@dataclass
+class Result:
+    name: str
+    number: int
+    per_call_ns: List[float]
+
+    @property
+    def mean_us(self) -> float:
+        return statistics.fmean(self.per_call_ns) / 1000
+
+    @property
+    def best_us(self) -> float:
+        return min(self.per_call_ns) / 1000
+
+    @property
+    def stdev_us(self) -> float:
+        return statistics.stdev(self.per_call_ns) / 1000 if len(self.per_call_ns) > 1 else 0.0
+
+    @property
+    def ops_per_sec(self) -> float:
+        return 1e9 / statistics.fmean(self.per_call_ns)
+
+
+def measure(name: str, fn: Callable[[], object], *, number: int = 1000, repeat: int = 7, warmup: int = 100) -> Result:
+    """
+    Time fn in repeat batches of number calls each.
+
+    Args:
+        name: Label for the report
+        fn: Callable to benchmark
+        number: Calls per batch
+        repeat: Number of batches
+        warmup: Untimed calls before measuring
+
+    Returns:
+        Result with the per-call time of every batch
+    """
+    for _ in range(warmup):
+        fn()
+
+    per_call_ns = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        per_call_ns.append((time.perf_counter_ns() - start) / number)
+
+    return Result(name=name, number=number, per_call_ns=per_call_ns)
+
+
+def measure_allocations(fn: Callable[[], object]) -> Dict[str, float]:
+    """
+    Memory allocated by one call of fn, traced with tracemalloc.
+
+    Returns:
+        peak_kib: Highest traced memory during the call
+        retained_kib: Memory still allocated afterwards (including the result)
+        blocks: Allocated blocks still alive afterwards
+    """
+    fn()  # warm caches so they are not counted
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    finally:
+        tracemalloc.stop()
+    del result
+    return {
+        'peak_kib': round((peak - before) / 1024, 1),
+        'retained_kib': round((current - before) / 1024, 1),
+        'blocks': blocks,
+    }
+
+
+def report(results: List[Result], *, baseline: str = None, allocations: Dict[str, Dict[str, float]] = None) -> str:
+    """
+    Format results as a table, with speedups relative to the baseline result
+    if given and peak allocation per call if allocations (see measure_allocations) are.
+    """
+    base = next((r for r in results if r.name == baseline), None)
+    width = max(len(r.name) for r in results)
+    header = f"{'benchmark':<{width}}  {'mean us':>10}  {'best us':>10}  {'stdev':>8}  {'ops/s':>12}  {'speedup':>8}"
+    lines = [header + (f"  {'peak KiB':>9}" if allocations else '')]
+    for r in results:
+        speedup = f"{base.mean_us / r.mean_us:.2f}x" if base else ''
+        line = (
+            f"{r.name:<{width}}  {r.mean_us:>10.2f}  {r.best_us:>10.2f}  {r.stdev_us:>8.2f}  "
+            f"{r.ops_per_sec:>12,.0f}  {speedup:>8}"
+        )
+        if allocations:
+            line += f"  {allocations[r.name]['peak_kib']:>9.1f}" if r.name in allocations else ''
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def latency_percentiles(samples: List[float]) -> Dict[str, float]:
+    """Count and p50/p95/p99/max in milliseconds of latencies given in seconds."""
+    if len(samples) < 2:
+        return {'n': len(samples)}
+    quantiles = statistics.quantiles(samples, n=100)
+    return {
+        'n': len(samples),
+        'p50_ms': round(quantiles[49] * 1000, 1),
+        'p95_ms': round(quantiles[94] * 1000, 1),
+        'p99_ms': round(quantiles[98] * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1),
+    }
+
+
+def argument_parser(description: str) -> argparse.ArgumentParser:
+    """Argument parser with the options shared by all benchmark modules."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--number', type=int, default=2000, help='Calls per batch')
+    parser.add_argument('--repeat', type=int, default=7, help='Number of batches')
+    return parser
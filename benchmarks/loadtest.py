@@ -0,0 +1,243 @@
+"""
+Closed-loop load test of every read endpoint, with a baseline comparison.
+
+Runs against a live server (see ``benchmarks.dataset`` for a scaled dataset).
+Each scenario is driven for ``--duration`` seconds by ``--concurrency``
+clients on keep-alive connections, after ``--warmup`` untimed seconds, and
+reported as p50/p95/p99 latency, throughput and status codes in JSON.
+
+    python -m benchmarks.loadtest --username admin --password admin123 \\
+        [--base-url http://localhost:8000] [--scenario films_list ...] \\
+        [--concurrency 16] [--duration 20] [--output run.json] \\
+        [--compare baseline.json --tolerance 0.15]
+
+With ``--compare`` the exit status is 1 if any scenario present in both runs
+regressed: a latency percentile above baseline * (1 + tolerance), throughput
+below baseline * (1 - tolerance), or errors where the baseline had none.
+The user needs the admin role (rentals, payments and analytics are staff
+only). auth_login hits the login rate limits unless the server runs with
+raised ``RATE_LIMIT_LOGIN_*`` settings; rejected logins count as errors.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.harness import latency_percentiles
+
+LATENCY_KEYS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    path: str
+    method: str = 'GET'
+    body: Optional[str] = None
+    authenticated: bool = True
+
+
+# {film_id} etc. are filled from the first rows of the list endpoints, {username}/{password} from the CLI
+SCENARIOS = (
+    Scenario('films_list', '/api/films/?page_size=20'),
+    Scenario('films_search', '/api/films/?search=love&page_size=20'),
+    Scenario('films_detail', '/api/films/{film_id}/'),
+    Scenario('categories_list', '/api/categories/'),
+    Scenario('categories_detail', '/api/categories/{category_id}/'),
+    Scenario('rentals_list', '/api/rentals/?page_size=100'),
+    Scenario('rentals_by_customer', '/api/rentals/?customer_id={customer_id}&page_size=100'),
+    Scenario('rentals_detail', '/api/rentals/{rental_id}/'),
+    Scenario('payments_list', '/api/payments/?page_size=100'),
+    Scenario('payments_date_range', '/api/payments/?date_from=2007-03-01&date_to=2007-03-08&page_size=100'),
+    Scenario('payments_detail', '/api/payments/{payment_id}/'),
+    Scenario('customers_summary', '/api/customers/{customer_id}/summary/'),
+    Scenario('analytics_categories', '/api/analytics/most-profitable-categories/'),
+    Scenario('analytics_films', '/api/analytics/most-profitable-films/?limit=100'),
+    Scenario('auth_me', '/api/auth/me/'),
+    Scenario('auth_login', '/api/auth/login/', method='POST',
+             body='{{"username": "{username}", "password": "{password}"}}', authenticated=False),
+)
+
+
+class Client:
+    """One keep-alive HTTP connection."""
+
+    def __init__(self, base_url: str, token: Optional[str] = None):
+        parsed = urllib.parse.urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        self._connect = lambda: connection_class(parsed.netloc, timeout=60)
+        self._connection = self._connect()
+        self.token = token
+
+    def request(self, method: str, path: str, body: Optional[str] = None,
+                authenticated: bool = True) -> Tuple[int, bytes]:
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if authenticated and self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        for attempt in (1, 2):
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # Server closed the keep-alive connection; reconnect once
+                self._connection.close()
+                self._connection = self._connect()
+                if attempt == 2:
+                    return 0, b''
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def login(base_url: str, username: str, password: str) -> str:
+    client = Client(base_url)
+    status, body = client.request('POST', '/api/auth/login/', json.dumps({'username': username, 'password': password}),
+                                  authenticated=False)
+    client.close()
+    if status != 200:
+        raise SystemExit(f"login failed with status {status}: {body[:200]!r}")
+    return json.loads(body)['access']
+
+
+def discover_ids(client: Client) -> Dict[str, int]:
+    """Ids for the detail scenarios, taken from the first row of each list."""
+    ids = {}
+    for key, path, fields in (
+        ('film_id', '/api/films/?page_size=1', ('film_id',)),
+        ('category_id', '/api/categories/?page_size=1', ('category_id',)),
+        ('rental_id', '/api/rentals/?page_size=1', ('rental_id', 'customer_id')),
+        ('payment_id', '/api/payments/?page_size=1', ('payment_id',)),
+    ):
+        status, body = client.request('GET', path)
+        results = json.loads(body).get('results') if status == 200 else None
+        for field in fields:
+            ids[field] = results[0][field] if results else 1
+    return ids
+
+
+def run_scenario(scenario: Scenario, *, base_url: str, token: str, values: Dict, concurrency: int,
+                 duration: float, warmup: float) -> Dict:
+    """Drive one scenario closed-loop and summarize it."""
+    path = scenario.path.format(**values)
+    body = scenario.body.format(**values) if scenario.body else None
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def client_loop():
+        client = Client(base_url, token)
+        local_latencies, local_statuses = [], Counter()
+        try:
+            while True:
+                start = time.monotonic()
+                if start >= stop_at:
+                    break
+                status, _ = client.request(scenario.method, path, body, scenario.authenticated)
+                if start >= measure_from:
+                    local_latencies.append(time.monotonic() - start)
+                    local_statuses[status] += 1
+        finally:
+            client.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(client_loop) for _ in range(concurrency)]:
+            future.result()
+
+    errors = sum(count for status, count in statuses.items() if not 200 <= status < 300)
+    summary = latency_percentiles(latencies)
+    summary.update({
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / duration, 1),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    })
+    return summary
+
+
+def compare(current: Dict, baseline: Dict, *, tolerance: float) -> List[str]:
+    """Regressions of current against baseline (both loadtest JSON reports)."""
+    regressions = []
+    for name, result in current['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        for key in LATENCY_KEYS:
+            if key in result and key in base and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {base[key]} -> {result[key]}")
+        if result['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {base['throughput_rps']} -> {result['throughput_rps']}")
+        if result['errors'] and not base['errors']:
+            regressions.append(f"{name}: {result['errors']} errors (baseline had none)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--scenario', action='append', choices=[s.name for s in SCENARIOS],
+                        help='Scenario to run (repeatable, default: all)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3, help='Untimed seconds before each scenario')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout only)')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression (default 0.15)')
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.username, args.password)
+    client = Client(args.base_url, token)
+    values = {**discover_ids(client), 'username': args.username, 'password': args.password}
+    client.close()
+
+    selected = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    report = {
+        'meta': {
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'scenarios': {},
+    }
+    for scenario in selected:
+        result = run_scenario(scenario, base_url=args.base_url, token=token, values=values,
+                              concurrency=args.concurrency, duration=args.duration, warmup=args.warmup)
+        report['scenarios'][scenario.name] = result
+        print(f"{scenario.name:<22} {result.get('p50_ms', '-'):>8} {result.get('p95_ms', '-'):>8} "
+              f"{result.get('p99_ms', '-'):>8} ms  {result['throughput_rps']:>8} req/s  errors={result['errors']}",
+              file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as target:
+            target.write(output + '\n')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as source:
+            baseline = json.load(source)
+        regressions = compare(report, baseline, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.compare}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -55,7 +55,10 @@ psql -v ON_ERROR_STOP=1 -U "$POSTGRES_USER" -d "$TARGET_DB" <<-EOSQL
         JOIN film f ON i.film_id = f.film_id
         JOIN film_category fc ON f.film_id = fc.film_id
         JOIN category c ON fc.category_id = c.category_id
-        WHERE (target_year IS NULL OR EXTRACT(YEAR FROM p.payment_date) = target_year)
+        -- Range bounds (instead of EXTRACT(YEAR ...)) keep the predicate sargable,
+        -- so indexes and partition pruning on payment_date apply
+        WHERE p.payment_date >= COALESCE(make_date(target_year, 1, 1), '-infinity'::timestamp)
+          AND p.payment_date < COALESCE(make_date(target_year + 1, 1, 1), 'infinity'::timestamp)
         GROUP BY c.category_id, c.name, EXTRACT(YEAR FROM p.payment_date)
         ORDER BY year DESC, total_revenue DESC;
     END;
@@ -92,7 +95,10 @@ psql -v ON_ERROR_STOP=1 -U "$POSTGRES_USER" -d "$TARGET_DB" <<-EOSQL
         JOIN film f ON i.film_id = f.film_id
         LEFT JOIN film_category fc ON f.film_id = fc.film_id
         LEFT JOIN category c ON fc.category_id = c.category_id
-        WHERE (target_year IS NULL OR EXTRACT(YEAR FROM p.payment_date) = target_year)
+        -- Range bounds (instead of EXTRACT(YEAR ...)) keep the predicate sargable,
+        -- so indexes and partition pruning on payment_date apply
+        WHERE p.payment_date >= COALESCE(make_date(target_year, 1, 1), '-infinity'::timestamp)
+          AND p.payment_date < COALESCE(make_date(target_year + 1, 1, 1), 'infinity'::timestamp)
         GROUP BY f.film_id, f.title, EXTRACT(YEAR FROM p.payment_date)
         ORDER BY year DESC, total_revenue DESC
         LIMIT limit_count;
@@ -55,6 +55,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.common.profiling.ProfilingMiddleware',
+    'api.common.tracing.TracingMiddleware',
+    'api.common.metrics.MetricsMiddleware',
+    'api.common.instrumentation.QueryInstrumentationMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -123,7 +127,8 @@ AUTH_PASSWORD_VALIDATORS = [
         }
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        # Shares the list loaded by AuthenticationConfig.ready()
+        'NAME': 'api.authentication.validators.PreloadedCommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
@@ -167,10 +172,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.CustomUser'
 
+# Cache. The default in-process cache is per worker; point CACHE_BACKEND at a shared
+# backend (e.g. django.core.cache.backends.db.DatabaseCache with CACHE_LOCATION=api_cache,
+# or django.core.cache.backends.redis.RedisCache) for RATE_LIMIT_STORE=shared. Prefer
+# Redis there: DatabaseCache.incr() is a read and a write, so concurrent hits can be lost.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'dvdrental'),
+    }
+}
+
+# Password checks run on a bounded thread pool (api/authentication/hashing.py)
+AUTHENTICATION_BACKENDS = ['api.authentication.backends.PooledModelBackend']
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -194,8 +213,12 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.serializers.VersionedTokenRefreshSerializer',
 }
 
+# user_login writes last_login at most once per interval per user
+LAST_LOGIN_UPDATE_INTERVAL = timedelta(minutes=int(os.environ.get('LAST_LOGIN_UPDATE_INTERVAL_MINUTES', '15')))
+
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 CORS_ALLOW_CREDENTIALS = True
@@ -213,13 +236,20 @@ SPECTACULAR_SETTINGS = {
 # Custom exception handler
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.common.encoders.EncodedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'api.common.exception_handler.custom_exception_handler',
+    # Reverse proxies in front of gunicorn; client IPs for throttling are taken from
+    # X-Forwarded-For only this many hops deep. 0 uses REMOTE_ADDR and ignores the header.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
 }
 
 # Email configuration (env-driven)
@@ -247,3 +277,101 @@ if EMAIL_BACKEND == 'django.core.mail.backends.smtp.EmailBackend' or os.environ.
     EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
     EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 
+
+# Idempotency keys for retried POSTs (rentals/payments)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24')))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '1024'))
+IDEMPOTENCY_CACHE_TTL = int(os.environ.get('IDEMPOTENCY_CACHE_TTL', '300'))
+
+# Stateless JWT authentication: per-process cache of (token_version, is_active),
+# i.e. the upper bound in seconds for a revocation to reach other workers
+TOKEN_STATE_CACHE_SIZE = int(os.environ.get('TOKEN_STATE_CACHE_SIZE', '10000'))
+TOKEN_STATE_CACHE_TTL = int(os.environ.get('TOKEN_STATE_CACHE_TTL', '30'))
+# Verified access tokens kept by CachedJWTAuthentication (entries expire at the token's exp)
+VERIFIED_TOKEN_CACHE_SIZE = int(os.environ.get('VERIFIED_TOKEN_CACHE_SIZE', '10000'))
+
+# Password hashing pool, per worker process. Requests beyond workers + max pending
+# get 503 with Retry-After instead of queueing behind a login burst.
+HASHING_POOL_WORKERS = int(os.environ.get('HASHING_POOL_WORKERS', '2'))
+HASHING_POOL_MAX_PENDING = int(os.environ.get('HASHING_POOL_MAX_PENDING', '16'))
+HASHING_POOL_TIMEOUT = float(os.environ.get('HASHING_POOL_TIMEOUT', '10'))
+
+# Email outbox delivery (manage.py deliver_outbox)
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '8'))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_SECONDS', '30'))
+EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_MAX_SECONDS', '3600'))
+
+# Sliding-window rate limits for public auth endpoints (api/common/throttling.py),
+# keyed '<view throttle_scope>_<ip|account>'
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'local')  # 'local' or 'shared'
+RATE_LIMIT_CACHE = os.environ.get('RATE_LIMIT_CACHE', 'default')
+RATE_LIMITS = {
+    'login_ip': os.environ.get('RATE_LIMIT_LOGIN_IP', '30/min'),
+    'login_account': os.environ.get('RATE_LIMIT_LOGIN_ACCOUNT', '5/min'),
+    'register_ip': os.environ.get('RATE_LIMIT_REGISTER_IP', '10/hour'),
+    'register_account': os.environ.get('RATE_LIMIT_REGISTER_ACCOUNT', '3/hour'),
+    'password_reset_ip': os.environ.get('RATE_LIMIT_PASSWORD_RESET_IP', '10/hour'),
+    'password_reset_account': os.environ.get('RATE_LIMIT_PASSWORD_RESET_ACCOUNT', '3/hour'),
+}
+
+# Refresh-token revocation list (api/authentication/revocation.py)
+REVOKED_TOKEN_BLOOM_CAPACITY = int(os.environ.get('REVOKED_TOKEN_BLOOM_CAPACITY', '100000'))
+REVOKED_TOKEN_BLOOM_REBUILD_SECONDS = int(os.environ.get('REVOKED_TOKEN_BLOOM_REBUILD_SECONDS', '600'))
+REVOKED_TOKEN_PRUNE_PROBABILITY = float(os.environ.get('REVOKED_TOKEN_PRUNE_PROBABILITY', '0.01'))
+
+# Bulk user provisioning (manage.py provision_users, /api/auth/users/bulk/).
+# Hashing processes default to the CPU count.
+BULK_HASHING_PROCESSES = int(os.environ.get('BULK_HASHING_PROCESSES', '0')) or None
+PROVISION_CHUNK_SIZE = int(os.environ.get('PROVISION_CHUNK_SIZE', '500'))
+
+# Per-request SQL instrumentation (api/common/instrumentation.py): Server-Timing
+# header and api.instrumentation log line; requests over either budget log a warning
+QUERY_INSTRUMENTATION = _get_bool('QUERY_INSTRUMENTATION', True)
+QUERY_BUDGET_COUNT = int(os.environ.get('QUERY_BUDGET_COUNT', '10'))
+QUERY_BUDGET_MS = float(os.environ.get('QUERY_BUDGET_MS', '200'))
+
+# Prometheus metrics (api/common/metrics.py), served at /metrics. Every worker
+# writes to its own file in METRICS_DIR. Scrapes must send METRICS_TOKEN as a bearer
+# token; /metrics refuses all requests while it is unset.
+METRICS_ENABLED = _get_bool('METRICS_ENABLED', True)
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_SNAPSHOT_SECONDS = int(os.environ.get('METRICS_SNAPSHOT_SECONDS', '5'))
+
+# Slow-query log for dvdrental_sample (api/common/slow_queries.py, /api/monitoring/slow-queries/).
+# 0 disables it. Sampled slow SELECTs are re-run with EXPLAIN (ANALYZE, BUFFERS)
+# on a separate connection, at most once per fingerprint per interval.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', '500'))
+SLOW_QUERY_DIR = os.environ.get('SLOW_QUERY_DIR', '')
+SLOW_QUERY_FILE_MAX_BYTES = int(os.environ.get('SLOW_QUERY_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+SLOW_QUERY_FILE_BACKUPS = int(os.environ.get('SLOW_QUERY_FILE_BACKUPS', '3'))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.1'))
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', '600'))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', '5000'))
+
+# Request profiling (api/common/profiling.py). Admins profile single requests with
+# a token from /api/monitoring/profile-token/; PROFILE_SAMPLE_RATE of all requests
+# is stack-sampled into a bounded per-operation store (/api/monitoring/profiles/).
+PROFILE_TOKEN_MAX_AGE = int(os.environ.get('PROFILE_TOKEN_MAX_AGE', '300'))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', '1'))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_STORE_MAX_OPERATIONS = int(os.environ.get('PROFILE_STORE_MAX_OPERATIONS', '200'))
+PROFILE_STORE_MAX_STACKS = int(os.environ.get('PROFILE_STORE_MAX_STACKS', '500'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+
+# Request tracing (api/common/tracing.py). Spans for DRF, @traced selectors/services
+# and SQL; incoming W3C traceparent headers decide sampling for their requests.
+# Traces are written as OTLP/JSON lines to TRACING_DIR (per worker), else logged.
+TRACING_ENABLED = _get_bool('TRACING_ENABLED', False)
+TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', '0.01'))
+TRACING_SERVICE_NAME = os.environ.get('TRACING_SERVICE_NAME', 'dvdrental-api')
+TRACING_DIR = os.environ.get('TRACING_DIR', '')
+TRACING_FILE_MAX_BYTES = int(os.environ.get('TRACING_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+TRACING_FILE_BACKUPS = int(os.environ.get('TRACING_FILE_BACKUPS', '3'))
+
+# Response rendering: 'serializer' runs the DRF output serializers; 'compiled' encodes
+# list pages with generated per-serializer encoders (api/common/encoders.py);
+# 'database' has Postgres render film, category, rental and payment lists and
+# details as JSON (api/common/json_sql.py). Serializers still document the schema.
+RESPONSE_MODE = os.environ.get('RESPONSE_MODE', 'serializer')
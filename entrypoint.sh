@@ -34,6 +34,13 @@ python manage.py migrate --noinput || {
     python manage.py migrate --noinput || exit 1
 }
 
+# Create the cache table (only used when CACHE_BACKEND is the database cache)
+python manage.py createcachetable || echo "WARNING: createcachetable failed"
+
+# Create API-owned tables/indexes in the dvdrental sample database
+echo "Syncing dvdrental_sample schema..."
+python manage.py sync_dvdrental_schema || echo "WARNING: dvdrental_sample schema sync failed"
+
 # Create superuser if it doesn't exist (parameterized via env vars)
 echo "Creating superuser..."
 python manage.py shell << END || echo "Superuser creation skipped"
@@ -58,6 +65,18 @@ except Exception as e:
     print(f'Error creating superuser: {e}')
 END
 
+# Worker metrics files are per pid; start every deploy from zero
+if [ -n "$METRICS_DIR" ]; then
+  rm -rf "$METRICS_DIR" && mkdir -p "$METRICS_DIR"
+fi
+
+# Slow-query and profile files are per pid as well
+for dir in "$SLOW_QUERY_DIR" "$PROFILE_DIR"; do
+  if [ -n "$dir" ]; then
+    rm -rf "$dir" && mkdir -p "$dir"
+  fi
+done
+
 # Execute the main command
 exec "$@"
 